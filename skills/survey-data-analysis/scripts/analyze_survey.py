@@ -10,33 +10,430 @@ import sys
 import os
 import json
 import re
+import csv
+import glob
+import hashlib
 from pathlib import Path
 from datetime import datetime
+import time
 import webbrowser
+from functools import lru_cache, partial
+
+# pandas/numpy/matplotlib/seaborn/sklearn/jinja2 均在使用处按需导入，
+# 使 --help 等轻量路径无需加载重量级科学计算依赖
+
+# 解析结果缓存目录（列式Parquet格式）
+DEFAULT_CACHE_DIR = Path.home() / '.cache' / 'survey-data-analysis'
+# 缓存格式版本，加载逻辑变化时递增以使旧缓存失效
+CACHE_VERSION = 2
+
+# 报告表格每页行数；超过时在浏览器端分页
+REPORT_PAGE_SIZE = 50
+# 流式渲染报告时每次写出的模板片段数
+REPORT_STREAM_BUFFER = 64
+
+# 分析结果缓存版本，分析或绘图算法变化时递增
+RESULT_CACHE_VERSION = 1
+
+# 文本表格支持的分隔符和编码（按优先级）
+TABLE_DELIMITERS = [',', '\t', '|', ';']
+TEXT_ENCODINGS = ['utf-8-sig', 'gb18030', 'latin-1']
+IMAGE_EXTENSIONS = ['.png', '.jpg', '.jpeg']
+# 图表输出格式：位图、矢量图、客户端渲染数据
+CHART_FORMATS = ['png', 'svg', 'json']
+# 常驻服务默认端口
+SERVER_PORT = 8765
+# 批量模式下目录中会被当作数据文件处理的扩展名
+BATCH_DATA_EXTENSIONS = ['.csv', '.xlsx', '.xls', '.json', '.txt', '.md', '.docx', '.pdf']
+# 聚类：超过该样本数时改用子样本扫描k + MiniBatchKMeans
+CLUSTER_FULL_BATCH_MAX = 20000
+CLUSTER_BATCH_SIZE = 4096
+# 计算轮廓系数的子样本大小（轮廓系数为O(n²)）
+CLUSTER_SILHOUETTE_SAMPLE = 5000
+# 因子分析：超过该行数时分块增量拟合，列数达到该值时使用随机化SVD
+PCA_INCREMENTAL_MIN_ROWS = 200000
+PCA_RANDOMIZED_MIN_COLS = 100
+PCA_BATCH_ROWS = 50000
+# 方差解释曲线最多包含的成分数
+PCA_CURVE_COMPONENTS = 20
+# 分类题分析：单选题最多选项数（超过时视为开放题/编号列跳过）与李克特量表最高分值
+CATEGORICAL_MAX_LEVELS = 50
+LIKERT_MAX_POINT = 10
+# 自助法每块计数矩阵的元素数上限（重抽样次数 × 样本数）与置信水平
+BOOTSTRAP_CHUNK_ELEMENTS = 1 << 22
+BOOTSTRAP_CI_LEVEL = 0.95
+# 显著性检验：参与组间比较的分组列最多组数、卡方检验每块索引元素数上限、报告中每族最多列出的检验数
+SIGNIFICANCE_MAX_GROUPS = 20
+SIGNIFICANCE_BLOCK_ELEMENTS = 1 << 22
+SIGNIFICANCE_MAX_ROWS = 1000
+# 数值存储：构建时每块读取的行数、分析时每次映射读取的字节数
+STORE_CHUNK_ROWS = 100000
+STORE_BLOCK_BYTES = 64 << 20
+
+
+def detect_encoding(raw):
+    """从字节样本中探测文本编码"""
+    for encoding in TEXT_ENCODINGS:
+        try:
+            raw.decode(encoding)
+            return encoding
+        except UnicodeDecodeError as e:
+            # 样本末尾可能截断了多字节字符
+            if e.start >= len(raw) - 3:
+                return encoding
+    return TEXT_ENCODINGS[-1]
+
+
+def sniff_delimiter(text):
+    """从文本样本中探测分隔符和引号字符"""
+    lines = [line for line in text.splitlines() if line.strip()]
+    if not lines:
+        raise ValueError("文本中没有可解析的内容")
+    sample = '\n'.join(lines[:50])
+    try:
+        dialect = csv.Sniffer().sniff(sample, delimiters=''.join(TABLE_DELIMITERS))
+        return dialect.delimiter, dialect.quotechar or '"'
+    except csv.Error:
+        pass
+
+    # Sniffer失败时选择各行出现次数最一致的分隔符
+    best_sep, best_score = None, 0
+    for sep in TABLE_DELIMITERS:
+        counts = [line.count(sep) for line in lines[:50]]
+        mode = max(set(counts), key=counts.count)
+        if mode == 0:
+            continue
+        score = counts.count(mode) / len(counts)
+        if score > best_score:
+            best_sep, best_score = sep, score
+    if best_sep is None:
+        raise ValueError("无法识别分隔符，请确保使用标准分隔符（逗号、制表符、竖线、分号）")
+    return best_sep, '"'
+
+
+def sniff_file_format(file_path, sample_size=64 * 1024):
+    """只读取文件开头一次，探测编码、分隔符和引号字符"""
+    with open(file_path, 'rb') as f:
+        raw = f.read(sample_size)
+    encoding = detect_encoding(raw)
+    text = raw.decode(encoding, errors='ignore')
+    if len(raw) == sample_size:
+        # 丢弃可能被截断的最后一行
+        text = text.rsplit('\n', 1)[0]
+    sep, quotechar = sniff_delimiter(text)
+    return {'sep': sep, 'quotechar': quotechar, 'encoding': encoding}
+
+
+def parse_delimited_lines(lines):
+    """将PDF文本或OCR识别出的行解析为表格，分隔符只探测一次"""
+    import pandas as pd
+    sep, quotechar = sniff_delimiter('\n'.join(lines))
+    data_rows = []
+    for parts in csv.reader(lines, delimiter=sep, quotechar=quotechar):
+        parts = [p.strip() for p in parts if p.strip()]
+        if len(parts) > 1:
+            data_rows.append(parts)
+    if len(data_rows) < 2:
+        raise ValueError("未找到至少两行的表格数据")
+
+    # 第一行作为表头，其余行补齐或截断到表头列数
+    headers = data_rows[0]
+    rows = [(row + [''] * len(headers))[:len(headers)] for row in data_rows[1:]]
+    return pd.DataFrame(rows, columns=headers)
+
+
+def parse_page_range(spec, n_pages):
+    """解析页码范围（从1开始），如 "1-20,30,45-" """
+    if not spec:
+        return list(range(n_pages))
+    selected = set()
+    for part in str(spec).split(','):
+        part = part.strip()
+        if not part:
+            continue
+        try:
+            if '-' in part:
+                start, end = part.split('-', 1)
+                start = int(start) if start.strip() else 1
+                end = int(end) if end.strip() else n_pages
+            else:
+                start = end = int(part)
+        except ValueError:
+            raise ValueError(f"无效的页码范围: {spec}")
+        selected.update(range(max(start, 1) - 1, min(end, n_pages)))
+    return sorted(selected)
+
+
+def _is_usable_table(table):
+    """表格至少包含表头和一行非空数据"""
+    return bool(table) and len(table) >= 2 and any(
+        row and any(cell for cell in row) for row in table[1:])
+
+
+def _extract_pdf_page_batch(file_path, page_numbers, mode, first_table):
+    """工作进程：打开一次PDF并提取一批页面的表格或文本"""
+    import pdfplumber
+    results = []
+    with pdfplumber.open(file_path) as pdf:
+        for i in page_numbers:
+            page = pdf.pages[i]
+            if mode == 'tables':
+                page_tables = page.extract_tables() or []
+                results.append((i, page_tables))
+                if first_table and any(_is_usable_table(t) for t in page_tables):
+                    break
+            else:
+                results.append((i, page.extract_text() or ''))
+            page.flush_cache()
+    return results
+
+
+def _process_context():
+    """进程池的启动方式：这些进程池可能在阶段调度的工作线程中创建，其他线程此时可能持有锁
+    （如KMeans的OpenMP/BLAS线程），fork多线程进程可能使子进程死锁，因此使用forkserver（不支持时用spawn）
+    """
+    import multiprocessing
+    method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+    return multiprocessing.get_context(method)
+
+
+def extract_pdf_pages(file_path, mode='tables', workers=None, pages=None, first_table=False):
+    """多进程逐页提取PDF表格或文本，结果按页码顺序合并
+
+    mode为'tables'时每页返回表格列表，为'text'时返回页面文本；
+    first_table为True时找到第一个有效表格后取消剩余页面的提取。
+    """
+    import pdfplumber
+    from concurrent.futures import ProcessPoolExecutor
+
+    file_path = str(file_path)
+    with pdfplumber.open(file_path) as pdf:
+        n_pages = len(pdf.pages)
+    page_numbers = parse_page_range(pages, n_pages)
+    first_table = first_table and mode == 'tables'
+
+    workers = min(workers or os.cpu_count() or 1, len(page_numbers))
+    if workers <= 1:
+        return _extract_pdf_page_batch(file_path, page_numbers, mode, first_table)
+
+    # 小批次便于负载均衡和提前退出，同时避免每页重复打开文件
+    batch_size = max(1, min(16, len(page_numbers) // (workers * 4)))
+    batches = [page_numbers[i:i + batch_size] for i in range(0, len(page_numbers), batch_size)]
+
+    results = []
+    found = False
+    executor = ProcessPoolExecutor(max_workers=workers, mp_context=_process_context())
+    try:
+        futures = [executor.submit(_extract_pdf_page_batch, file_path, batch, mode, first_table)
+                   for batch in batches]
+        # 按提交顺序收集，保证结果按页码排列
+        for future in futures:
+            batch_results = future.result()
+            results.extend(batch_results)
+            if first_table and any(_is_usable_table(t) for _, tables in batch_results for t in tables):
+                found = True
+                break
+    finally:
+        executor.shutdown(wait=not found, cancel_futures=True)
+    return results
+
+
+def _raise_if_tesseract_missing(error):
+    """将Tesseract未安装的异常转换为带安装说明的ImportError"""
+    error_msg = str(error).lower()
+    if "tesseract" in error_msg or "tesseract not found" in error_msg:
+        raise ImportError("Tesseract OCR未安装或未配置。\n"
+                        "安装方法:\n"
+                        "  macOS: brew install tesseract\n"
+                        "  Ubuntu/Debian: sudo apt-get install tesseract-ocr\n"
+                        "  Windows: 下载安装 https://github.com/UB-Mannheim/tesseract/wiki")
+
+
+def resolve_image_batch(spec):
+    """目录或通配符输入返回排序后的图片列表，普通文件路径返回None"""
+    spec = str(spec)
+    path = Path(spec)
+    if path.is_dir():
+        files = [p for p in path.iterdir() if p.suffix.lower() in IMAGE_EXTENSIONS]
+    elif any(ch in spec for ch in '*?[') and not path.exists():
+        files = [Path(p) for p in glob.glob(spec) if Path(p).suffix.lower() in IMAGE_EXTENSIONS]
+    else:
+        return None
+    return sorted(files)
+
+
+def _otsu_threshold(gray_array):
+    """Otsu法计算二值化阈值"""
+    import numpy as np
+    hist = np.bincount(gray_array.ravel(), minlength=256).astype(np.float64)
+    prob = hist / hist.sum()
+    omega = np.cumsum(prob)
+    mu = np.cumsum(prob * np.arange(256))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sigma_b = (mu[-1] * omega - mu) ** 2 / (omega * (1 - omega))
+    return int(np.nanargmax(sigma_b))
+
+
+def _estimate_skew(gray, max_angle=5.0, step=0.5):
+    """在缩略图上用投影轮廓法估计倾斜角度"""
+    import numpy as np
+    from PIL import Image
+    small = gray.copy()
+    small.thumbnail((800, 800))
+    best_angle, best_score = 0.0, -1.0
+    for angle in np.arange(-max_angle, max_angle + step / 2, step):
+        rotated = small.rotate(angle, resample=Image.NEAREST, fillcolor=255)
+        profile = (np.asarray(rotated) < 128).sum(axis=1).astype(np.float64)
+        # 文字行对齐时行投影的变化最剧烈
+        score = np.square(np.diff(profile)).sum()
+        if score > best_score:
+            best_angle, best_score = float(angle), score
+    return best_angle
+
+
+def preprocess_image(image, steps):
+    """OCR前的图片预处理：grayscale（灰度）、binarize（二值化）、deskew（纠偏）"""
+    import numpy as np
+    from PIL import Image
+    if not steps:
+        return image
+    image = image.convert('L')
+    if 'deskew' in steps:
+        angle = _estimate_skew(image)
+        if angle:
+            image = image.rotate(angle, resample=Image.BICUBIC, expand=True, fillcolor=255)
+    if 'binarize' in steps:
+        threshold = _otsu_threshold(np.asarray(image))
+        image = image.point([0] * (threshold + 1) + [255] * (255 - threshold))
+    return image
+
+
+def ocr_image_text(image_path, preprocess=None, lang='chi_sim+eng', cache_dir=None):
+    """OCR识别单张图片的文本，按图片内容哈希和预处理参数缓存结果"""
+    import pytesseract
+    from PIL import Image
+
+    cache_path = None
+    if cache_dir:
+        key = hashlib.blake2b(digest_size=16)
+        key.update(compute_file_hash(image_path).encode())
+        key.update(json.dumps({'preprocess': sorted(preprocess or []), 'lang': lang}).encode())
+        cache_path = Path(cache_dir) / f"{key.hexdigest()}.txt"
+        if cache_path.exists():
+            os.utime(cache_path)
+            return cache_path.read_text(encoding='utf-8')
+
+    with Image.open(image_path) as image:
+        image = preprocess_image(image, preprocess)
+        text = pytesseract.image_to_string(image, lang=lang)
+
+    if cache_path is not None:
+        try:
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = cache_path.with_suffix(f'.{os.getpid()}.tmp')
+            tmp_path.write_text(text, encoding='utf-8')
+            os.replace(tmp_path, cache_path)
+        except OSError:
+            pass
+    return text
+
+
+def ocr_text_to_dataframe(ocr_text):
+    """从OCR文本中提取表格行并解析为DataFrame"""
+    lines = [line.strip() for line in ocr_text.split('\n') if line.strip()]
+    
+    # 查找包含分隔符的行（可能是表格）
+    table_lines = []
+    for line in lines:
+        if any(sep in line for sep in TABLE_DELIMITERS + ['  ']):
+            table_lines.append(line)
+    
+    if not table_lines:
+        raise ValueError("图片中未识别出表格数据，请确保图片清晰且包含表格")
+    try:
+        return parse_delimited_lines(table_lines)
+    except ValueError:
+        raise ValueError("无法从图片中识别出表格格式，请确保图片清晰且包含表格数据")
+
+
+def _init_ocr_worker():
+    # 每个进程只处理一张图片，限制tesseract内部线程避免CPU超额订阅
+    os.environ['OMP_THREAD_LIMIT'] = '1'
+
+
+def _ocr_image_job(image_path, preprocess, lang, cache_dir):
+    """工作进程：识别一张图片，返回(文本, 错误信息)"""
+    try:
+        return ocr_image_text(image_path, preprocess, lang, cache_dir), None
+    except Exception as e:
+        return None, str(e)
+
+
+def load_image_batch(image_paths, workers=None, preprocess=None, lang='chi_sim+eng', cache_dir=None):
+    """多进程批量OCR识别图片并合并为一个DataFrame"""
+    import pandas as pd
+    from concurrent.futures import ProcessPoolExecutor
+
+    if not image_paths:
+        raise ValueError("未找到图片文件（支持 .png/.jpg/.jpeg）")
+    try:
+        import pytesseract
+        from PIL import Image
+    except ImportError:
+        raise ImportError("需要安装pytesseract和Pillow库: pip install pytesseract Pillow\n"
+                          "还需要安装Tesseract OCR引擎: brew install tesseract (macOS)")
+
+    print(f"   正在批量OCR识别 {len(image_paths)} 张图片...")
+    args = [(str(p), preprocess, lang, cache_dir) for p in image_paths]
+    workers = min(workers or os.cpu_count() or 1, len(image_paths))
+    if workers <= 1:
+        results = [_ocr_image_job(*a) for a in args]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_ocr_worker,
+                                 mp_context=_process_context()) as executor:
+            results = list(executor.map(_ocr_image_job, *zip(*args)))
+
+    frames, failures = [], []
+    for path, (text, error) in zip(image_paths, results):
+        if error is not None:
+            failures.append((path, error))
+            continue
+        try:
+            frames.append(ocr_text_to_dataframe(text))
+        except ValueError as e:
+            failures.append((path, str(e)))
+
+    if not frames:
+        if failures:
+            _raise_if_tesseract_missing(failures[0][1])
+        raise ValueError("所有图片均未识别出表格数据，请确保图片清晰且包含表格")
+    for path, error in failures:
+        print(f"   ⚠️ 跳过图片 {Path(path).name}: {error}")
+
+    # OCR可能识别错表头，列数一致的页面按第一页表头对齐
+    headers = list(frames[0].columns)
+    frames = [f.set_axis(headers, axis=1) if len(f.columns) == len(headers) else f for f in frames]
+    return pd.concat(frames, ignore_index=True)
+
+
+def load_data_file(file_path, workers=None, pdf_pages=None, first_table=False,
+                   ocr_preprocess=None, ocr_lang='chi_sim+eng', ocr_cache_dir=None):
+    """加载数据文件，支持多种格式，以及图片目录/通配符的批量OCR
+
+    workers、pdf_pages、first_table用于PDF：并行进程数、页码范围、找到首个表格后提前结束；
+    ocr_*用于图片：预处理步骤、识别语言、单图识别结果缓存目录。
+    """
+    import pandas as pd
+    image_batch = resolve_image_batch(file_path)
+    if image_batch is not None:
+        try:
+            df = load_image_batch(image_batch, workers, ocr_preprocess, ocr_lang, ocr_cache_dir)
+        except Exception as e:
+            raise ValueError(f"加载文件失败: {str(e)}")
+        print(f"✅ 成功加载图片批次: {file_path}（{len(image_batch)} 张）")
+        print(f"   数据形状: {df.shape[0]} 行 × {df.shape[1]} 列")
+        return df
 
-import pandas as pd
-import numpy as np
-import matplotlib
-matplotlib.use('Agg')  # 非交互式后端
-import matplotlib.pyplot as plt
-import seaborn as sns
-from scipy import stats
-from sklearn.cluster import KMeans
-from sklearn.decomposition import PCA
-from sklearn.preprocessing import StandardScaler
-from jinja2 import Template
-
-# 设置中文字体
-plt.rcParams['font.sans-serif'] = ['Arial Unicode MS', 'SimHei', 'DejaVu Sans']
-plt.rcParams['axes.unicode_minus'] = False
-
-# 设置seaborn样式
-sns.set_style("whitegrid")
-sns.set_palette("husl")
-
-
-def load_data_file(file_path):
-    """加载数据文件，支持多种格式"""
     file_path = Path(file_path)
     if not file_path.exists():
         raise FileNotFoundError(f"文件不存在: {file_path}")
@@ -53,15 +450,11 @@ def load_data_file(file_path):
                 data = json.load(f)
             df = pd.DataFrame(data)
         elif ext == '.txt':
-            # 尝试多种分隔符
-            for sep in [',', '\t', '|', ';']:
-                try:
-                    df = pd.read_csv(file_path, sep=sep, encoding='utf-8')
-                    if len(df.columns) > 1:
-                        break
-                except:
-                    continue
-            else:
+            # 先探测格式，再只解析一次
+            fmt = sniff_file_format(file_path)
+            df = pd.read_csv(file_path, sep=fmt['sep'], quotechar=fmt['quotechar'],
+                             encoding=fmt['encoding'])
+            if len(df.columns) <= 1:
                 raise ValueError("无法解析TXT文件，请确保使用标准分隔符（逗号、制表符等）")
         elif ext == '.md':
             # 读取Markdown文件，提取表格
@@ -103,136 +496,69 @@ def load_data_file(file_path):
         elif ext == '.pdf':
             try:
                 import pdfplumber
-                # 尝试从PDF中提取表格
-                with pdfplumber.open(file_path) as pdf:
-                    tables = []
-                    for page in pdf.pages:
-                        page_tables = page.extract_tables()
-                        if page_tables:
-                            tables.extend(page_tables)
-                    
-                    if tables:
-                        # 使用第一个表格
-                        table_data = tables[0]
-                        if len(table_data) >= 2:
-                            headers = [str(cell).strip() if cell else f'Column_{i}' 
-                                      for i, cell in enumerate(table_data[0])]
-                            data_rows = []
-                            for row in table_data[1:]:
-                                if row and any(cell for cell in row):
-                                    # 确保列数一致
-                                    row_data = [str(cell).strip() if cell else '' 
-                                               for cell in row]
-                                    # 补齐缺失的列
-                                    while len(row_data) < len(headers):
-                                        row_data.append('')
-                                    # 截断多余的列
-                                    row_data = row_data[:len(headers)]
-                                    data_rows.append(row_data)
-                            if data_rows:
-                                df = pd.DataFrame(data_rows, columns=headers)
-                            else:
-                                raise ValueError("PDF表格中没有有效数据")
-                        else:
-                            raise ValueError("PDF表格格式不正确")
-                    else:
-                        # 如果没有表格，尝试从文本中提取表格数据
-                        print("   PDF中未找到表格，尝试从文本中提取数据...")
-                        all_text = []
-                        for page in pdf.pages:
-                            text = page.extract_text()
-                            if text:
-                                all_text.append(text)
-                        
-                        # 尝试从文本中解析表格
-                        text_content = '\n'.join(all_text)
-                        lines = [line.strip() for line in text_content.split('\n') if line.strip()]
-                        
-                        # 查找可能包含表格的行
-                        table_lines = []
-                        for line in lines:
-                            # 检查是否包含多个分隔符（可能是表格行）
-                            if sum(line.count(sep) for sep in [',', '\t', '|', ';']) >= 2:
-                                table_lines.append(line)
-                        
-                        if table_lines and len(table_lines) >= 2:
-                            # 尝试解析为表格
-                            for sep in [',', '\t', '|', ';']:
-                                try:
-                                    data_rows = []
-                                    for line in table_lines:
-                                        parts = [p.strip() for p in line.split(sep) if p.strip()]
-                                        if len(parts) > 1:
-                                            data_rows.append(parts)
-                                    
-                                    if len(data_rows) >= 2:
-                                        # 第一行作为表头
-                                        headers = data_rows[0]
-                                        df = pd.DataFrame(data_rows[1:], columns=headers)
-                                        break
-                                except:
-                                    continue
-                            else:
-                                raise ValueError("PDF文件中未找到可解析的表格数据")
-                        else:
-                            raise ValueError("PDF文件中未找到表格，请确保PDF包含表格数据")
             except ImportError:
                 raise ImportError("需要安装pdfplumber库: pip install pdfplumber")
-        elif ext in ['.png', '.jpg', '.jpeg']:
-            try:
-                import pytesseract
-                from PIL import Image
-                import io
-                
-                # 使用OCR识别图片中的表格
-                print("   正在使用OCR识别图片中的表格数据...")
-                image = Image.open(file_path)
-                
-                # 尝试使用OCR提取文本
-                ocr_text = pytesseract.image_to_string(image, lang='chi_sim+eng')
+            # 多进程逐页提取表格，按页码顺序取第一个有效表格
+            page_results = extract_pdf_pages(file_path, mode='tables', workers=workers,
+                                             pages=pdf_pages, first_table=first_table)
+            tables = [table for _, page_tables in page_results for table in page_tables
+                      if _is_usable_table(table)]
+
+            if tables:
+                # 使用第一个表格
+                table_data = tables[0]
+                headers = [str(cell).strip() if cell else f'Column_{i}' 
+                          for i, cell in enumerate(table_data[0])]
+                data_rows = []
+                for row in table_data[1:]:
+                    if row and any(cell for cell in row):
+                        # 确保列数一致
+                        row_data = [str(cell).strip() if cell else '' 
+                                   for cell in row]
+                        # 补齐缺失的列
+                        while len(row_data) < len(headers):
+                            row_data.append('')
+                        # 截断多余的列
+                        row_data = row_data[:len(headers)]
+                        data_rows.append(row_data)
+                df = pd.DataFrame(data_rows, columns=headers)
+            else:
+                # 如果没有表格，尝试从文本中提取表格数据
+                print("   PDF中未找到表格，尝试从文本中提取数据...")
+                page_texts = extract_pdf_pages(file_path, mode='text', workers=workers, pages=pdf_pages)
                 
-                # 尝试解析表格格式的文本
-                lines = [line.strip() for line in ocr_text.split('\n') if line.strip()]
+                # 尝试从文本中解析表格
+                text_content = '\n'.join(text for _, text in page_texts if text)
+                lines = [line.strip() for line in text_content.split('\n') if line.strip()]
                 
-                # 查找包含分隔符的行（可能是表格）
+                # 查找可能包含表格的行
                 table_lines = []
                 for line in lines:
-                    if any(sep in line for sep in [',', '\t', '|', ';', '  ']):
+                    # 检查是否包含多个分隔符（可能是表格行）
+                    if sum(line.count(sep) for sep in TABLE_DELIMITERS) >= 2:
                         table_lines.append(line)
                 
-                if table_lines:
-                    # 尝试解析为表格
-                    for sep in [',', '\t', '|', ';']:
-                        try:
-                            data_rows = []
-                            for line in table_lines:
-                                parts = [p.strip() for p in line.split(sep) if p.strip()]
-                                if len(parts) > 1:
-                                    data_rows.append(parts)
-                            
-                            if len(data_rows) >= 2:
-                                # 第一行作为表头
-                                headers = data_rows[0]
-                                df = pd.DataFrame(data_rows[1:], columns=headers)
-                                break
-                        except:
-                            continue
-                    else:
-                        raise ValueError("无法从图片中识别出表格格式，请确保图片清晰且包含表格数据")
+                if table_lines and len(table_lines) >= 2:
+                    try:
+                        df = parse_delimited_lines(table_lines)
+                    except ValueError:
+                        raise ValueError("PDF文件中未找到可解析的表格数据")
                 else:
-                    raise ValueError("图片中未识别出表格数据，请确保图片清晰且包含表格")
-                    
+                    raise ValueError("PDF文件中未找到表格，请确保PDF包含表格数据")
+        elif ext in IMAGE_EXTENSIONS:
+            try:
+                import pytesseract
+                from PIL import Image
+                
+                # 使用OCR识别图片中的表格
+                print("   正在使用OCR识别图片中的表格数据...")
+                ocr_text = ocr_image_text(file_path, ocr_preprocess, ocr_lang, ocr_cache_dir)
+                df = ocr_text_to_dataframe(ocr_text)
             except ImportError:
                 raise ImportError("需要安装pytesseract和Pillow库: pip install pytesseract Pillow\n"
                                "还需要安装Tesseract OCR引擎: brew install tesseract (macOS)")
             except Exception as e:
-                error_msg = str(e).lower()
-                if "tesseract" in error_msg or "tesseract not found" in error_msg:
-                    raise ImportError("Tesseract OCR未安装或未配置。\n"
-                                    "安装方法:\n"
-                                    "  macOS: brew install tesseract\n"
-                                    "  Ubuntu/Debian: sudo apt-get install tesseract-ocr\n"
-                                    "  Windows: 下载安装 https://github.com/UB-Mannheim/tesseract/wiki")
+                _raise_if_tesseract_missing(e)
                 raise
         else:
             raise ValueError(f"不支持的文件格式: {ext}")
@@ -245,7 +571,927 @@ def load_data_file(file_path):
         raise ValueError(f"加载文件失败: {str(e)}")
 
 
-def load_old_plan(file_path):
+def compute_file_hash(file_path, block_size=1 << 20):
+    """分块计算文件内容哈希"""
+    h = hashlib.blake2b(digest_size=16)
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _cache_key(file_path, options):
+    """缓存键 = 文件内容哈希 + 加载参数 + 缓存版本"""
+    # 并行度和OCR缓存位置不影响解析结果
+    options = {k: v for k, v in options.items() if k not in ('workers', 'ocr_cache_dir')}
+    h = hashlib.blake2b(digest_size=16)
+    image_batch = resolve_image_batch(file_path)
+    if image_batch is not None:
+        for path in image_batch:
+            h.update(path.name.encode())
+            h.update(compute_file_hash(path).encode())
+    else:
+        h.update(compute_file_hash(file_path).encode())
+    h.update(json.dumps({'version': CACHE_VERSION, 'options': options},
+                        sort_keys=True, default=str).encode())
+    return h.hexdigest()
+
+
+def evict_cache(cache_dir, max_bytes, pattern='*'):
+    """按最近使用时间淘汰缓存文件，使总大小不超过max_bytes"""
+    entries = []
+    for path in Path(cache_dir).glob(pattern):
+        if path.is_file():
+            st = path.stat()
+            entries.append((st.st_mtime, st.st_size, path))
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            path.unlink()
+            total -= size
+        except OSError:
+            continue
+
+
+def load_data_file_cached(file_path, cache_dir=DEFAULT_CACHE_DIR, max_cache_mb=1024, **options):
+    """带列式磁盘缓存的load_data_file，内容未变时跳过解析直接读取Parquet"""
+    import pandas as pd
+    try:
+        import pyarrow
+    except ImportError:
+        print("   ⚠️ 未安装pyarrow，跳过解析缓存: pip install pyarrow")
+        return load_data_file(file_path, **options)
+
+    if resolve_image_batch(file_path) is None and not Path(file_path).exists():
+        raise FileNotFoundError(f"文件不存在: {file_path}")
+
+    cache_dir = Path(cache_dir)
+    cache_path = cache_dir / f"{_cache_key(file_path, options)}.parquet"
+    if cache_path.exists():
+        try:
+            df = pd.read_parquet(cache_path)
+            os.utime(cache_path)  # 更新最近使用时间
+            print(f"✅ 命中解析缓存: {file_path}")
+            print(f"   数据形状: {df.shape[0]} 行 × {df.shape[1]} 列")
+            return df
+        except Exception as e:
+            print(f"   ⚠️ 缓存文件损坏，重新解析: {str(e)}")
+            cache_path.unlink(missing_ok=True)
+
+    df = load_data_file(file_path, **options)
+
+    tmp_path = cache_path.with_suffix(f'.{os.getpid()}.tmp')
+    try:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        df.to_parquet(tmp_path)
+        os.replace(tmp_path, cache_path)
+        evict_cache(cache_dir, max_cache_mb * 1024 * 1024, '*.parquet')
+        if options.get('ocr_cache_dir'):
+            evict_cache(options['ocr_cache_dir'], max_cache_mb * 1024 * 1024, '*.txt')
+    except Exception as e:
+        # 列名非字符串、对象列类型混杂等情况无法写入Parquet，不影响分析
+        print(f"   ⚠️ 写入解析缓存失败，已跳过: {str(e)}")
+        tmp_path.unlink(missing_ok=True)
+    return df
+
+
+class ResultCache:
+    """分析结果磁盘缓存：键 = 输入数据指纹 + 阶段名 + 参数 + 缓存版本，按最近使用时间淘汰
+
+    缓存值用pickle保存（仅读取本机缓存目录中由本工具写入的文件）。
+    """
+
+    def __init__(self, cache_dir, max_cache_mb=1024):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_cache_mb * 1024 * 1024
+
+    def key(self, name, fingerprint, params=None):
+        h = hashlib.blake2b(digest_size=16)
+        h.update(json.dumps({'version': RESULT_CACHE_VERSION, 'name': name, 'fingerprint': fingerprint,
+                             'params': params or {}}, sort_keys=True, default=str).encode())
+        return h.hexdigest()
+
+    def get(self, key):
+        """命中时返回 {'value': 缓存值}，未命中返回None"""
+        import pickle
+        path = self.cache_dir / f'{key}.pkl'
+        if not path.exists():
+            return None
+        try:
+            with open(path, 'rb') as f:
+                entry = pickle.load(f)
+            os.utime(path)  # 更新最近使用时间
+            return entry
+        except Exception:
+            path.unlink(missing_ok=True)
+            return None
+
+    def put(self, key, value):
+        import pickle
+        path = self.cache_dir / f'{key}.pkl'
+        tmp_path = path.with_suffix(f'.{os.getpid()}.{id(value)}.tmp')
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            with open(tmp_path, 'wb') as f:
+                pickle.dump({'value': value}, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+            evict_cache(self.cache_dir, self.max_bytes, '*.pkl')
+        except Exception as e:
+            print(f"   ⚠️ 写入结果缓存失败，已跳过: {str(e)}")
+            tmp_path.unlink(missing_ok=True)
+
+
+def dataframe_fingerprint(df):
+    """数据框内容指纹（列名、类型和逐行哈希）"""
+    import pandas as pd
+    h = hashlib.blake2b(digest_size=16)
+    h.update(json.dumps([[str(col), str(dtype)] for col, dtype in df.dtypes.items()]).encode())
+    h.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    return h.hexdigest()
+
+
+def _payload_fingerprint(payload):
+    """图表数据指纹：递归哈希列表、元组、数组和标量"""
+    import numpy as np
+    h = hashlib.blake2b(digest_size=16)
+
+    def feed(obj):
+        if isinstance(obj, np.ndarray):
+            h.update(str(obj.dtype).encode() + str(obj.shape).encode())
+            h.update(np.ascontiguousarray(obj).tobytes())
+        elif isinstance(obj, (list, tuple)):
+            h.update(b'[%d' % len(obj))
+            for item in obj:
+                feed(item)
+        else:
+            h.update(repr(obj).encode())
+    feed(payload)
+    return h.hexdigest()
+
+
+def _reservoir_merge(keys, values, new_keys, new_values, size):
+    """按随机键保留最小的size个元素（向量化蓄水池抽样）"""
+    import numpy as np
+    if len(keys) >= size:
+        # 蓄水池已满时只有键更小的新元素才可能进入
+        keep = new_keys < keys.max()
+        new_keys, new_values = new_keys[keep], new_values[keep]
+        if len(new_keys) == 0:
+            return keys, values
+    keys = np.concatenate([keys, new_keys])
+    values = np.concatenate([values, new_values])
+    if len(keys) > size:
+        idx = np.argpartition(keys, size - 1)[:size]
+        keys, values = keys[idx], values[idx]
+    return keys, values
+
+
+class StreamingDescriptiveStats:
+    """单遍流式描述性统计，内存占用与数据行数无关
+
+    均值/方差使用Chan并行合并公式逐块累加；分位数基于每列固定大小的
+    蓄水池样本近似计算；同时保留固定行数的随机样本供其余模型和图表使用。
+    """
+
+    def __init__(self, quantile_sample=10000, sample_rows=100000, seed=42):
+        import numpy as np
+        self.quantile_sample = quantile_sample
+        self.sample_rows = sample_rows
+        self.rng = np.random.default_rng(seed)
+        self.n_rows = 0
+        self.columns = None
+        self.dtypes = {}
+        self.missing = None
+        self.numeric = {}       # 列名 -> [count, mean, M2, min, max]
+        self.reservoirs = {}    # 列名 -> (keys, values)
+        self._dropped = set()
+        self._sample = None
+        self._sample_keys = np.empty(0)
+
+    def update(self, chunk):
+        """合并一个数据块"""
+        import numpy as np
+        import pandas as pd
+        if self.columns is None:
+            self.columns = list(chunk.columns)
+            self.missing = pd.Series(0, index=chunk.columns, dtype=np.int64)
+        self.n_rows += len(chunk)
+        self.missing = self.missing.add(chunk.isnull().sum(), fill_value=0).astype(np.int64)
+
+        for col in chunk.columns:
+            dtype = chunk[col].dtype
+            prev = self.dtypes.get(col)
+            if prev is None:
+                self.dtypes[col] = dtype
+            elif prev != dtype:
+                if pd.api.types.is_numeric_dtype(prev) and pd.api.types.is_numeric_dtype(dtype):
+                    self.dtypes[col] = np.result_type(prev, dtype)
+                else:
+                    self.dtypes[col] = np.dtype(object)
+
+            is_numeric = pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype)
+            if col in self._dropped:
+                continue
+            if not is_numeric:
+                # 首块为数值、后续出现非数值的列不再参与数值统计
+                if col in self.numeric:
+                    del self.numeric[col]
+                    del self.reservoirs[col]
+                    self._dropped.add(col)
+                elif prev is None:
+                    self._dropped.add(col)
+                continue
+            if prev is not None and col not in self.numeric:
+                continue
+            self._update_numeric(col, chunk[col].to_numpy(dtype=np.float64, na_value=np.nan))
+
+        self._update_sample(chunk)
+
+    def _update_numeric(self, col, values):
+        import numpy as np
+        values = values[~np.isnan(values)]
+        n_b = len(values)
+        if col not in self.numeric:
+            self.numeric[col] = [0, 0.0, 0.0, np.inf, -np.inf]
+            self.reservoirs[col] = (np.empty(0), np.empty(0))
+        if n_b == 0:
+            return
+        stats_ = self.numeric[col]
+        n_a, mean_a, m2_a = stats_[0], stats_[1], stats_[2]
+        mean_b = values.mean()
+        m2_b = ((values - mean_b) ** 2).sum()
+        n = n_a + n_b
+        delta = mean_b - mean_a
+        stats_[0] = n
+        stats_[1] = mean_a + delta * n_b / n
+        stats_[2] = m2_a + m2_b + delta ** 2 * n_a * n_b / n
+        stats_[3] = min(stats_[3], values.min())
+        stats_[4] = max(stats_[4], values.max())
+
+        keys, res = self.reservoirs[col]
+        self.reservoirs[col] = _reservoir_merge(keys, res, self.rng.random(n_b), values,
+                                                self.quantile_sample)
+
+    def _update_sample(self, chunk):
+        import numpy as np
+        import pandas as pd
+        if self.sample_rows <= 0:
+            return
+        positions = np.arange(self.n_rows - len(chunk), self.n_rows)
+        keys = self.rng.random(len(chunk))
+        if self._sample is None:
+            self._sample = chunk.iloc[:0]
+        if len(self._sample_keys) >= self.sample_rows:
+            # 蓄水池已满时只有键更小的行才可能进入
+            keep = keys < self._sample_keys.max()
+            chunk, keys, positions = chunk[keep], keys[keep], positions[keep]
+            if len(keys) == 0:
+                return
+        sample = pd.concat([self._sample, chunk.set_axis(positions)])
+        sample_keys = np.concatenate([self._sample_keys, keys])
+        if len(sample_keys) > self.sample_rows:
+            idx = np.argpartition(sample_keys, self.sample_rows - 1)[:self.sample_rows]
+            sample, sample_keys = sample.iloc[idx], sample_keys[idx]
+        self._sample, self._sample_keys = sample, sample_keys
+
+    def sample(self):
+        """返回保留的随机样本（按原始行序）"""
+        import pandas as pd
+        if self._sample is None:
+            return pd.DataFrame()
+        return self._sample.sort_index().reset_index(drop=True)
+
+    def get_state(self):
+        """导出可持久化的状态：(JSON元数据, 数组字典)，不含行样本"""
+        import numpy as np
+        columns = self.columns or []
+        numeric_cols = [col for col in columns if col in self.numeric]
+        meta = {
+            'quantile_sample': self.quantile_sample,
+            'n_rows': self.n_rows,
+            'columns': columns,
+            'dtypes': [str(self.dtypes[col]) for col in columns],
+            'missing': [int(self.missing[col]) for col in columns],
+            'numeric_columns': numeric_cols,
+            'dropped': [col for col in columns if col in self._dropped],
+            'rng': self.rng.bit_generator.state
+        }
+        arrays = {'numeric_stats': np.array([self.numeric[col] for col in numeric_cols],
+                                            dtype=np.float64).reshape(-1, 5)}
+        for i, col in enumerate(numeric_cols):
+            arrays[f'reservoir_keys_{i}'], arrays[f'reservoir_values_{i}'] = self.reservoirs[col]
+        return meta, arrays
+
+    @classmethod
+    def from_state(cls, meta, arrays):
+        """从get_state导出的状态恢复"""
+        import numpy as np
+        import pandas as pd
+        obj = cls(quantile_sample=meta['quantile_sample'], sample_rows=0)
+        obj.rng.bit_generator.state = meta['rng']
+        obj.n_rows = meta['n_rows']
+        obj.columns = list(meta['columns'])
+        for col, name in zip(obj.columns, meta['dtypes']):
+            try:
+                obj.dtypes[col] = pd.api.types.pandas_dtype(name)
+            except TypeError:
+                obj.dtypes[col] = np.dtype(object)
+        obj.missing = pd.Series(meta['missing'], index=obj.columns, dtype=np.int64)
+        obj._dropped = set(meta['dropped'])
+        for i, col in enumerate(meta['numeric_columns']):
+            count, mean, m2, vmin, vmax = arrays['numeric_stats'][i]
+            obj.numeric[col] = [int(count), mean, m2, vmin, vmax]
+            obj.reservoirs[col] = (arrays[f'reservoir_keys_{i}'], arrays[f'reservoir_values_{i}'])
+        return obj
+
+    def result(self):
+        """返回与perform_descriptive_analysis相同结构的结果"""
+        import numpy as np
+        summary = {}
+        for col in self.columns or []:
+            if col not in self.numeric:
+                continue
+            count, mean, m2, vmin, vmax = self.numeric[col]
+            _, res = self.reservoirs[col]
+            if count:
+                q25, q50, q75 = np.quantile(res, [0.25, 0.5, 0.75])
+            else:
+                mean = vmin = vmax = q25 = q50 = q75 = np.nan
+            summary[col] = {
+                'count': float(count),
+                'mean': float(mean),
+                'std': float(np.sqrt(m2 / (count - 1))) if count > 1 else np.nan,
+                'min': float(vmin),
+                '25%': float(q25),
+                '50%': float(q50),
+                '75%': float(q75),
+                'max': float(vmax),
+            }
+        return {
+            'summary': summary,
+            'missing': self.missing.to_dict() if self.missing is not None else {},
+            'dtypes': {col: str(dtype) for col, dtype in self.dtypes.items()},
+            'approximate_quantiles': True
+        }
+
+
+def stream_csv_file(file_path, chunksize, sample_rows=100000, on_chunk=None):
+    """分块流式读取CSV，单遍计算描述性统计并保留随机样本
+
+    on_chunk可选，每个数据块额外交给它处理（如增量分析状态）。
+    """
+    import pandas as pd
+    file_path = Path(file_path)
+    if not file_path.exists():
+        raise FileNotFoundError(f"文件不存在: {file_path}")
+    if file_path.suffix.lower() != '.csv':
+        raise ValueError(f"流式模式仅支持CSV文件: {file_path}")
+
+    stats_ = StreamingDescriptiveStats(sample_rows=sample_rows)
+    try:
+        for chunk in pd.read_csv(file_path, encoding='utf-8', chunksize=chunksize):
+            stats_.update(chunk)
+            if on_chunk is not None:
+                on_chunk(chunk)
+    except Exception as e:
+        raise ValueError(f"流式读取文件失败: {str(e)}")
+
+    sample = stats_.sample()
+    print(f"✅ 流式读取完成: {file_path}")
+    print(f"   数据形状: {stats_.n_rows} 行 × {len(stats_.columns or [])} 列（保留样本 {len(sample)} 行）")
+    return stats_.result(), sample, stats_.n_rows
+
+
+class IncrementalMoments:
+    """可增量合并的二阶矩充分统计量
+
+    成对统计量（按两列同时非缺失的行累加）用于与pandas一致的成对相关系数；
+    完整样本（所有列均非缺失）的均值和交叉积矩阵用于回归分析。
+    所有累加值减去首批数据的列均值以避免数值抵消。
+    """
+
+    def __init__(self, columns, pairwise=True):
+        import numpy as np
+        self.columns = list(columns)
+        self.pairwise = pairwise
+        p = len(self.columns)
+        self.shift = None
+        self.n_pair = np.zeros((p, p))
+        self.s_pair = np.zeros((p, p))  # s_pair[i, j] = Σ x_i（i、j均非缺失）
+        self.q_pair = np.zeros((p, p))  # q_pair[i, j] = Σ x_i²（i、j均非缺失）
+        self.c_pair = np.zeros((p, p))  # c_pair[i, j] = Σ x_i·x_j
+        self.n_complete = 0
+        self.sum_complete = np.zeros(p)
+        self.cross_complete = np.zeros((p, p))
+
+    def update(self, values, block_rows=100000):
+        """合并一批数值数据（n×p数组，缺失值为NaN）"""
+        import numpy as np
+        values = np.asarray(values, dtype=np.float64)
+        if self.shift is None:
+            with np.errstate(all='ignore'):
+                shift = np.nanmean(values, axis=0) if len(values) else np.zeros(len(self.columns))
+            self.shift = np.nan_to_num(shift)
+        # 分块累加，临时数组大小与批量无关
+        for start in range(0, len(values), block_rows):
+            x = values[start:start + block_rows] - self.shift
+            mask = ~np.isnan(x)
+            xz = np.where(mask, x, 0.0)
+            if self.pairwise:
+                m = mask.astype(np.float64)
+                self.n_pair += m.T @ m
+                self.s_pair += xz.T @ m
+                self.q_pair += (xz * xz).T @ m
+                self.c_pair += xz.T @ xz
+            complete = mask.all(axis=1)
+            xc = xz[complete]
+            self.n_complete += int(complete.sum())
+            self.sum_complete += xc.sum(axis=0)
+            self.cross_complete += xc.T @ xc
+
+    def corr(self):
+        """成对完整样本的Pearson相关系数矩阵（与DataFrame.corr()一致）"""
+        import numpy as np
+        n = self.n_pair
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cov = self.c_pair - self.s_pair * self.s_pair.T / n
+            var = self.q_pair - self.s_pair ** 2 / n
+            corr = cov / np.sqrt(var * var.T)
+        corr[n < 2] = np.nan
+        diag = np.diag(var).copy()
+        np.fill_diagonal(corr, np.where(diag > 0, 1.0, np.nan))
+        return np.clip(corr, -1.0, 1.0)
+
+    def complete_moments(self):
+        """完整样本的(行数, 均值, 中心化交叉积矩阵)"""
+        import numpy as np
+        n = self.n_complete
+        if n == 0:
+            return 0, np.full(len(self.columns), np.nan), np.full((len(self.columns),) * 2, np.nan)
+        mean_shifted = self.sum_complete / n
+        cross = self.cross_complete - np.outer(self.sum_complete, self.sum_complete) / n
+        return n, self.shift + mean_shifted, cross
+
+    def get_state(self):
+        """导出可持久化的状态"""
+        meta = {'columns': self.columns, 'n_complete': self.n_complete}
+        arrays = {name: getattr(self, name) for name in
+                  ('shift', 'n_pair', 's_pair', 'q_pair', 'c_pair', 'sum_complete', 'cross_complete')}
+        return meta, arrays
+
+    @classmethod
+    def from_state(cls, meta, arrays):
+        """从get_state导出的状态恢复"""
+        obj = cls(meta['columns'])
+        obj.n_complete = meta['n_complete']
+        for name in ('shift', 'n_pair', 's_pair', 'q_pair', 'c_pair', 'sum_complete', 'cross_complete'):
+            setattr(obj, name, arrays[name])
+        return obj
+
+
+def _split_columns(spec):
+    """把逗号分隔的列名参数解析为列表"""
+    if spec is None or isinstance(spec, (list, tuple)):
+        return spec
+    return [part.strip() for part in str(spec).split(',') if part.strip()]
+
+
+def resolve_regression_columns(columns, targets=None, drivers=None):
+    """确定回归的因变量和自变量
+
+    targets为'all'时每个数值列依次对其余所有列回归（返回('all', None)）；
+    未指定时沿用默认：首个数值列为因变量，其余为自变量；
+    只指定一方时，另一方取剩余的全部数值列。
+    """
+    targets, drivers = _split_columns(targets), _split_columns(drivers)
+    if targets == ['all']:
+        if drivers:
+            raise ValueError("--targets all 不能与 --drivers 同时使用")
+        return 'all', None
+    unknown = [col for col in (targets or []) + (drivers or []) if col not in columns]
+    if unknown:
+        raise ValueError(f"回归变量不是数值列: {', '.join(unknown)}")
+    if targets and drivers and set(targets) & set(drivers):
+        raise ValueError(f"变量不能同时作为因变量和自变量: {', '.join(sorted(set(targets) & set(drivers)))}")
+    if not targets:
+        targets = [col for col in columns if col not in drivers] if drivers else columns[:1]
+    if not drivers:
+        drivers = [col for col in columns if col not in targets]
+    return list(targets), list(drivers)
+
+
+def _regression_models(targets, row_labels, features, n, coef, se, intercept, intercept_se, syy, rss, dof):
+    """整理批量回归结果：每个因变量一组系数、标准误、t值和p值
+
+    coef等矩阵按(自变量行row_labels × 因变量列)排列，features[j]为第j个因变量实际使用的自变量。
+    """
+    import numpy as np
+    from scipy import stats
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t_values = coef / se
+        p_values = 2 * stats.t.sf(np.abs(t_values), dof)
+        intercept_t = intercept / intercept_se
+        intercept_p = 2 * stats.t.sf(np.abs(intercept_t), dof)
+        r2 = np.where(syy > 0, 1 - rss / syy, np.nan)
+        adj_r2 = 1 - (1 - r2) * (n - 1) / dof
+    models = {}
+    for j, target in enumerate(targets):
+        rows = [i for i, col in enumerate(row_labels) if col in features[j]]
+        models[target] = {
+            'features': list(features[j]),
+            'n': int(n),
+            'dof': int(dof),
+            'r2_score': float(r2[j]),
+            'adj_r2_score': float(adj_r2[j]),
+            'coefficients': {row_labels[i]: float(coef[i, j]) for i in rows},
+            'std_errors': {row_labels[i]: float(se[i, j]) for i in rows},
+            't_values': {row_labels[i]: float(t_values[i, j]) for i in rows},
+            'p_values': {row_labels[i]: float(p_values[i, j]) for i in rows},
+            'intercept': float(intercept[j]),
+            'intercept_std_error': float(intercept_se[j]),
+            'intercept_p_value': float(intercept_p[j])
+        }
+    return models
+
+
+def _inverse_factor(s):
+    """对称正定矩阵的Cholesky分解；奇异时退回伪逆。返回求解函数"""
+    import numpy as np
+    from scipy import linalg
+    try:
+        factor = linalg.cho_factor(s, check_finite=False)
+        return lambda b: linalg.cho_solve(factor, b, check_finite=False)
+    except linalg.LinAlgError:
+        pinv = np.linalg.pinv(s)
+        return lambda b: pinv @ b
+
+
+def regress_from_moments(columns, n, mean, cross, targets=None, drivers=None):
+    """批量线性回归：由完整样本的均值和中心化交叉积一次分解求解所有因变量
+
+    共享设计矩阵时对XᵀX做一次Cholesky分解，所有因变量的系数、标准误一起求解；
+    targets为'all'时利用交叉积矩阵的逆（精度矩阵）同时得到每列对其余各列的回归。
+    N个因变量的代价与一个因变量相近。结果保留首个因变量的顶层字段，全部结果在'models'中。
+    """
+    import numpy as np
+    columns = list(columns)
+    if len(columns) < 2 or n < 10:
+        return None
+    targets, drivers = resolve_regression_columns(columns, targets, drivers)
+    mean = np.asarray(mean, dtype=np.float64)
+    
+    if targets == 'all':
+        targets = columns
+        k = len(columns)
+        dof = n - k
+        if dof < 1:
+            return None
+        solve = _inverse_factor(cross)
+        prec = solve(np.eye(k))
+        pdiag = np.diag(prec)
+        # 列j对其余列回归：b_kj = -P_kj / P_jj，残差平方和 = 1 / P_jj
+        coef = -prec / pdiag[None, :]
+        np.fill_diagonal(coef, 0.0)
+        rss = 1.0 / pdiag
+        # 去掉第j行列后的逆矩阵对角线：P_kk - P_kj² / P_jj
+        inv_diag = pdiag[:, None] - prec ** 2 / pdiag[None, :]
+        pm = prec @ mean
+        quad = mean @ pm - 2 * mean * pm + pdiag * mean ** 2 - (pm - pdiag * mean) ** 2 / pdiag
+        intercept = mean - coef.T @ mean
+        syy = np.diag(cross)
+        row_labels = columns
+        features = [columns[:j] + columns[j + 1:] for j in range(k)]
+    else:
+        index = {col: i for i, col in enumerate(columns)}
+        d = [index[col] for col in drivers]
+        t = [index[col] for col in targets]
+        dof = n - len(d) - 1
+        if not d or dof < 1:
+            return None
+        solve = _inverse_factor(cross[np.ix_(d, d)])
+        sxy = cross[np.ix_(d, t)]
+        coef = solve(sxy)
+        rss = np.diag(cross)[t] - np.einsum('ij,ij->j', coef, sxy)
+        inv_diag = np.broadcast_to(np.diag(solve(np.eye(len(d))))[:, None], coef.shape)
+        md = mean[d]
+        quad = np.full(len(t), md @ solve(md))
+        intercept = mean[t] - md @ coef
+        syy = np.diag(cross)[t]
+        row_labels = drivers
+        features = [drivers] * len(targets)
+    
+    rss = np.maximum(rss, 0.0)
+    sigma2 = rss / dof
+    se = np.sqrt(np.maximum(inv_diag, 0.0) * sigma2[None, :])
+    intercept_se = np.sqrt(sigma2 * (1.0 / n + quad))
+    models = _regression_models(targets, row_labels, features, n, coef, se, intercept, intercept_se, syy, rss, dof)
+    
+    first = models[targets[0]]
+    return {
+        'target': targets[0],
+        'features': first['features'],
+        'r2_score': first['r2_score'],
+        'coefficients': first['coefficients'],
+        'intercept': first['intercept'],
+        'models': models
+    }
+
+
+def numeric_block(df, columns):
+    """按给定列取出float64数值矩阵，非数值内容视为缺失"""
+    import numpy as np
+    import pandas as pd
+    if not columns:
+        return np.empty((len(df), 0))
+    return np.column_stack([pd.to_numeric(df[col], errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+                            for col in columns])
+
+
+class AnalysisState:
+    """增量分析状态：持久化描述性统计、相关和回归的充分统计量
+
+    新数据追加时只处理新增行，报告可直接由状态重新生成。
+    """
+
+    VERSION = 1
+
+    def __init__(self, numeric_columns):
+        self.stats = StreamingDescriptiveStats(sample_rows=0)
+        self.moments = IncrementalMoments(numeric_columns)
+        self.sources = []
+
+    @classmethod
+    def from_dataframe(cls, df):
+        """以数据中的数值列创建空状态"""
+        import numpy as np
+        numeric_cols = df.select_dtypes(include=[np.number]).columns.tolist()
+        return cls(numeric_cols)
+
+    def update(self, df):
+        """合并新增数据行"""
+        missing_cols = [col for col in self.moments.columns if col not in df.columns]
+        if missing_cols:
+            raise ValueError(f"新增数据缺少状态中的数值列: {', '.join(map(str, missing_cols))}")
+        self.stats.update(df)
+        self.moments.update(numeric_block(df, self.moments.columns))
+
+    def has_source(self, file_hash):
+        return any(src['hash'] == file_hash for src in self.sources)
+
+    def add_source(self, path, file_hash, n_rows):
+        self.sources.append({'path': str(path), 'hash': file_hash, 'rows': int(n_rows),
+                             'time': datetime.now().strftime('%Y-%m-%d %H:%M:%S')})
+
+    def save(self, path):
+        """原子写入.npz状态文件"""
+        import numpy as np
+        stats_meta, stats_arrays = self.stats.get_state()
+        moments_meta, moments_arrays = self.moments.get_state()
+        meta = {'version': self.VERSION, 'stats': stats_meta, 'moments': moments_meta, 'sources': self.sources}
+        arrays = {f'stats_{k}': v for k, v in stats_arrays.items()}
+        arrays.update({f'moments_{k}': v for k, v in moments_arrays.items()})
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, meta=np.array(json.dumps(meta, ensure_ascii=False)), **arrays)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """读取.npz状态文件"""
+        import numpy as np
+        if not Path(path).exists():
+            raise FileNotFoundError(f"分析状态文件不存在: {path}")
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(str(data['meta']))
+            if meta.get('version') != cls.VERSION:
+                raise ValueError(f"分析状态文件版本不兼容: {meta.get('version')}")
+            stats_arrays = {k[len('stats_'):]: data[k] for k in data.files if k.startswith('stats_')}
+            moments_arrays = {k[len('moments_'):]: data[k] for k in data.files if k.startswith('moments_')}
+        obj = cls.__new__(cls)
+        obj.stats = StreamingDescriptiveStats.from_state(meta['stats'], stats_arrays)
+        obj.moments = IncrementalMoments.from_state(meta['moments'], moments_arrays)
+        obj.sources = meta['sources']
+        return obj
+
+    def results(self, targets=None, drivers=None, corr_threshold=0.5, corr_top_k=20):
+        """由状态生成描述性统计、相关、回归和因子分析结果（回归基于所有数值列均非缺失的行）"""
+        columns = self.moments.columns
+        models = ['descriptive']
+        results = {
+            'data_info': {
+                'n_samples': self.stats.n_rows,
+                'n_vars': len(self.stats.columns or []),
+                'n_batches': len(self.sources)
+            },
+            'descriptive': self.stats.result()
+        }
+        if len(columns) >= 2:
+            models.append('correlation')
+            results['correlation'] = correlation_result(columns, self.moments.corr(), self.moments.n_pair,
+                                                        corr_threshold, corr_top_k)
+            n, mean, cross = self.moments.complete_moments()
+            if n >= 30:
+                models.append('regression')
+                results['regression'] = regress_from_moments(columns, n, mean, cross, targets, drivers)
+            if len(columns) >= 5 and n >= 100:
+                models.append('factor')
+                results['factor'] = pca_from_moments(columns, n, cross)
+        results['models_used'] = models
+        return results
+
+    def chart_payloads(self):
+        """图表数据：分布图使用各列蓄水池样本，热力图使用状态中的相关矩阵"""
+        columns = [col for col in self.moments.columns if col in self.stats.reservoirs]
+        distribution = [(col, self.stats.reservoirs[col][1]) for col in columns[:4]]
+        correlation = (self.moments.columns, self.moments.corr()) if len(self.moments.columns) >= 2 else None
+        return distribution, correlation
+
+
+class NumericStore:
+    """磁盘上的数值列存储：values.f64为行优先的float64矩阵（缺失为NaN），meta.json记录列名、行数和数据来源
+
+    分析时按内存映射逐块读取，内存占用只取决于块大小，数据来源未变时直接复用。
+    同目录下的sample.pkl保存全部列的随机样本，供聚类、分类题等其余阶段使用。
+    """
+
+    VERSION = 1
+
+    def __init__(self, path, meta):
+        self.path = Path(path)
+        self.meta = meta
+
+    @property
+    def columns(self):
+        return self.meta['columns']
+
+    @property
+    def n_rows(self):
+        return self.meta['n_rows']
+
+    @property
+    def values(self):
+        """只读内存映射矩阵（行数 × 数值列数）"""
+        import numpy as np
+        if not self.n_rows or not self.columns:
+            return np.empty((self.n_rows, len(self.columns)))
+        return np.memmap(self.path / 'values.f64', dtype=np.float64, mode='r',
+                         shape=(self.n_rows, len(self.columns)))
+
+    def iter_blocks(self, block_bytes=STORE_BLOCK_BYTES):
+        """按行分块产出内存映射矩阵的切片"""
+        values = self.values
+        step = max(1, block_bytes // (8 * max(1, len(self.columns))))
+        for start in range(0, self.n_rows, step):
+            yield values[start:start + step]
+
+    def sample(self):
+        import pandas as pd
+        return pd.read_pickle(self.path / 'sample.pkl')
+
+    def scan(self):
+        """单遍逐块扫描，返回累加了描述性统计和二阶矩的AnalysisState"""
+        import pandas as pd
+        state = AnalysisState(self.columns)
+        for block in self.iter_blocks():
+            state.stats.update(pd.DataFrame(block, columns=self.columns, copy=False))
+            state.moments.update(block)
+        state.add_source(self.meta['source']['path'], self.meta['source']['hash'], self.n_rows)
+        return state
+
+    @classmethod
+    def open(cls, path):
+        """打开已有存储，版本不符或数据文件不完整时报错"""
+        path = Path(path)
+        meta_path = path / 'meta.json'
+        if not meta_path.exists():
+            raise FileNotFoundError(f"数值存储不存在: {path}")
+        meta = json.loads(meta_path.read_text(encoding='utf-8'))
+        if meta.get('version') != cls.VERSION:
+            raise ValueError(f"数值存储版本不兼容: {meta.get('version')}")
+        values_path = path / 'values.f64'
+        size = values_path.stat().st_size if values_path.exists() else 0
+        if size != 8 * meta['n_rows'] * len(meta['columns']):
+            raise ValueError(f"数值存储数据文件不完整: {values_path}")
+        return cls(path, meta)
+
+    @staticmethod
+    def check_target(path):
+        """检查存储路径可以被整体替换：不存在、空目录或已有的数值存储，否则报错以免删除其他文件"""
+        path = Path(path)
+        if not path.exists() or (path.is_dir() and not any(path.iterdir())):
+            return
+        try:
+            meta = json.loads((path / 'meta.json').read_text(encoding='utf-8'))
+            if isinstance(meta, dict) and 'version' in meta:
+                return
+        except (OSError, ValueError):
+            pass
+        raise ValueError(f"数值存储路径已存在且不是数值存储，请为 --store 指定专用目录: {path}")
+
+    @classmethod
+    def build(cls, path, chunks, source, sample_rows=100000):
+        """由数据块迭代器写入存储，返回(存储, 随机样本)
+
+        数值列以首个数据块为准，之后各块中的非数值内容记为缺失；
+        先写入临时目录，完成后整体替换旧存储（路径须为空目录或已有存储，见check_target）。
+        """
+        import shutil
+        import numpy as np
+        path = Path(path)
+        cls.check_target(path)
+        tmp_path = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        tmp_path.mkdir(parents=True)
+        # 只用于保留样本和各列缺失数、类型，数值统计在扫描存储时计算
+        stats_ = StreamingDescriptiveStats(quantile_sample=1, sample_rows=sample_rows)
+        columns = None
+        try:
+            with open(tmp_path / 'values.f64', 'wb') as f:
+                for chunk in chunks:
+                    if columns is None:
+                        columns = chunk.select_dtypes(include=[np.number]).columns.tolist()
+                    stats_.update(chunk)
+                    numeric_block(chunk, columns).tofile(f)
+            sample = stats_.sample()
+            sample.to_pickle(tmp_path / 'sample.pkl')
+            all_columns = stats_.columns or []
+            meta = {
+                'version': cls.VERSION,
+                'columns': columns or [],
+                'n_rows': stats_.n_rows,
+                'dtype': 'float64',
+                'source': source,
+                'sample_rows': sample_rows,
+                'dtypes': {col: str(stats_.dtypes[col]) for col in all_columns},
+                'missing': {col: int(stats_.missing[col]) for col in all_columns},
+                'created': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            }
+            (tmp_path / 'meta.json').write_text(json.dumps(meta, ensure_ascii=False, indent=2), encoding='utf-8')
+            shutil.rmtree(path, ignore_errors=True)
+            os.replace(tmp_path, path)
+        except BaseException:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            raise
+        return cls(path, meta), sample
+
+
+def compact_dtypes(df, max_category_ratio=0.5, verbose=True, numeric_text=False):
+    """加载后压缩数据类型，降低内存占用
+
+    - numeric_text为True时，全部为数字的文本列转为数值列（PDF/Word/OCR等文本来源的数据；
+      默认不转换，以免编号、邮编、电话等丢失前导零后被当作数值变量）
+    - 低基数文本列转为category
+    - 整数列向下转换为int8/int16等最小类型
+    - 浮点列在无损时转换为float32
+    """
+    import numpy as np
+    import pandas as pd
+    before = df.memory_usage(deep=True).sum()
+    compact = {}
+    for col in df.columns:
+        s = df[col]
+        if pd.api.types.is_object_dtype(s) or pd.api.types.is_string_dtype(s):
+            numeric = None
+            if numeric_text:
+                # 空白字符串视为缺失值
+                values = s.replace(r'^\s*$', np.nan, regex=True)
+                numeric = pd.to_numeric(values, errors='coerce')
+                n_valid = values.notna().sum()
+                if not n_valid or numeric.notna().sum() != n_valid:
+                    numeric = None
+            if numeric is not None:
+                s = numeric
+            elif s.nunique(dropna=True) <= max(1, len(s) * max_category_ratio):
+                s = s.astype('category')
+
+        if pd.api.types.is_bool_dtype(s) or isinstance(s.dtype, pd.CategoricalDtype):
+            pass
+        elif pd.api.types.is_integer_dtype(s):
+            s = pd.to_numeric(s, downcast='integer')
+        elif pd.api.types.is_float_dtype(s):
+            arr = s.to_numpy(dtype=np.float64)
+            # 无缺失值和inf、且在int64范围内的整数编码（如Likert量表）；2**63本身已超出int64
+            if (len(arr) and np.isfinite(arr).all() and np.abs(arr).max() < 2.0 ** 63
+                    and np.array_equal(arr, np.round(arr))):
+                s = pd.to_numeric(s.astype(np.int64), downcast='integer')
+            else:
+                f32 = s.astype(np.float32)
+                if np.array_equal(f32.to_numpy(dtype=np.float64), arr, equal_nan=True):
+                    s = f32
+        compact[col] = s
+
+    df = pd.DataFrame(compact, index=df.index)
+    after = df.memory_usage(deep=True).sum()
+    if verbose:
+        print(f"   数据类型压缩: 内存占用 {before / 1024 ** 2:.2f} MB → {after / 1024 ** 2:.2f} MB")
+    return df, {'memory_before': int(before), 'memory_after': int(after)}
+
+
+def load_old_plan(file_path, workers=None):
     """加载旧方案文件，支持多种格式"""
     file_path = Path(file_path)
     if not file_path.exists():
@@ -281,15 +1527,10 @@ def load_old_plan(file_path):
         elif ext == '.pdf':
             try:
                 import pdfplumber
-                content_parts = []
-                with pdfplumber.open(file_path) as pdf:
-                    for page in pdf.pages:
-                        text = page.extract_text()
-                        if text:
-                            content_parts.append(text)
-                return '\n\n'.join(content_parts)
             except ImportError:
                 raise ImportError("需要安装pdfplumber库: pip install pdfplumber")
+            page_texts = extract_pdf_pages(file_path, mode='text', workers=workers)
+            return '\n\n'.join(text for _, text in page_texts if text)
         elif ext in ['.png', '.jpg', '.jpeg']:
             try:
                 import pytesseract
@@ -320,16 +1561,19 @@ def load_old_plan(file_path):
 
 def select_analysis_model(df):
     """根据数据特征自动选择分析模型"""
+    import numpy as np
     n_samples = len(df)
     n_vars = len(df.columns)
     
     numeric_cols = df.select_dtypes(include=[np.number]).columns.tolist()
     n_numeric = len(numeric_cols)
+    n_likert = sum(likert_scale(df[col].to_numpy(dtype=np.float64, na_value=np.nan)) is not None
+                   for col in numeric_cols)
     
     print(f"\n📊 数据特征分析:")
     print(f"   样本数: {n_samples}")
     print(f"   变量数: {n_vars}")
-    print(f"   数值变量: {n_numeric}")
+    print(f"   数值变量: {n_numeric}（其中量表题 {n_likert}）")
     
     models = []
     
@@ -352,178 +1596,1220 @@ def select_analysis_model(df):
     if n_numeric >= 5 and n_samples >= 100:
         models.append('factor')
     
+    # 6. 分类题分析（有文本/分类列或量表题）
+    if n_vars > n_numeric or n_likert:
+        models.append('categorical')
+    
+    # 7. 显著性检验（变量对、分类题两两、按分组比较数值题）
+    if n_samples >= 30 and n_vars >= 2:
+        models.append('significance')
+    
     print(f"   推荐模型: {', '.join(models)}")
     return models
 
 
-def perform_descriptive_analysis(df):
-    """描述性统计分析"""
+def survey_weights(df, weight):
+    """取出设计权重列：缺失权重记为0，负权重或权重全为0时报错"""
+    import numpy as np
+    import pandas as pd
+    if weight not in df.columns:
+        raise ValueError(f"权重列不存在: {weight}")
+    weights = pd.to_numeric(df[weight], errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+    weights = np.nan_to_num(weights, nan=0.0)
+    if (weights < 0).any():
+        raise ValueError(f"权重列包含负数: {weight}")
+    if not weights.sum() > 0:
+        raise ValueError(f"权重列全为0或缺失: {weight}")
+    return weights
+
+
+def weighted_column_stats(values, mask, weights):
+    """各列非缺失样本的加权(权重和, 均值, 标准差, 有效样本量)
+
+    标准差为加权总体标准差，有效样本量为Kish近似 (Σw)² / Σw²。
+    """
+    import numpy as np
+    observed = (~mask) * weights[:, None]
+    filled = np.where(mask, 0.0, values)
+    sum_w = observed.sum(axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = (observed * filled).sum(axis=0) / sum_w
+        var = (observed * np.where(mask, 0.0, values - mean) ** 2).sum(axis=0) / sum_w
+        n_eff = sum_w ** 2 / (observed * weights[:, None]).sum(axis=0)
+    return sum_w, mean, np.sqrt(var), n_eff
+
+
+def bootstrap_sums(features, n_boot, seed=None, workers=None):
+    """批量自助法：对样本有放回重抽样n_boot次，返回每次重抽样下features各列之和，形状(n_boot, m)
+
+    每块重抽样一次生成“重抽样次数 × 样本数”的索引矩阵，用bincount转为计数矩阵后与features
+    做一次矩阵乘法；计数矩阵不超过BOOTSTRAP_CHUNK_ELEMENTS个元素。各块使用由seed派生的
+    独立随机流，结果与线程数和执行顺序无关，seed相同则结果可复现。
+    """
+    import numpy as np
+    n = len(features)
+    per_chunk = max(1, min(n_boot, BOOTSTRAP_CHUNK_ELEMENTS // max(n, 1)))
+    starts = list(range(0, n_boot, per_chunk))
+    streams = np.random.SeedSequence(seed).spawn(len(starts))
+    
+    def resample(start, stream):
+        size = min(per_chunk, n_boot - start)
+        rng = np.random.default_rng(stream)
+        index = rng.integers(0, n, size=(size, n)) + (np.arange(size) * n)[:, None]
+        counts = np.bincount(index.ravel(), minlength=size * n).reshape(size, n)
+        return counts.astype(np.float64) @ features
+    
+    workers = min(workers or os.cpu_count() or 1, len(starts))
+    if workers > 1:
+        from concurrent.futures import ThreadPoolExecutor
+        # 随机数生成和矩阵乘法都释放GIL
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            blocks = list(executor.map(resample, starts, streams))
+    else:
+        blocks = [resample(start, stream) for start, stream in zip(starts, streams)]
+    return np.vstack(blocks)
+
+
+def bootstrap_interval(estimates, level=None):
+    """按百分位数法由自助法估计值（每行一次重抽样）给出置信区间的(下限, 上限)"""
+    import numpy as np
+    level = level or BOOTSTRAP_CI_LEVEL
+    with np.errstate(invalid='ignore'):
+        low, high = np.nanpercentile(estimates, [50 * (1 - level), 50 * (1 + level)], axis=0)
+    return low, high
+
+
+def _pair_moment_features(values, mask, weights, pairs):
+    """变量对的加权矩特征：每对6列 w·v、w·v·x、w·v·y、w·v·x²、w·v·y²、w·v·x·y（v为两列均非缺失）
+
+    x、y先按整列均值中心化以减小舍入误差，features各列之和即可算出该对的相关系数。
+    """
+    import numpy as np
+    _, mean, _, _ = weighted_column_stats(values, mask, weights)
+    centered = np.where(mask, 0.0, values - mean)
+    observed = (~mask).astype(np.float64)
+    features = []
+    for i, j in pairs:
+        v = weights * observed[:, i] * observed[:, j]
+        x, y = centered[:, i], centered[:, j]
+        features += [v, v * x, v * y, v * x * x, v * y * y, v * x * y]
+    return np.column_stack(features) if features else np.empty((len(values), 0))
+
+
+def _pair_corr_from_sums(sums):
+    """由_pair_moment_features各列之和（最后一维每6个一组）计算相关系数"""
+    import numpy as np
+    s = sums.reshape(sums.shape[:-1] + (-1, 6))
+    w, sx, sy, sxx, syy, sxy = (s[..., k] for k in range(6))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mx, my = sx / w, sy / w
+        cov = sxy / w - mx * my
+        r = cov / np.sqrt((sxx / w - mx ** 2) * (syy / w - my ** 2))
+    return np.clip(r, -1.0, 1.0)
+
+
+class NumericMatrix:
+    """一次运行共享的数值矩阵：所有分析阶段复用同一份预处理结果
+
+    values为C连续的float64矩阵（缺失值为NaN），mask标记缺失位置，
+    complete标记所有数值列均非缺失的行。完整样本视图、标准化视图
+    和相关系数矩阵在首次使用时计算并缓存。
+    """
+
+    def __init__(self, columns, values, weights=None):
+        import numpy as np
+        self.columns = list(columns)
+        self.values = np.ascontiguousarray(values, dtype=np.float64)
+        self.mask = np.isnan(self.values)
+        self.complete = ~self.mask.any(axis=1)
+        self.weights = weights
+        self._cache = {}
+
+    @classmethod
+    def from_dataframe(cls, df, weight=None):
+        """weight为权重列名时该列不作为分析变量，相关系数和有效样本量按权重计算"""
+        import numpy as np
+        numeric_df = df.select_dtypes(include=[np.number])
+        weights = None
+        if weight is not None:
+            weights = survey_weights(df, weight)
+            numeric_df = numeric_df.drop(columns=[weight], errors='ignore')
+        values = numeric_df.to_numpy(dtype=np.float64, na_value=np.nan)
+        return cls(numeric_df.columns.tolist(), values, weights)
+
+    def fingerprint(self):
+        """数值矩阵内容指纹，用作分析结果缓存键"""
+        if 'fingerprint' not in self._cache:
+            h = hashlib.blake2b(digest_size=16)
+            h.update(json.dumps([str(col) for col in self.columns], ensure_ascii=False).encode())
+            h.update(str(self.values.shape).encode())
+            h.update(self.values.tobytes())
+            if self.weights is not None:
+                h.update(self.weights.tobytes())
+            self._cache['fingerprint'] = h.hexdigest()
+        return self._cache['fingerprint']
+
+    @property
+    def n_rows(self):
+        return self.values.shape[0]
+
+    @property
+    def n_cols(self):
+        return self.values.shape[1]
+
+    @property
+    def n_complete(self):
+        return int(self.complete.sum())
+
+    @property
+    def complete_values(self):
+        """完整样本视图（无缺失行）"""
+        if 'complete' not in self._cache:
+            self._cache['complete'] = self.values if self.complete.all() else self.values[self.complete]
+        return self._cache['complete']
+
+    @property
+    def scale_params(self):
+        """完整样本各列的(均值, 标准差)，与StandardScaler一致：总体标准差，常数列标准差记为1"""
+        if 'scale' not in self._cache:
+            values = self.complete_values
+            mean = values.mean(axis=0)
+            std = values.std(axis=0)
+            std[std == 0] = 1.0
+            self._cache['scale'] = (mean, std)
+        return self._cache['scale']
+
+    @property
+    def standardized(self):
+        """完整样本的标准化视图"""
+        if 'standardized' not in self._cache:
+            mean, std = self.scale_params
+            self._cache['standardized'] = (self.complete_values - mean) / std
+        return self._cache['standardized']
+
+    def complete_moments(self, columns=None):
+        """指定列均非缺失的样本的(行数, 均值, 中心化交叉积矩阵)"""
+        import numpy as np
+        if columns is None or list(columns) == self.columns:
+            values = self.complete_values
+        else:
+            idx = [self.columns.index(col) for col in columns]
+            rows = ~self.mask[:, idx].any(axis=1)
+            values = self.values[np.ix_(rows, idx)]
+        n = len(values)
+        if n == 0:
+            return 0, None, None
+        mean = values.mean(axis=0)
+        centered = values - mean
+        return n, mean, centered.T @ centered
+
+    def iter_standardized(self, block_rows):
+        """分块产出标准化后的完整样本（每块不少于block_rows行），不生成整块标准化矩阵"""
+        import numpy as np
+        mean, std = self.scale_params
+        values = self.complete_values
+        bounds = np.linspace(0, len(values), max(1, len(values) // block_rows) + 1).astype(int)
+        for start, stop in zip(bounds[:-1], bounds[1:]):
+            yield (values[start:stop] - mean) / std
+
+    def _weighted_pairwise(self):
+        """加权时成对完整样本的(相关系数矩阵, 有效样本量矩阵)，由几次矩阵乘法得到全部变量对的加权矩"""
+        import numpy as np
+        if 'weighted' not in self._cache:
+            w = self.weights[:, None]
+            observed = (~self.mask).astype(np.float64)
+            _, mean, _, _ = weighted_column_stats(self.values, self.mask, self.weights)
+            x = np.where(self.mask, 0.0, self.values - mean)
+            sum_w = (observed * w).T @ observed
+            sum_x = (x * w).T @ observed
+            sum_xx = (x * x * w).T @ observed
+            sum_xy = (x * w).T @ x
+            with np.errstate(divide='ignore', invalid='ignore'):
+                # mean_x[i, j]为变量i在(i, j)均非缺失的样本上的加权均值
+                mean_x = sum_x / sum_w
+                var_x = sum_xx / sum_w - mean_x ** 2
+                corr = (sum_xy / sum_w - mean_x * mean_x.T) / np.sqrt(var_x * var_x.T)
+                n_eff = sum_w ** 2 / ((observed * w * w).T @ observed)
+            self._cache['weighted'] = (np.clip(corr, -1.0, 1.0), n_eff)
+        return self._cache['weighted']
+
+    def corr(self):
+        """成对完整样本的Pearson相关系数矩阵（与DataFrame.corr()一致；有权重时为加权相关）"""
+        import numpy as np
+        if 'corr' not in self._cache:
+            if self.weights is not None:
+                corr = self._weighted_pairwise()[0]
+            elif self.mask.any():
+                moments = IncrementalMoments(self.columns)
+                moments.update(self.values)
+                corr = moments.corr()
+            else:
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    corr = np.atleast_2d(np.corrcoef(self.values, rowvar=False))
+                corr = np.clip(corr, -1.0, 1.0)
+            self._cache['corr'] = corr
+        return self._cache['corr']
+
+    def pair_counts(self):
+        """各变量对同时非缺失的样本数；无缺失时为标量。有权重时为Kish有效样本量"""
+        import numpy as np
+        if self.weights is not None:
+            return self._weighted_pairwise()[1]
+        if not self.mask.any():
+            return self.n_rows
+        if 'pair_counts' not in self._cache:
+            observed = (~self.mask).astype(np.float32)
+            self._cache['pair_counts'] = observed.T @ observed
+        return self._cache['pair_counts']
+
+    def prepare(self, models):
+        """预先计算选中模型需要的视图，避免并发阶段重复计算"""
+        if 'correlation' in models:
+            self.corr()
+            self.pair_counts()
+        if 'cluster' in models:
+            self.standardized
+        elif 'regression' in models or 'factor' in models:
+            self.scale_params
+        return self
+
+
+def prepare_numeric_matrix(df, models, fingerprint=False, weight=None):
+    """预处理阶段：构建共享数值矩阵并计算所选模型需要的视图
+
+    fingerprint为True时同时计算内容指纹（启用结果缓存时使用）；weight为权重列名。
+    """
+    matrix = NumericMatrix.from_dataframe(df, weight)
+    if fingerprint:
+        matrix.fingerprint()
+    return matrix.prepare(models)
+
+
+def _cached_stage(cache, name, func, df, *deps, reads_columns=False):
+    """带结果缓存的分析阶段：输入数据和参数未变时直接返回缓存结果
+
+    依赖共享数值矩阵的阶段以矩阵指纹为键，其余阶段以整个数据框的指纹为键；
+    reads_columns为True的阶段（如显著性检验还读取分类题列）另加矩阵之外各列的指纹；
+    阶段绑定的参数（含weight、n_boot、seed）计入缓存键，并行度等不影响结果的参数不计入。
+    未指定种子的自助法每次结果不同，不读写缓存。
+    """
+    params = {k: v for k, v in getattr(func, 'keywords', {}).items() if k != 'workers'}
+    if params.get('n_boot') and params.get('seed') is None:
+        return func(df, *deps)
+    fingerprint = deps[0].fingerprint() if deps else dataframe_fingerprint(df)
+    if deps and reads_columns:
+        fingerprint += dataframe_fingerprint(df.drop(columns=deps[0].columns))
+    key = cache.key(name, fingerprint, params)
+    entry = cache.get(key)
+    if entry is not None:
+        print(f"   ♻️  命中结果缓存: {name}")
+        return entry['value']
+    result = func(df, *deps)
+    cache.put(key, result)
+    return result
+
+
+def perform_descriptive_analysis(df, weight=None, n_boot=0, seed=None, workers=None):
+    """描述性统计分析
+
+    weight为权重列名时附加各数值列的加权均值、标准差和有效样本量；n_boot大于0时
+    用批量自助法给出均值的置信区间（有权重时为加权均值）。
+    """
+    import numpy as np
     results = {
         'summary': df.describe().to_dict(),
         'missing': df.isnull().sum().to_dict(),
         'dtypes': df.dtypes.astype(str).to_dict()
     }
+    if weight is None and not n_boot:
+        return results
+    
+    matrix = NumericMatrix.from_dataframe(df, weight)
+    weights = matrix.weights if weight is not None else np.ones(matrix.n_rows)
+    sum_w, mean, std, n_eff = weighted_column_stats(matrix.values, matrix.mask, weights)
+    if weight is not None:
+        results['weight'] = weight
+        results['weighted'] = {col: {'mean': float(mean[i]), 'std': float(std[i]), 'n_eff': float(n_eff[i])}
+                               for i, col in enumerate(matrix.columns)}
+    if n_boot and matrix.n_cols:
+        # 每列两组特征：w·(x-均值) 和 w·非缺失，重抽样均值 = 均值 + 两者之比
+        observed = ~matrix.mask * weights[:, None]
+        features = np.hstack([observed * np.where(matrix.mask, 0.0, matrix.values - mean), observed])
+        sums = bootstrap_sums(features, n_boot, seed, workers)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            estimates = mean + sums[:, :matrix.n_cols] / sums[:, matrix.n_cols:]
+        low, high = bootstrap_interval(estimates)
+        results['mean_ci'] = {col: (float(low[i]), float(high[i])) for i, col in enumerate(matrix.columns)}
+        results['bootstrap'] = {'n_boot': n_boot, 'seed': seed, 'level': BOOTSTRAP_CI_LEVEL}
     return results
 
 
-def perform_correlation_analysis(df):
-    """相关性分析"""
-    numeric_df = df.select_dtypes(include=[np.number])
-    if len(numeric_df.columns) < 2:
-        return None
+def correlation_p_values(r, n):
+    """相关系数的双侧t检验p值（r、n可为任意形状的数组，n为有效样本数）"""
+    import numpy as np
+    from scipy import stats
+    dof = np.asarray(n, dtype=np.float64) - 2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = r * np.sqrt(dof / np.maximum(1 - r ** 2, 0))
+        return np.where(dof > 0, 2 * stats.t.sf(np.abs(t), np.maximum(dof, 1)), np.nan)
+
+
+def strong_correlation_pairs(columns, corr, pair_counts, threshold=0.5, top_k=20):
+    """在上三角中向量化筛选强相关变量对，并批量计算p值
+
+    返回|r|不低于threshold的变量对，按|r|降序最多top_k个（top_k为None时不限）；
+    pair_counts为各变量对的有效样本数（标量或p×p矩阵），用于t检验的自由度。
+    """
+    import numpy as np
+    rows, cols = np.triu_indices(len(columns), k=1)
+    r = corr[rows, cols]
+    abs_r = np.abs(r)
+    selected = np.flatnonzero(abs_r >= threshold)  # NaN比较为False，自动排除
+    if top_k is not None and len(selected) > top_k:
+        selected = selected[np.argpartition(-abs_r[selected], top_k - 1)[:top_k]]
+    selected = selected[np.argsort(-abs_r[selected], kind='stable')]
     
-    corr_matrix = numeric_df.corr()
+    r = r[selected]
+    n = np.broadcast_to(np.asarray(pair_counts, dtype=np.float64), corr.shape)[rows[selected], cols[selected]]
+    p_values = correlation_p_values(r, n)
+    return [{'var1': columns[i], 'var2': columns[j], 'r': float(v), 'p_value': float(pv), 'n': int(cnt)}
+            for i, j, v, pv, cnt in zip(rows[selected], cols[selected], r, p_values, n)]
+
+
+def correlation_result(columns, corr, pair_counts, threshold=0.5, top_k=20):
+    """相关性分析结果：完整矩阵以紧凑数组保存（columns + values），附强相关变量对"""
+    import numpy as np
     return {
-        'matrix': corr_matrix.to_dict(),
-        'strong_pairs': []
+        'columns': list(columns),
+        'values': np.asarray(corr, dtype=np.float64),
+        'threshold': threshold,
+        'strong_pairs': strong_correlation_pairs(columns, corr, pair_counts, threshold, top_k)
     }
 
 
-def perform_regression_analysis(df):
-    """回归分析"""
-    numeric_df = df.select_dtypes(include=[np.number])
-    if len(numeric_df.columns) < 2:
+def perform_correlation_analysis(df, matrix=None, threshold=0.5, top_k=20, weight=None, n_boot=0, seed=None,
+                                 workers=None):
+    """相关性分析
+
+    有权重时为加权相关系数，p值按Kish有效样本量计算；n_boot大于0时用批量自助法
+    给出各强相关变量对相关系数的置信区间。
+    """
+    import numpy as np
+    matrix = matrix or NumericMatrix.from_dataframe(df, weight)
+    if matrix.n_cols < 2:
+        return None
+    result = correlation_result(matrix.columns, matrix.corr(), matrix.pair_counts(), threshold, top_k)
+    if n_boot and result['strong_pairs']:
+        index = {col: i for i, col in enumerate(matrix.columns)}
+        pairs = [(index[p['var1']], index[p['var2']]) for p in result['strong_pairs']]
+        weights = matrix.weights if matrix.weights is not None else np.ones(matrix.n_rows)
+        features = _pair_moment_features(matrix.values, matrix.mask, weights, pairs)
+        low, high = bootstrap_interval(_pair_corr_from_sums(bootstrap_sums(features, n_boot, seed, workers)))
+        for pair, lo, hi in zip(result['strong_pairs'], low, high):
+            pair['ci'] = (float(lo), float(hi))
+        result['bootstrap'] = {'n_boot': n_boot, 'seed': seed, 'level': BOOTSTRAP_CI_LEVEL}
+    if weight is not None:
+        result['weight'] = weight
+    return result
+
+
+def perform_regression_analysis(df, matrix=None, targets=None, drivers=None):
+    """回归分析
+
+    默认以首个数值列为因变量、其余为自变量；targets/drivers可指定多个因变量和共享的自变量，
+    targets='all'时每个数值列依次对其余列回归。使用完整样本的交叉积批量求解。
+    """
+    matrix = matrix or NumericMatrix.from_dataframe(df)
+    if matrix.n_cols < 2:
         return None
     
-    # 选择第一个数值列作为因变量
-    y_col = numeric_df.columns[0]
-    X_cols = numeric_df.columns[1:].tolist()
+    target_cols, driver_cols = resolve_regression_columns(matrix.columns, targets, drivers)
+    used = matrix.columns if target_cols == 'all' else target_cols + driver_cols
+    # 处理缺失值：使用所用变量均非缺失的样本
+    n, mean, cross = matrix.complete_moments(used)
+    if n < 10:
+        return None
+    return regress_from_moments(used, n, mean, cross,
+                                'all' if target_cols == 'all' else target_cols, driver_cols)
+
+
+def parse_k_range(spec):
+    """解析聚类数范围，如 "2-8" 或 "4"，返回升序的k列表"""
+    if spec is None or isinstance(spec, (list, tuple, range)):
+        return spec
+    spec = str(spec).strip()
+    try:
+        if '-' in spec:
+            low, high = (int(part) for part in spec.split('-', 1))
+        else:
+            low = high = int(spec)
+    except ValueError:
+        raise ValueError(f"无效的聚类数范围: {spec}")
+    if low < 2 or high < low:
+        raise ValueError(f"无效的聚类数范围: {spec}（k需不小于2）")
+    return list(range(low, high + 1))
+
+
+def _fit_kmeans(X, k, large, seed=42):
+    """拟合单个k的聚类模型：小样本用完整KMeans，大样本用MiniBatchKMeans"""
+    if large:
+        from sklearn.cluster import MiniBatchKMeans
+        model = MiniBatchKMeans(n_clusters=k, random_state=seed, n_init=3,
+                                batch_size=CLUSTER_BATCH_SIZE)
+    else:
+        from sklearn.cluster import KMeans
+        model = KMeans(n_clusters=k, random_state=seed, n_init=10)
+    return model.fit(X)
+
+
+def _score_k(X, k, score_index):
+    """k扫描任务：拟合单个k并在子样本上计算轮廓系数和惯性"""
+    from sklearn.metrics import silhouette_score
+    model = _fit_kmeans(X, k, large=False)
+    labels = model.labels_
+    sub_labels = labels[score_index] if score_index is not None else labels
+    sub_X = X[score_index] if score_index is not None else X
+    if len(set(sub_labels.tolist())) < 2:
+        silhouette = float('nan')
+    else:
+        silhouette = float(silhouette_score(sub_X, sub_labels))
+    return k, silhouette, float(model.inertia_), model
+
+
+def perform_cluster_analysis(df, matrix=None, k_range=None, workers=None):
+    """聚类分析
+
+    在k_range（默认2到min(8, 样本数/10)）内并行扫描聚类数，按子样本上的轮廓系数选择k。
+    样本量超过CLUSTER_FULL_BATCH_MAX时，扫描在随机子样本上进行，
+    最终模型使用MiniBatchKMeans在全部样本上拟合，耗时随样本数线性增长。
+    """
+    import numpy as np
+    from concurrent.futures import ThreadPoolExecutor
+
+    matrix = matrix or NumericMatrix.from_dataframe(df)
+    if matrix.n_cols < 2:
+        return None
     
-    if not X_cols:
+    # 处理缺失值
+    n_complete = matrix.n_complete
+    if n_complete < 10:
         return None
     
-    from sklearn.linear_model import LinearRegression
-    from sklearn.metrics import r2_score
+    # 标准化
+    X_scaled = matrix.standardized
     
-    X = numeric_df[X_cols]
-    y = numeric_df[y_col]
+    k_values = parse_k_range(k_range) or list(range(2, min(8, n_complete // 10) + 1))
+    k_values = [k for k in k_values if k < n_complete]
+    if not k_values:
+        return None
     
-    # 处理缺失值
-    mask = ~(X.isnull().any(axis=1) | y.isnull())
-    X_clean = X[mask]
-    y_clean = y[mask]
+    large = n_complete > CLUSTER_FULL_BATCH_MAX
+    rng = np.random.default_rng(42)
+    # 大样本时k扫描只在随机子样本上进行
+    X_sweep = X_scaled[np.sort(rng.choice(n_complete, CLUSTER_FULL_BATCH_MAX, replace=False))] if large else X_scaled
+    score_index = None
+    if len(X_sweep) > CLUSTER_SILHOUETTE_SAMPLE:
+        score_index = np.sort(rng.choice(len(X_sweep), CLUSTER_SILHOUETTE_SAMPLE, replace=False))
     
-    if len(X_clean) < 10:
-        return None
+    workers = min(workers or os.cpu_count() or 1, len(k_values))
+    if workers > 1:
+        # sklearn在计算密集部分释放GIL，线程池避免复制矩阵；
+        # 各k已并行，KMeans内部的OpenMP/BLAS线程限制为1，避免线程数超过CPU核数
+        from threadpoolctl import threadpool_limits
+        with threadpool_limits(limits=1), ThreadPoolExecutor(max_workers=workers) as executor:
+            sweep = list(executor.map(lambda k: _score_k(X_sweep, k, score_index), k_values))
+    else:
+        sweep = [_score_k(X_sweep, k, score_index) for k in k_values]
     
-    model = LinearRegression()
-    model.fit(X_clean, y_clean)
-    y_pred = model.predict(X_clean)
-    r2 = r2_score(y_clean, y_pred)
+    scored = [item for item in sweep if not np.isnan(item[1])]
+    best_k, _, _, best_model = max(scored, key=lambda item: item[1]) if scored else sweep[0]
+    if large:
+        best_model = _fit_kmeans(X_scaled, best_k, large=True)
+        clusters = best_model.predict(X_scaled)
+    else:
+        clusters = best_model.labels_
+    clusters = clusters.astype(np.min_scalar_type(best_k - 1))
     
     return {
-        'target': y_col,
-        'features': X_cols,
-        'r2_score': float(r2),
-        'coefficients': {col: float(coef) for col, coef in zip(X_cols, model.coef_)},
-        'intercept': float(model.intercept_)
+        'n_clusters': int(best_k),
+        'cluster_labels': clusters,
+        'cluster_sizes': np.bincount(clusters, minlength=best_k).tolist(),
+        'inertia': float(best_model.inertia_),
+        'k_scores': {int(k): {'silhouette': sil, 'inertia': inertia} for k, sil, inertia, _ in sweep},
+        'method': 'minibatch' if large else 'kmeans'
     }
 
 
-def perform_cluster_analysis(df):
-    """聚类分析"""
-    numeric_df = df.select_dtypes(include=[np.number])
-    if len(numeric_df.columns) < 2:
+def _factor_result(columns, method, n_components, ratios, components, variances):
+    """整理因子分析结果：前n_components个成分的载荷与累计方差解释曲线"""
+    import numpy as np
+    ratios = np.asarray(ratios, dtype=np.float64)
+    # 载荷 = 特征向量 × sqrt(特征值)，即变量与成分的相关系数
+    loadings = components[:n_components].T * np.sqrt(np.maximum(variances[:n_components], 0))
+    return {
+        'method': method,
+        'n_components': int(n_components),
+        'explained_variance_ratio': [float(v) for v in ratios[:n_components]],
+        'total_variance_explained': float(ratios[:n_components].sum()),
+        'variance_curve': [float(v) for v in np.cumsum(ratios)],
+        'loadings': {col: [float(v) for v in row] for col, row in zip(columns, loadings)}
+    }
+
+
+def pca_from_moments(columns, n, cross, n_components=3):
+    """由完整样本的中心化交叉积矩阵计算标准化PCA（相关矩阵特征分解）
+
+    只需p×p的充分统计量，可配合流式分块读取或增量分析状态使用，不需要原始数据矩阵。
+    """
+    import numpy as np
+    if len(columns) < 3 or n < 10:
+        return None
+    var = np.diag(cross).copy()
+    keep = var > 0
+    columns = [col for col, k in zip(columns, keep) if k]
+    if len(columns) < 3:
+        return None
+    cross = cross[np.ix_(keep, keep)]
+    std = np.sqrt(var[keep])
+    corr = cross / np.outer(std, std)
+    eigvals, eigvecs = np.linalg.eigh(corr)
+    order = np.argsort(eigvals)[::-1]
+    eigvals, eigvecs = np.maximum(eigvals[order], 0), eigvecs[:, order]
+    # 特征向量符号与sklearn一致：绝对值最大的分量为正
+    signs = np.sign(eigvecs[np.abs(eigvecs).argmax(axis=0), np.arange(eigvecs.shape[1])])
+    eigvecs *= np.where(signs == 0, 1, signs)
+    n_curve = min(len(columns), PCA_CURVE_COMPONENTS)
+    return _factor_result(columns, 'correlation', min(n_components, len(columns)),
+                          eigvals[:n_curve] / eigvals.sum(), eigvecs[:, :n_curve].T, eigvals[:n_curve])
+
+
+def select_pca_method(n_rows, n_cols, n_components):
+    """按矩阵形状选择PCA实现：高瘦矩阵分块增量拟合，宽矩阵随机化SVD，其余完整SVD"""
+    if n_rows > PCA_INCREMENTAL_MIN_ROWS:
+        return 'incremental'
+    if n_cols >= PCA_RANDOMIZED_MIN_COLS and n_components < 0.8 * min(n_rows, n_cols):
+        return 'randomized'
+    return 'full'
+
+
+def perform_factor_analysis(df, matrix=None, n_components=3):
+    """因子分析（标准化数据的主成分分析）
+
+    根据完整样本的形状自动选择完整SVD、随机化SVD或分块增量PCA，
+    返回前n_components个成分的载荷以及前PCA_CURVE_COMPONENTS个成分的累计方差解释曲线。
+    """
+    matrix = matrix or NumericMatrix.from_dataframe(df)
+    if matrix.n_cols < 3:
         return None
     
-    # 处理缺失值
-    numeric_df = numeric_df.dropna()
-    if len(numeric_df) < 10:
+    n_complete = matrix.n_complete
+    if n_complete < 10:
         return None
     
-    # 标准化
-    scaler = StandardScaler()
-    X_scaled = scaler.fit_transform(numeric_df)
+    from sklearn.decomposition import PCA, IncrementalPCA
+    
+    n_curve = min(matrix.n_cols, n_complete, max(n_components, PCA_CURVE_COMPONENTS))
+    method = select_pca_method(n_complete, matrix.n_cols, n_curve)
+    if method == 'incremental':
+        # 逐块标准化并拟合，每块行数不少于成分数
+        pca = IncrementalPCA(n_components=n_curve)
+        for block in matrix.iter_standardized(max(PCA_BATCH_ROWS, n_curve)):
+            pca.partial_fit(block)
+    else:
+        pca = PCA(n_components=n_curve, svd_solver=method, random_state=42)
+        pca.fit(matrix.standardized)
     
-    # K-means聚类
-    n_clusters = min(5, len(numeric_df) // 10)
-    if n_clusters < 2:
+    return _factor_result(matrix.columns, method, min(n_components, n_curve), pca.explained_variance_ratio_,
+                          pca.components_, pca.explained_variance_)
+
+
+def likert_scale(values):
+    """判断数值列是否为李克特量表题：取值为0~10的整数且至少3个等级
+
+    返回量表的(最低分, 最高分)，不是量表题时返回None。量表两端按1（或出现0时为0）
+    和观测到的最高分确定。
+    """
+    import numpy as np
+    finite = values[~np.isnan(values)]
+    if not len(finite):
+        return None
+    low, high = finite.min(), finite.max()
+    if low < 0 or high > LIKERT_MAX_POINT or not np.array_equal(finite, np.round(finite)):
+        return None
+    low = 0 if low == 0 else 1
+    if high - low < 2:
         return None
+    return int(low), int(high)
+
+
+class CategoricalColumn:
+    """整数编码的分类题：codes取值0..n_codes-1，缺失编码为n_codes
+
+    单选题和量表题的编码即选项编号；多选题的编码是答案组合（去重后的原始文本）的编号，
+    indicator为“组合 × 选项”的0/1矩阵，计数时先按组合统计再与indicator相乘，
+    拆分文本只在去重后的组合上进行，与样本数无关。
+    """
+
+    def __init__(self, name, kind, labels, codes, n_codes=None, indicator=None, scale=None):
+        import numpy as np
+        self.name = name
+        self.kind = kind
+        self.labels = list(labels)
+        self.n_codes = len(self.labels) if n_codes is None else n_codes
+        self.codes = np.ascontiguousarray(codes, dtype=np.int64)
+        self.indicator = indicator
+        self.scale = scale
+
+    @classmethod
+    def from_codes(cls, name, kind, labels, codes, **kwargs):
+        """由pandas风格的编码（缺失为-1）构建"""
+        import numpy as np
+        n_codes = kwargs.pop('n_codes', len(labels))
+        codes = np.asarray(codes, dtype=np.int64)
+        return cls(name, kind, labels, np.where(codes < 0, n_codes, codes), n_codes=n_codes, **kwargs)
+
+    def frequencies(self, weights=None):
+        """各选项人数和缺失人数（给出weights时为加权人数）"""
+        import numpy as np
+        joint = np.bincount(self.codes, weights=weights, minlength=self.n_codes + 1)
+        counts = joint[:-1] if self.indicator is None else joint[:-1] @ self.indicator
+        return counts, joint[-1]
+
+    def crosstab(self, offsets, n_groups, stride, out=None, weights=None):
+        """按分组统计各选项人数，返回(counts, bases)
+
+        offsets为分组编码乘以stride（缺失分组编码为n_groups），stride不小于n_codes+1，
+        同一分组列下各题共用，分组编码只需换算一次。counts形状为(n_groups, 选项数)，
+        bases为各组作答人数（多选题中选项人数之和可能超过作答人数）。
+        """
+        import numpy as np
+        joint = np.bincount(np.add(offsets, self.codes, out=out), weights=weights, minlength=(n_groups + 1) * stride)
+        joint = joint.reshape(n_groups + 1, stride)[:n_groups, :self.n_codes]
+        bases = joint.sum(axis=1)
+        if self.indicator is not None:
+            joint = joint @ self.indicator
+        return joint, bases
+
+
+def _split_multi_select(name, values, sep):
+    """多选题：对去重后的答案组合拆分选项，构建组合到选项的0/1矩阵"""
+    import numpy as np
+    import pandas as pd
+    codes, uniques = pd.factorize(values)
+    options = {}
+    combos = []
+    for answer in uniques:
+        picked = [opt.strip() for opt in str(answer).split(sep) if opt.strip()]
+        combos.append([options.setdefault(opt, len(options)) for opt in picked])
+    indicator = np.zeros((len(uniques), len(options)), dtype=np.int64)
+    for row, picked in enumerate(combos):
+        indicator[row, picked] = 1
+    # 选项按被选次数降序排列
+    order = np.argsort(-(np.bincount(codes[codes >= 0], minlength=len(uniques)) @ indicator), kind='stable')
+    labels = list(options)
+    return CategoricalColumn.from_codes(name, 'multi', [labels[i] for i in order], codes,
+                                        n_codes=len(uniques), indicator=indicator[:, order])
+
+
+def categorical_columns(df, multi_sep=None, max_levels=None):
+    """把数据框中可作分类分析的列编码为CategoricalColumn列表
+
+    - category/文本/布尔列：选项数不超过max_levels时作为单选题
+    - 指定multi_sep且取值中含分隔符的文本列：作为多选题拆分
+    - 数值列：识别为李克特量表题（编码为分值减最低分，未出现的分值也保留）
+    """
+    import numpy as np
+    import pandas as pd
+    max_levels = max_levels or CATEGORICAL_MAX_LEVELS
+    columns = []
+    for col in df.columns:
+        s = df[col]
+        if isinstance(s.dtype, pd.CategoricalDtype):
+            if len(s.cat.categories) <= max_levels and not (
+                    multi_sep and s.cat.categories.astype(str).str.contains(multi_sep, regex=False).any()):
+                columns.append(CategoricalColumn.from_codes(col, 'single', [str(c) for c in s.cat.categories],
+                                                            s.cat.codes.to_numpy()))
+                continue
+        elif pd.api.types.is_numeric_dtype(s) and not pd.api.types.is_bool_dtype(s):
+            values = s.to_numpy(dtype=np.float64, na_value=np.nan)
+            scale = likert_scale(values)
+            if scale is not None:
+                low, high = scale
+                codes = np.where(np.isnan(values), -1, values - low).astype(np.int64)
+                columns.append(CategoricalColumn.from_codes(col, 'likert', [str(v) for v in range(low, high + 1)],
+                                                            codes, scale=scale))
+            continue
+        if multi_sep and s.astype(str).str.contains(multi_sep, regex=False).any():
+            columns.append(_split_multi_select(col, s.astype(object).where(s.notna()), multi_sep))
+            continue
+        codes, uniques = pd.factorize(s, sort=True)
+        if 0 < len(uniques) <= max_levels:
+            columns.append(CategoricalColumn.from_codes(col, 'single', [str(u) for u in uniques], codes))
+    return columns
+
+
+def resolve_banners(columns, spec):
+    """解析--banner：逗号分隔的列名，"A*B"表示两列（或多列）的组合交叉
+
+    返回[(名称, 分组编码, 分组标签, 分组数)]，分组编码的缺失值为分组数。组合交叉只保留实际出现的组合。
+    """
+    import numpy as np
+    by_name = {str(col.name): col for col in columns}
+    banners = []
+    for item in _split_columns(spec) or []:
+        parts = [part.strip() for part in item.split('*') if part.strip()]
+        missing = [part for part in parts if part not in by_name]
+        if missing:
+            raise ValueError(f"交叉分析列不存在或不是分类列: {', '.join(missing)}")
+        multi = [part for part in parts if by_name[part].kind == 'multi']
+        if multi:
+            raise ValueError(f"多选题不能作为交叉分析列: {', '.join(multi)}")
+        first = by_name[parts[0]]
+        codes, labels, n_groups = first.codes, first.labels, first.n_codes
+        for part in parts[1:]:
+            col = by_name[part]
+            valid = (codes < n_groups) & (col.codes < col.n_codes)
+            combined = np.where(valid, codes * col.n_codes + col.codes, n_groups * col.n_codes)
+            labels = [f'{a} / {b}' for a in labels for b in col.labels]
+            n_groups *= col.n_codes
+            # 压缩为实际出现的组合，缺失仍编码为分组数
+            present = np.flatnonzero(np.bincount(combined, minlength=n_groups + 1)[:n_groups])
+            remap = np.full(n_groups + 1, len(present), dtype=np.int64)
+            remap[present] = np.arange(len(present))
+            codes, labels, n_groups = remap[combined], [labels[i] for i in present], len(present)
+        banners.append((' × '.join(parts), codes, list(labels), n_groups))
+    return banners
+
+
+def _likert_summary(counts, scale):
+    """量表题均值和首尾两项占比（Top2/Bottom2），counts最后一维为各分值人数"""
+    import numpy as np
+    n = counts.sum(axis=-1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = (counts @ np.arange(scale[0], scale[1] + 1)) / n
+        top2 = counts[..., -2:].sum(axis=-1) / n
+        bottom2 = counts[..., :2].sum(axis=-1) / n
+    return mean, top2, bottom2
+
+
+def perform_categorical_analysis(df, banners=None, multi_sep=None, weight=None):
+    """分类题分析：频数表、李克特量表Top2/Bottom2、多选题拆分和按分组列的交叉表
+
+    全部基于整数编码数组的bincount计算，不逐行处理；banners为--banner参数，
+    multi_sep为多选题选项分隔符，weight为权重列名（人数均为加权人数）。
+    """
+    import numpy as np
+    weights = survey_weights(df, weight) if weight is not None else None
+    columns = categorical_columns(df.drop(columns=[weight]) if weight is not None else df, multi_sep)
+    if not columns:
+        return None
+    total = len(df) if weights is None else weights.sum()
+    questions = []
+    for col in columns:
+        counts, n_missing = col.frequencies(weights)
+        n_valid = total - n_missing
+        question = {
+            'name': col.name,
+            'kind': col.kind,
+            'labels': col.labels,
+            'counts': counts,
+            'n_valid': n_valid,
+            'n_missing': n_missing
+        }
+        if col.kind == 'likert':
+            mean, top2, bottom2 = _likert_summary(counts, col.scale)
+            question.update(scale=col.scale, mean=float(mean), top2=float(top2), bottom2=float(bottom2))
+        questions.append(question)
     
-    kmeans = KMeans(n_clusters=n_clusters, random_state=42, n_init=10)
-    clusters = kmeans.fit_predict(X_scaled)
+    crosstabs = []
+    stride = max(col.n_codes for col in columns) + 1
+    buffer = np.empty(len(df), dtype=np.int64)
+    for name, groups, labels, n_groups in resolve_banners(columns, banners):
+        banner_columns = set(name.split(' × '))
+        offsets = groups * stride
+        tables = []
+        for col in columns:
+            if str(col.name) in banner_columns:
+                continue
+            counts, bases = col.crosstab(offsets, n_groups, stride, out=buffer, weights=weights)
+            table = {'name': col.name, 'kind': col.kind, 'labels': col.labels, 'counts': counts, 'bases': bases}
+            if col.kind == 'likert':
+                table['scale'] = col.scale
+                table['mean'], table['top2'], _ = _likert_summary(counts, col.scale)
+            tables.append(table)
+        crosstabs.append({'banner': name, 'labels': labels, 'tables': tables})
     
+    return {'questions': questions, 'crosstabs': crosstabs, 'multi_sep': multi_sep, 'weight': weight}
+
+
+def benjamini_hochberg(p_values):
+    """Benjamini-Hochberg校正后的q值；NaN（无法检验）保持为NaN，不计入检验数"""
+    import numpy as np
+    p = np.asarray(p_values, dtype=np.float64)
+    q = np.full_like(p, np.nan)
+    valid = np.flatnonzero(~np.isnan(p))
+    if not len(valid):
+        return q
+    order = valid[np.argsort(p[valid], kind='stable')]
+    ranked = p[order] * len(valid) / np.arange(1, len(valid) + 1)
+    q[order] = np.minimum(np.minimum.accumulate(ranked[::-1])[::-1], 1.0)
+    return q
+
+
+def chi_square_tests(columns):
+    """单选题两两卡方独立性检验
+
+    对每一列A，把其后所有列的编码按偏移拼接，一次bincount得到A与这些列的全部列联表
+    （按行分块，每块不超过SIGNIFICANCE_BLOCK_ELEMENTS个元素）；期望频数、卡方值和自由度
+    再用np.add.reduceat按列分段一次算出。返回(列A序号, 列B序号, 卡方值, 自由度, 样本数, Cramér's V)数组。
+    """
+    import numpy as np
+    n_rows = len(columns[0].codes)
+    widths = np.array([col.n_codes + 1 for col in columns])
+    bounds = np.concatenate([[0], np.cumsum(widths)])
+    parts = []
+    for i, col in enumerate(columns[:-1]):
+        rest = columns[i + 1:]
+        seg = bounds[i + 1:-1] - bounds[i + 1]
+        total = bounds[-1] - bounds[i + 1]
+        width = col.n_codes + 1
+        joint = np.zeros(width * total, dtype=np.int64)
+        step = max(1, SIGNIFICANCE_BLOCK_ELEMENTS // len(rest))
+        for start in range(0, n_rows, step):
+            stop = min(n_rows, start + step)
+            index = np.column_stack([other.codes[start:stop] for other in rest]) + seg
+            index += col.codes[start:stop, None] * total
+            joint += np.bincount(index.ravel(), minlength=width * total)
+        # 去掉A的缺失行和各列B的缺失位置
+        observed = joint.reshape(width, total)[:-1].astype(np.float64)
+        observed[:, seg + widths[i + 1:] - 1] = 0
+        row_totals = np.add.reduceat(observed, seg, axis=1)
+        col_totals = observed.sum(axis=0)
+        n = row_totals.sum(axis=0)
+        owner = np.repeat(np.arange(len(rest)), widths[i + 1:])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            expected = row_totals[:, owner] * col_totals / n[owner]
+            cells = np.where(expected > 0, (observed - expected) ** 2 / expected, 0.0)
+        chi2 = np.add.reduceat(cells, seg, axis=1).sum(axis=0)
+        n_levels_a = (row_totals > 0).sum(axis=0)
+        n_levels_b = np.add.reduceat((col_totals > 0).astype(np.int64), seg)
+        dof = (n_levels_a - 1) * (n_levels_b - 1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cramers_v = np.sqrt(chi2 / (n * (np.minimum(n_levels_a, n_levels_b) - 1)))
+        parts.append(np.column_stack([np.full(len(rest), i), np.arange(i + 1, len(columns)), chi2, dof, n,
+                                      cramers_v]))
+    return np.vstack(parts) if parts else np.empty((0, 6))
+
+
+def group_moment_features(values, mask):
+    """组间比较所需的逐行特征 [非缺失, 中心化值, 中心化值²]（n × 3p），所有分组列共用
+
+    先按列均值中心化，减小平方和的舍入误差；缺失位置记为0。
+    """
+    import numpy as np
+    observed = (~mask).astype(np.float64)
+    filled = np.where(mask, 0.0, values)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.nan_to_num(filled.sum(axis=0) / observed.sum(axis=0))
+    centered = (filled - mean) * observed
+    return np.hstack([observed, centered, centered * centered])
+
+
+def group_comparison_tests(group, features):
+    """按一个分组列比较所有数值题：两组时为Welch t检验，多组时为单因素方差分析
+
+    features为group_moment_features的结果；分组的0/1指示矩阵与之做一次矩阵乘法，
+    得到各组各题的样本数、和与平方和，全部题目同时计算。
+    返回(检验类型, 统计量, 自由度1, 自由度2, p值, eta², 样本数)，除检验类型外均为长度等于题目数的数组；
+    某题有效组数不足时对应结果为NaN。
+    """
+    import numpy as np
+    from scipy import stats
+    present = np.flatnonzero(np.bincount(group.codes, minlength=group.n_codes + 1)[:-1])
+    indicator = (group.codes == present[:, None]).astype(np.float64)
+    n_g, s_g, ss_g = np.split(indicator @ features, 3, axis=1)
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        n = n_g.sum(axis=0)
+        k = (n_g > 0).sum(axis=0)
+        mean_g = s_g / n_g
+        grand = s_g.sum(axis=0) / n
+        ss_between = np.nansum(n_g * (mean_g - grand) ** 2, axis=0)
+        ss_total = ss_g.sum(axis=0) - n * grand ** 2
+        eta2 = ss_between / ss_total
+        if len(present) == 2:
+            var_g = (ss_g - n_g * mean_g ** 2) / (n_g - 1)
+            se2 = var_g / n_g
+            statistic = (mean_g[0] - mean_g[1]) / np.sqrt(se2.sum(axis=0))
+            dof1 = np.ones_like(n)
+            dof2 = se2.sum(axis=0) ** 2 / (se2 ** 2 / (n_g - 1)).sum(axis=0)
+            p_values = 2 * stats.t.sf(np.abs(statistic), dof2)
+        else:
+            dof1, dof2 = k - 1, n - k
+            statistic = (ss_between / dof1) / ((ss_total - ss_between) / dof2)
+            p_values = stats.f.sf(statistic, dof1, dof2)
+    invalid = (k < 2) | ~(dof2 > 0)
+    p_values = np.where(invalid, np.nan, p_values)
+    return 't' if len(present) == 2 else 'anova', statistic, dof1, dof2, p_values, eta2, n
+
+
+def _significance_family(records, p_values, alpha):
+    """一族检验：BH校正后按p值排序，保留最显著的SIGNIFICANCE_MAX_ROWS条"""
+    import numpy as np
+    q_values = benjamini_hochberg(p_values)
+    tested = ~np.isnan(q_values)
+    order = np.flatnonzero(tested)[np.argsort(p_values[tested], kind='stable')][:SIGNIFICANCE_MAX_ROWS]
+    tests = []
+    for idx in order:
+        record = records(idx)
+        record.update(p_value=float(p_values[idx]), q_value=float(q_values[idx]))
+        tests.append(record)
     return {
-        'n_clusters': int(n_clusters),
-        'cluster_labels': clusters.tolist(),
-        'inertia': float(kmeans.inertia_)
+        'n_tests': int(tested.sum()),
+        'n_significant': int((q_values[tested] < alpha).sum()),
+        'tests': tests
     }
 
 
-def perform_factor_analysis(df):
-    """因子分析"""
-    numeric_df = df.select_dtypes(include=[np.number])
-    if len(numeric_df.columns) < 3:
-        return None
+def perform_significance_tests(df, matrix=None, alpha=0.05, multi_sep=None, weight=None):
+    """显著性检验：所有数值变量对的相关检验、单选题两两卡方检验、数值题按分组的t检验/方差分析
+
+    三族检验各自做Benjamini-Hochberg校正（q值 < alpha视为显著）。相关检验沿用相关分析的
+    系数（有权重时为加权相关和有效样本量），卡方检验和组间比较不加权；weight为权重列名，
+    该列不作为分类题参与检验。
+    """
+    import numpy as np
+    from scipy import stats
+    matrix = matrix or NumericMatrix.from_dataframe(df, weight)
+    results = {'alpha': alpha, 'weight': weight, 'families': {}}
     
-    numeric_df = numeric_df.dropna()
-    if len(numeric_df) < 10:
-        return None
+    if matrix.n_cols >= 2:
+        rows, cols = np.triu_indices(matrix.n_cols, k=1)
+        r = matrix.corr()[rows, cols]
+        n = np.broadcast_to(np.asarray(matrix.pair_counts(), dtype=np.float64), (matrix.n_cols,) * 2)[rows, cols]
+        results['families']['correlation'] = _significance_family(
+            lambda i: {'var1': matrix.columns[rows[i]], 'var2': matrix.columns[cols[i]], 'r': float(r[i]),
+                       'n': int(n[i])},
+            correlation_p_values(r, n), alpha)
     
-    # PCA降维
-    scaler = StandardScaler()
-    X_scaled = scaler.fit_transform(numeric_df)
+    columns = categorical_columns(df.drop(columns=[weight]) if weight is not None else df, multi_sep)
+    single = [col for col in columns if col.kind == 'single']
+    if len(single) >= 2:
+        tests = chi_square_tests(single)
+        with np.errstate(invalid='ignore'):
+            p_values = np.where(tests[:, 3] > 0, stats.chi2.sf(tests[:, 2], np.maximum(tests[:, 3], 1)), np.nan)
+        results['families']['chi_square'] = _significance_family(
+            lambda i: {'var1': single[int(tests[i, 0])].name, 'var2': single[int(tests[i, 1])].name,
+                       'chi2': float(tests[i, 2]), 'dof': int(tests[i, 3]), 'n': int(tests[i, 4]),
+                       'cramers_v': float(tests[i, 5])},
+            p_values, alpha)
     
-    pca = PCA(n_components=min(3, len(numeric_df.columns)))
-    pca.fit(X_scaled)
+    groups = [col for col in single if 2 <= col.n_codes <= SIGNIFICANCE_MAX_GROUPS]
+    if groups and matrix.n_cols:
+        features = group_moment_features(matrix.values, matrix.mask)
+        blocks = [group_comparison_tests(group, features) for group in groups]
+        labels = [(group.name, item, block[0]) for group, block in zip(groups, blocks) for item in matrix.columns]
+        statistic, dof1, dof2, p_values, eta2, n = (np.concatenate(parts) for parts in
+                                                    zip(*(block[1:] for block in blocks)))
+        results['families']['group'] = _significance_family(
+            lambda i: {'group': labels[i][0], 'item': labels[i][1], 'test': labels[i][2],
+                       'statistic': float(statistic[i]), 'dof1': float(dof1[i]), 'dof2': float(dof2[i]),
+                       'eta2': float(eta2[i]), 'n': int(n[i])},
+            p_values, alpha)
     
-    return {
-        'n_components': int(pca.n_components_),
-        'explained_variance_ratio': [float(v) for v in pca.explained_variance_ratio_],
-        'total_variance_explained': float(sum(pca.explained_variance_ratio_))
-    }
+    return results if results['families'] else None
+
+
+@lru_cache(maxsize=None)
+def _setup_matplotlib():
+    """按需导入matplotlib并设置中文字体和绘图样式（每个进程执行一次）"""
+    import matplotlib
+    matplotlib.use('Agg')  # 非交互式后端
+    import matplotlib.style
+
+    # 设置绘图样式（与seaborn的whitegrid一致，无需导入seaborn）
+    for style in ('seaborn-v0_8-whitegrid', 'seaborn-whitegrid'):
+        if style in matplotlib.style.available:
+            matplotlib.style.use(style)
+            break
+    # 设置中文字体
+    matplotlib.rcParams['font.sans-serif'] = ['Arial Unicode MS', 'SimHei', 'DejaVu Sans']
+    matplotlib.rcParams['axes.unicode_minus'] = False
+    return matplotlib
+
+
+@lru_cache(maxsize=None)
+def _get_seaborn():
+    """按需导入seaborn（仅热力图使用）"""
+    _setup_matplotlib()
+    import seaborn as sns
+    sns.set_style("whitegrid")
+    sns.set_palette("husl")
+    return sns
 
 
-def generate_charts(df, output_dir, html_output_path):
-    """生成可视化图表"""
-    charts = {}
-    numeric_df = df.select_dtypes(include=[np.number])
+def _new_figure(figsize):
+    """使用面向对象的Figure API创建图表，不依赖pyplot全局状态"""
+    _setup_matplotlib()
+    from matplotlib.figure import Figure
+    return Figure(figsize=figsize)
+
+
+def _json_safe(values):
+    """NaN/inf转为None，保证输出为合法JSON"""
+    import numpy as np
+    arr = np.asarray(values, dtype=np.float64)
+    return [[None if not np.isfinite(v) else float(v) for v in row] for row in np.atleast_2d(arr)]
+
+
+def _distribution_spec(payload):
+    """分布图的客户端图表数据（直方图分箱计数）"""
+    import numpy as np
+    panels = []
+    for col, values in payload:
+        counts, edges = np.histogram(values, bins=20) if len(values) else (np.array([]), np.array([]))
+        panels.append({'title': f'{col} 分布', 'xlabel': str(col), 'ylabel': '频数',
+                       'edges': [float(e) for e in edges], 'counts': [int(c) for c in counts]})
+    return {'type': 'histogram', 'panels': panels}
+
+
+def _correlation_spec(payload):
+    """热力图的客户端图表数据"""
+    columns, matrix = payload
+    return {'type': 'heatmap', 'title': '变量相关性热力图',
+            'columns': [str(c) for c in columns], 'values': _json_safe(matrix)}
+
+
+def render_distribution_chart(payload, path, chart_format='png'):
+    """绘制数值变量分布图（2×2直方图）"""
+    if chart_format == 'json':
+        spec = _distribution_spec(payload)
+        Path(path).write_text(json.dumps(spec, ensure_ascii=False), encoding='utf-8')
+        return spec
+
+    fig = _new_figure((12, 10))
+    axes = fig.subplots(2, 2).flatten()
+    for i, (col, values) in enumerate(payload[:len(axes)]):
+        axes[i].hist(values, bins=20, edgecolor='black')
+        axes[i].set_title(f'{col} 分布', fontsize=12)
+        axes[i].set_xlabel(col)
+        axes[i].set_ylabel('频数')
+    
+    # 隐藏多余的子图
+    for i in range(len(payload), len(axes)):
+        axes[i].axis('off')
+    
+    fig.tight_layout()
+    fig.savefig(path, dpi=150, format=chart_format)
+    return None
+
+
+def render_correlation_heatmap(payload, path, chart_format='png'):
+    """绘制变量相关性热力图"""
+    if chart_format == 'json':
+        spec = _correlation_spec(payload)
+        Path(path).write_text(json.dumps(spec, ensure_ascii=False), encoding='utf-8')
+        return spec
+
+    import pandas as pd
+    columns, matrix = payload
+    sns = _get_seaborn()
+    fig = _new_figure((10, 8))
+    ax = fig.add_subplot()
+    corr = pd.DataFrame(matrix, index=columns, columns=columns)
+    sns.heatmap(corr, annot=True, fmt='.2f', cmap='coolwarm', center=0,
+               square=True, linewidths=1, cbar_kws={"shrink": .8}, ax=ax)
+    ax.set_title('变量相关性热力图', fontsize=14, pad=20)
+    fig.tight_layout()
+    fig.savefig(path, dpi=150, format=chart_format)
+    return None
+
+
+def _render_chart_job(renderer, payload, path, chart_format):
+    """工作进程：渲染单个图表"""
+    return renderer(payload, path, chart_format)
+
+
+def generate_charts(df, output_dir, html_output_path, chart_format='png', workers=None, matrix=None, cache=None):
+    """生成可视化图表：数值变量分布图，以及至少两个数值变量时的相关性热力图
+
+    每个图表只接收绘图所需的小块数据，在进程池中独立渲染；
+    chart_format为svg时输出矢量图，为json时只输出客户端渲染用的图表数据，不做栅格化。
+    matrix为共享的NumericMatrix时直接复用其数值和相关系数矩阵；cache为ResultCache时复用已渲染的图表。
+    """
+    matrix = matrix or NumericMatrix.from_dataframe(df)
+    distribution, correlation = None, None
+    # 1. 数值变量分布图
+    if matrix.n_cols > 0:
+        distribution = [(col, matrix.values[~matrix.mask[:, i], i]) for i, col in enumerate(matrix.columns[:4])]
+    # 2. 相关性热力图
+    if matrix.n_cols >= 2:
+        correlation = (matrix.columns, matrix.corr())
+    return render_charts(distribution, correlation, html_output_path, chart_format, workers, cache)
+
+
+def render_charts(distribution, correlation, html_output_path, chart_format='png', workers=None, cache=None):
+    """按图表数据渲染分布图和相关性热力图，数据为None的图表跳过
+
+    cache为ResultCache时以图表数据指纹和格式为键缓存渲染结果，命中的图表直接写出文件。
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    if chart_format not in CHART_FORMATS:
+        raise ValueError(f"不支持的图表格式: {chart_format}")
+    charts = {'format': chart_format}
     
     # 计算相对路径
     html_dir = Path(html_output_path).parent
     charts_dir = html_dir / 'charts'
     charts_dir.mkdir(exist_ok=True)
     
-    # 1. 数值变量分布图
-    if len(numeric_df.columns) > 0:
-        fig, axes = plt.subplots(2, 2, figsize=(12, 10))
-        axes = axes.flatten()
-        
-        for i, col in enumerate(numeric_df.columns[:4]):
-            if i < len(axes):
-                axes[i].hist(numeric_df[col].dropna(), bins=20, edgecolor='black')
-                axes[i].set_title(f'{col} 分布', fontsize=12)
-                axes[i].set_xlabel(col)
-                axes[i].set_ylabel('频数')
-        
-        # 隐藏多余的子图
-        for i in range(len(numeric_df.columns), len(axes)):
-            axes[i].axis('off')
-        
-        plt.tight_layout()
-        dist_path = charts_dir / 'distribution_chart.png'
-        plt.savefig(dist_path, dpi=150, bbox_inches='tight')
-        plt.close()
-        # 使用相对路径
-        charts['distribution'] = f'charts/{dist_path.name}'
+    jobs = {}
+    if distribution:
+        jobs['distribution'] = (render_distribution_chart, distribution, 'distribution_chart')
+    if correlation is not None:
+        jobs['correlation'] = (render_correlation_heatmap, correlation, 'correlation_heatmap')
+    
+    all_tasks = {name: (renderer, payload, charts_dir / f'{stem}.{chart_format}')
+                 for name, (renderer, payload, stem) in jobs.items()}
+    tasks, cached_specs, cache_keys = dict(all_tasks), {}, {}
+    if cache is not None:
+        for name, (_, payload, path) in all_tasks.items():
+            cache_keys[name] = cache.key(f'chart:{name}', _payload_fingerprint(payload), {'format': chart_format})
+            entry = cache.get(cache_keys[name])
+            if entry is not None:
+                path.write_bytes(entry['value']['data'])
+                cached_specs[name] = entry['value']['spec']
+                del tasks[name]
+        if cached_specs:
+            print(f"   ♻️  命中图表缓存: {', '.join(cached_specs)}")
+    workers = min(workers or os.cpu_count() or 1, len(tasks))
+    if workers > 1 and chart_format != 'json':
+        with ProcessPoolExecutor(max_workers=workers, mp_context=_process_context()) as executor:
+            futures = {name: executor.submit(_render_chart_job, renderer, payload, str(path), chart_format)
+                       for name, (renderer, payload, path) in tasks.items()}
+            specs = {name: future.result() for name, future in futures.items()}
+    else:
+        specs = {name: renderer(payload, path, chart_format)
+                 for name, (renderer, payload, path) in tasks.items()}
+    if cache is not None:
+        for name, (_, _, path) in tasks.items():
+            cache.put(cache_keys[name], {'data': path.read_bytes(), 'spec': specs[name]})
+    specs.update(cached_specs)
     
-    # 2. 相关性热力图
-    if len(numeric_df.columns) >= 2:
-        fig, ax = plt.subplots(figsize=(10, 8))
-        corr = numeric_df.corr()
-        sns.heatmap(corr, annot=True, fmt='.2f', cmap='coolwarm', center=0,
-                   square=True, linewidths=1, cbar_kws={"shrink": .8}, ax=ax)
-        ax.set_title('变量相关性热力图', fontsize=14, pad=20)
-        plt.tight_layout()
-        corr_path = charts_dir / 'correlation_heatmap.png'
-        plt.savefig(corr_path, dpi=150, bbox_inches='tight')
-        plt.close()
+    for name, (_, _, path) in all_tasks.items():
         # 使用相对路径
-        charts['correlation'] = f'charts/{corr_path.name}'
-    
+        charts[name] = f'charts/{path.name}'
+    if chart_format == 'json':
+        charts['specs'] = specs
     return charts
 
 
+def _evaluate_old_plan_stage(analysis_results, old_plan_content):
+    """阶段调度用：参数顺序适配run_stage_graph"""
+    return evaluate_old_plan(old_plan_content, analysis_results)
+
+
 def evaluate_old_plan(old_plan_content, analysis_results):
     """评估旧方案"""
     evaluation = {
@@ -561,10 +2847,25 @@ def evaluate_old_plan(old_plan_content, analysis_results):
     return evaluation
 
 
-def generate_html_report(analysis_results, charts, old_plan_eval, title, output_path):
-    """生成HTML报告"""
-    
-    html_template = """
+REPORT_TEMPLATE = """
+{%- macro paged_table(name, table) -%}
+{%- if table.rows -%}
+<div class="paged-table" data-table="{{ name }}" data-page-size="{{ page_size }}">
+    <table>
+        <thead><tr>{% for h in table.headers %}<th>{{ h }}</th>{% endfor %}</tr></thead>
+        <tbody>
+        {%- for row in table.rows[:page_size] %}
+            <tr>{% for cell in row %}<td>{{ cell }}</td>{% endfor %}</tr>
+        {%- endfor %}
+        </tbody>
+    </table>
+    {%- if table.rows|length > page_size %}
+    <div class="pager"></div>
+    <script type="application/json" id="table-data-{{ name }}">{{ table.rows|tojson }}</script>
+    {%- endif %}
+</div>
+{%- endif -%}
+{%- endmacro -%}
 <!DOCTYPE html>
 <html lang="zh-CN">
 <head>
@@ -666,6 +2967,35 @@ def generate_html_report(analysis_results, charts, old_plan_eval, title, output_
         .section {
             margin: 30px 0;
         }
+        .pager {
+            display: flex;
+            align-items: center;
+            gap: 10px;
+            margin: -10px 0 20px;
+        }
+        .pager button {
+            padding: 4px 12px;
+            border: 1px solid #3498db;
+            background: white;
+            color: #3498db;
+            border-radius: 4px;
+            cursor: pointer;
+        }
+        .pager button:disabled {
+            opacity: 0.4;
+            cursor: default;
+        }
+        .js-chart {
+            display: flex;
+            flex-wrap: wrap;
+            justify-content: center;
+            gap: 20px;
+        }
+        .js-chart svg {
+            border: 1px solid #ddd;
+            border-radius: 5px;
+            background: white;
+        }
         code {
             background: #f4f4f4;
             padding: 2px 6px;
@@ -682,6 +3012,15 @@ def generate_html_report(analysis_results, charts, old_plan_eval, title, output_
             <p><strong>生成时间:</strong> {{ generation_time }}</p>
             <p><strong>数据样本数:</strong> {{ data_info.n_samples }}</p>
             <p><strong>变量数量:</strong> {{ data_info.n_vars }}</p>
+            {% if data_info.memory_before %}
+            <p><strong>内存占用:</strong> {{ "%.2f"|format(data_info.memory_before / 1048576) }} MB → {{ "%.2f"|format(data_info.memory_after / 1048576) }} MB（数据类型压缩后）</p>
+            {% endif %}
+            {% if data_info.n_sampled %}
+            <p><strong>流式模式:</strong> 描述性统计{{ '与因子分析' if 'factor' in models_used }}基于全部数据单遍计算（分位数为近似值），其余模型与图表基于 {{ data_info.n_sampled }} 行随机样本</p>
+            {% endif %}
+            {% if data_info.n_batches %}
+            <p><strong>增量模式:</strong> 结果由已保存的分析状态合并 {{ data_info.n_batches }} 批数据得到（新增 {{ data_info.n_appended }} 行；分位数为近似值，分布图基于随机样本）</p>
+            {% endif %}
             <p><strong>使用的分析模型:</strong> {{ ', '.join(models_used) }}</p>
         </div>
 
@@ -692,15 +3031,22 @@ def generate_html_report(analysis_results, charts, old_plan_eval, title, output_
 
         <div class="section">
             <h2>📈 描述性统计</h2>
-            <p>以下是各变量的基本统计信息：</p>
-            <!-- 描述性统计表格将在这里插入 -->
+            <p>以下是各变量的基本统计信息{{ '（分位数为近似值）' if descriptive_approximate }}：</p>
+            {% if descriptive_results.weight %}<p>加权统计按权重列 <code>{{ descriptive_results.weight }}</code> 计算，有效样本量为Kish近似 (Σw)²/Σw²。</p>{% endif %}
+            {% if descriptive_results.bootstrap %}<p>置信区间由 {{ descriptive_results.bootstrap.n_boot }} 次自助法重抽样按百分位数法得到{% if descriptive_results.bootstrap.seed is not none %}（随机种子 {{ descriptive_results.bootstrap.seed }}）{% endif %}。</p>{% endif %}
+            {{ paged_table('descriptive', tables.descriptive) }}
         </div>
 
         {% if charts.distribution %}
         <div class="section">
             <h2>📉 数据分布可视化</h2>
             <div class="chart-container">
-                <img src="{{ charts.distribution }}" alt="数据分布图">
+                {% if charts.format == 'json' %}
+                <div class="js-chart" data-chart="distribution"></div>
+                <script type="application/json" id="chart-data-distribution">{{ charts.specs.distribution|tojson }}</script>
+                {% else %}
+                <img src="{{ charts.distribution }}" alt="数据分布图" loading="lazy" decoding="async">
+                {% endif %}
             </div>
         </div>
         {% endif %}
@@ -709,25 +3055,85 @@ def generate_html_report(analysis_results, charts, old_plan_eval, title, output_
         <div class="section">
             <h2>🔥 相关性分析</h2>
             <div class="chart-container">
-                <img src="{{ charts.correlation }}" alt="相关性热力图">
+                {% if charts.format == 'json' %}
+                <div class="js-chart" data-chart="correlation"></div>
+                <script type="application/json" id="chart-data-correlation">{{ charts.specs.correlation|tojson }}</script>
+                {% else %}
+                <img src="{{ charts.correlation }}" alt="相关性热力图" loading="lazy" decoding="async">
+                {% endif %}
             </div>
         </div>
         {% endif %}
 
+        {% if correlation_results and correlation_results.strong_pairs %}
+        <div class="section">
+            <h2>🔗 强相关变量对（|r| ≥ {{ correlation_results.threshold }}）</h2>
+            {% if correlation_results.weight %}<p>相关系数按权重列 <code>{{ correlation_results.weight }}</code> 加权计算。</p>{% endif %}
+            {{ paged_table('strong_pairs', tables.strong_pairs) }}
+        </div>
+        {% endif %}
+        
         {% if regression_results %}
         <div class="section">
             <h2>📐 回归分析结果</h2>
-            <p><strong>目标变量:</strong> {{ regression_results.target }}</p>
-            <p><strong>R² 得分:</strong> {{ "%.3f"|format(regression_results.r2_score) }}</p>
-            <h3>系数:</h3>
+            {{ paged_table('regression_summary', tables.regression_summary) }}
+            <h3>回归系数</h3>
+            {{ paged_table('regression_coefficients', tables.regression_coefficients) }}
+        </div>
+        {% endif %}
+        
+        {% if cluster_results %}
+        <div class="section">
+            <h2>🧩 聚类分析</h2>
+            <p><strong>聚类数:</strong> {{ cluster_results.n_clusters }}（{{ '小批量K-means' if cluster_results.method == 'minibatch' else 'K-means' }}，按轮廓系数选择）</p>
+            <p><strong>各类样本数:</strong> {{ cluster_results.cluster_sizes|join(' / ') }}</p>
             <ul>
-                {% for feature, coef in regression_results.coefficients.items() %}
-                <li><code>{{ feature }}</code>: {{ "%.4f"|format(coef) }}</li>
+                {% for k, score in cluster_results.k_scores.items() %}
+                <li>k={{ k }}: 轮廓系数 {{ "%.3f"|format(score.silhouette) }}，惯性 {{ "%.1f"|format(score.inertia) }}</li>
                 {% endfor %}
             </ul>
         </div>
         {% endif %}
-
+        
+        {% if factor_results %}
+        <div class="section">
+            <h2>🧮 因子分析</h2>
+            <p><strong>前 {{ factor_results.n_components }} 个主成分累计解释方差:</strong> {{ "%.1f"|format(factor_results.total_variance_explained * 100) }}%</p>
+            <p><strong>累计方差解释曲线:</strong> {% for v in factor_results.variance_curve %}{{ "%.1f"|format(v * 100) }}%{% if not loop.last %} → {% endif %}{% endfor %}</p>
+            {{ paged_table('loadings', tables.loadings) }}
+        </div>
+        {% endif %}
+        
+        {% if categorical_results %}
+        <div class="section">
+            <h2>🗂️ 分类题分析</h2>
+            <h3>频数分布</h3>
+            {% if categorical_results.multi_sep %}<p>多选题（选项以“{{ categorical_results.multi_sep }}”分隔）的百分比以作答人数为基数，合计可能超过100%。</p>{% endif %}
+            {{ paged_table('frequencies', tables.frequencies) }}
+            {% if tables.likert.rows %}
+            <h3>量表题 Top2 / Bottom2</h3>
+            {{ paged_table('likert', tables.likert) }}
+            {% endif %}
+            {% for crosstab in tables.crosstabs %}
+            <h3>交叉分析: {{ crosstab.banner }}</h3>
+            {{ paged_table(crosstab.name, crosstab.table) }}
+            {% endfor %}
+        </div>
+        {% endif %}
+        
+        {% if significance_results %}
+        <div class="section">
+            <h2>🧪 显著性检验</h2>
+            <p>每族检验分别做Benjamini-Hochberg校正，q值 &lt; {{ significance_results.alpha }} 视为显著；表中按p值升序列出。</p>
+            {% if significance_results.weight %}<p>相关检验按权重列 <code>{{ significance_results.weight }}</code> 加权（有效样本量为Kish近似）；卡方检验和组间比较未加权，按原始人数计算。</p>{% endif %}
+            {% for family in tables.significance %}
+            <h3>{{ family.title }}</h3>
+            <p>共 {{ family.n_tests }} 项检验，显著 <strong>{{ family.n_significant }}</strong> 项{% if family.n_listed < family.n_tests %}（列出最显著的 {{ family.n_listed }} 项）{% endif %}。</p>
+            {{ paged_table(family.name, family.table) }}
+            {% endfor %}
+        </div>
+        {% endif %}
+        
         {% if old_plan_eval %}
         <div class="section">
             <h2>🔍 旧方案评估</h2>
@@ -765,100 +3171,1329 @@ def generate_html_report(analysis_results, charts, old_plan_eval, title, output_
                 <li>定期更新数据，持续跟踪分析</li>
             </ul>
         </div>
+        
+        {% if profile %}
+        <div class="section">
+            <details>
+                <summary><strong>⏱️ 性能剖析（--profile）</strong>：墙钟 {{ "%.2f"|format(profile.total_wall_time) }}s，CPU {{ "%.2f"|format(profile.total_cpu_time) }}s</summary>
+                <table>
+                    <tr><th>阶段</th><th>墙钟(s)</th><th>CPU(s)</th><th>峰值RSS(MB)</th><th>RSS增长(MB)</th><th>分配峰值(MB)</th><th>净分配(MB)</th></tr>
+                    {% for r in profile.stages %}
+                    <tr><td>{{ r.stage }}</td><td>{{ "%.3f"|format(r.wall_time) }}</td><td>{{ "%.3f"|format(r.cpu_time) }}</td>
+                        <td>{{ "%.1f"|format(r.peak_rss / 1048576) if r.peak_rss is not none else '-' }}</td>
+                        <td>{{ "%.1f"|format(r.peak_rss_growth / 1048576) if r.peak_rss_growth is not none else '-' }}</td>
+                        <td>{{ "%.1f"|format(r.alloc_peak / 1048576) }}</td><td>{{ "%.1f"|format(r.alloc_net / 1048576) }}</td></tr>
+                    {% endfor %}
+                </table>
+                <p>HTML渲染阶段在报告生成后才能测得，见同名 .profile.json 文件。</p>
+            </details>
+        </div>
+        {% endif %}
     </div>
+    {% if has_paged_tables %}
+    <script>
+    // 大表格分页：完整数据以JSON嵌入，每次只渲染一页
+    (function () {
+        document.querySelectorAll('.paged-table').forEach(function (wrap) {
+            var data = document.getElementById('table-data-' + wrap.dataset.table);
+            if (!data) return;
+            var rows = JSON.parse(data.textContent), size = +wrap.dataset.pageSize, page = 0;
+            var pages = Math.ceil(rows.length / size), tbody = wrap.querySelector('tbody'), pager = wrap.querySelector('.pager');
+            var prev = document.createElement('button'), next = document.createElement('button'), info = document.createElement('span');
+            prev.textContent = '上一页';
+            next.textContent = '下一页';
+            pager.appendChild(prev); pager.appendChild(info); pager.appendChild(next);
+            function show(p) {
+                page = Math.max(0, Math.min(pages - 1, p));
+                var trs = [];
+                rows.slice(page * size, (page + 1) * size).forEach(function (row) {
+                    var tr = document.createElement('tr');
+                    row.forEach(function (cell) {
+                        var td = document.createElement('td');
+                        td.textContent = cell;
+                        tr.appendChild(td);
+                    });
+                    trs.push(tr);
+                });
+                tbody.replaceChildren.apply(tbody, trs);
+                info.textContent = '第 ' + (page + 1) + ' / ' + pages + ' 页（共 ' + rows.length + ' 行）';
+                prev.disabled = page === 0;
+                next.disabled = page === pages - 1;
+            }
+            prev.onclick = function () { show(page - 1); };
+            next.onclick = function () { show(page + 1); };
+            show(0);
+        });
+    })();
+    </script>
+    {% endif %}
+    {% if charts.format == 'json' %}
+    <script>
+    // 客户端渲染图表（--chart-format json）
+    (function () {
+        var NS = 'http://www.w3.org/2000/svg';
+        function el(tag, attrs, text) {
+            var node = document.createElementNS(NS, tag);
+            for (var k in attrs) node.setAttribute(k, attrs[k]);
+            if (text !== undefined) node.textContent = text;
+            return node;
+        }
+        function histogram(panel) {
+            var W = 420, H = 300, L = 50, B = 45, T = 30, R = 10;
+            var svg = el('svg', {width: W, height: H});
+            svg.appendChild(el('text', {x: W / 2, y: 18, 'text-anchor': 'middle', 'font-size': 14}, panel.title));
+            var max = Math.max.apply(null, panel.counts.concat([1]));
+            var n = panel.counts.length, bw = (W - L - R) / Math.max(n, 1);
+            panel.counts.forEach(function (c, i) {
+                var h = (H - T - B) * c / max;
+                var bar = el('rect', {x: L + i * bw, y: H - B - h, width: bw, height: h,
+                                      fill: '#4c72b0', stroke: 'black', 'stroke-width': 0.5});
+                bar.appendChild(el('title', {}, panel.edges[i].toFixed(2) + ' – ' + panel.edges[i + 1].toFixed(2) + ': ' + c));
+                svg.appendChild(bar);
+            });
+            svg.appendChild(el('line', {x1: L, y1: H - B, x2: W - R, y2: H - B, stroke: '#333'}));
+            svg.appendChild(el('line', {x1: L, y1: T, x2: L, y2: H - B, stroke: '#333'}));
+            if (n) {
+                svg.appendChild(el('text', {x: L, y: H - B + 15, 'font-size': 10, 'text-anchor': 'middle'}, panel.edges[0].toFixed(1)));
+                svg.appendChild(el('text', {x: W - R, y: H - B + 15, 'font-size': 10, 'text-anchor': 'middle'}, panel.edges[n].toFixed(1)));
+            }
+            svg.appendChild(el('text', {x: L - 5, y: T + 4, 'font-size': 10, 'text-anchor': 'end'}, max));
+            svg.appendChild(el('text', {x: (L + W - R) / 2, y: H - 8, 'text-anchor': 'middle', 'font-size': 12}, panel.xlabel));
+            svg.appendChild(el('text', {x: 14, y: (T + H - B) / 2, 'text-anchor': 'middle', 'font-size': 12,
+                                        transform: 'rotate(-90 14 ' + (T + H - B) / 2 + ')'}, panel.ylabel));
+            return svg;
+        }
+        function coolwarm(v) {
+            // 近似coolwarm配色：-1蓝、0灰白、1红
+            var lo = [59, 76, 192], mid = [221, 221, 221], hi = [180, 4, 38];
+            var t = Math.max(-1, Math.min(1, v)), end = t < 0 ? lo : hi, f = Math.abs(t);
+            return 'rgb(' + mid.map(function (x, i) { return Math.round(x + (end[i] - x) * f); }).join(',') + ')';
+        }
+        function heatmap(spec) {
+            var n = spec.columns.length, cell = Math.max(28, Math.min(60, 600 / Math.max(n, 1))), L = 120, T = 40;
+            var svg = el('svg', {width: L + n * cell + 10, height: T + n * cell + 110});
+            svg.appendChild(el('text', {x: L + n * cell / 2, y: 22, 'text-anchor': 'middle', 'font-size': 14}, spec.title));
+            spec.values.forEach(function (row, i) {
+                svg.appendChild(el('text', {x: L - 6, y: T + i * cell + cell / 2 + 4, 'text-anchor': 'end', 'font-size': 11}, spec.columns[i]));
+                row.forEach(function (v, j) {
+                    var x = L + j * cell, y = T + i * cell;
+                    svg.appendChild(el('rect', {x: x, y: y, width: cell, height: cell, fill: v === null ? '#fff' : coolwarm(v),
+                                                stroke: 'white', 'stroke-width': 1}));
+                    if (v !== null && cell >= 28) {
+                        svg.appendChild(el('text', {x: x + cell / 2, y: y + cell / 2 + 4, 'text-anchor': 'middle',
+                                                    'font-size': 10, fill: Math.abs(v) > 0.6 ? 'white' : 'black'}, v.toFixed(2)));
+                    }
+                });
+            });
+            spec.columns.forEach(function (c, j) {
+                var x = L + j * cell + cell / 2, y = T + n * cell + 8;
+                svg.appendChild(el('text', {x: x, y: y, 'font-size': 11, transform: 'rotate(45 ' + x + ' ' + y + ')'}, c));
+            });
+            return svg;
+        }
+        function render(container) {
+            var spec = JSON.parse(document.getElementById('chart-data-' + container.dataset.chart).textContent);
+            if (spec.type === 'histogram') spec.panels.forEach(function (p) { container.appendChild(histogram(p)); });
+            else if (spec.type === 'heatmap') container.appendChild(heatmap(spec));
+        }
+        // 图表进入视口时才渲染
+        var charts = document.querySelectorAll('.js-chart');
+        if (!('IntersectionObserver' in window)) {
+            charts.forEach(render);
+            return;
+        }
+        var observer = new IntersectionObserver(function (entries) {
+            entries.forEach(function (entry) {
+                if (entry.isIntersecting) {
+                    observer.unobserve(entry.target);
+                    render(entry.target);
+                }
+            });
+        }, {rootMargin: '200px'});
+        charts.forEach(function (c) { observer.observe(c); });
+    })();
+    </script>
+    {% endif %}
 </body>
 </html>
+"""
+
+
+@lru_cache(maxsize=None)
+def _get_report_template():
+    """编译一次报告模板，后续报告（批量模式、常驻服务）直接复用
+
+    开启自动转义：列名、选项标签、旧方案文本等都来自数据文件，不能作为HTML原样输出。
     """
-    
-    template = Template(html_template)
-    html_content = template.render(
+    from jinja2 import Environment
+    return Environment(autoescape=True).from_string(REPORT_TEMPLATE)
+
+
+def _fmt_number(value, digits=3):
+    """报告表格中的数值格式，缺失显示为'-'"""
+    import math
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return '-'
+    if isinstance(value, int):
+        return str(value)
+    return f"{value:.{digits}f}"
+
+
+def _fmt_percent(value, base=None):
+    """百分比格式；给出base时value为人数"""
+    if base is not None:
+        value = value / base if base else float('nan')
+    return _fmt_number(value * 100, 1) + '%' if value == value else '-'
+
+
+def _fmt_count(n, base):
+    """交叉表单元格：人数（列百分比），加权人数取整显示"""
+    return f"{n:.0f} ({_fmt_percent(n, base)})"
+
+
+def _report_tables(analysis_results):
+    """整理报告中可能很长的表格：{表名: {'headers': [...], 'rows': [[单元格文本]]}}"""
+    tables = {}
+    empty = {'headers': [], 'rows': []}
+
+    descriptive = analysis_results.get('descriptive') or {}
+    summary, missing = descriptive.get('summary', {}), descriptive.get('missing', {})
+    stats_keys = ['count', 'mean', 'std', 'min', '25%', '50%', '75%', 'max']
+    weighted, mean_ci = descriptive.get('weighted'), descriptive.get('mean_ci')
+    headers = ['变量', '类型', '缺失', '样本数', '均值', '标准差', '最小值', '25%', '中位数', '75%', '最大值']
+    if weighted:
+        headers += ['加权均值', '加权标准差', '有效样本量']
+    if mean_ci:
+        headers.append(f"{'加权' if weighted else ''}均值{descriptive['bootstrap']['level']:.0%}置信区间")
+    rows = []
+    for col, dtype in descriptive.get('dtypes', {}).items():
+        stats = summary.get(col, {})
+        row = [str(col), dtype, _fmt_number(int(missing.get(col, 0)))] + \
+              [_fmt_number(stats.get(key), 0 if key == 'count' else 3) for key in stats_keys]
+        if weighted:
+            w = weighted.get(col, {})
+            row += [_fmt_number(w.get('mean')), _fmt_number(w.get('std')), _fmt_number(w.get('n_eff'), 0)]
+        if mean_ci:
+            ci = mean_ci.get(col)
+            row.append(f"[{_fmt_number(ci[0])}, {_fmt_number(ci[1])}]" if ci else '-')
+        rows.append(row)
+    tables['descriptive'] = {'headers': headers, 'rows': rows}
+
+    correlation = analysis_results.get('correlation') or {}
+    pairs = correlation.get('strong_pairs', [])
+    headers = ['变量1', '变量2', 'r', 'p值', '有效样本量' if correlation.get('weight') else '样本数']
+    if correlation.get('bootstrap'):
+        headers.append(f"{correlation['bootstrap']['level']:.0%}置信区间")
+    tables['strong_pairs'] = {
+        'headers': headers,
+        'rows': [[str(p['var1']), str(p['var2']), _fmt_number(p['r']), _fmt_number(p['p_value'], 4), str(p['n'])] +
+                 ([f"[{_fmt_number(p['ci'][0])}, {_fmt_number(p['ci'][1])}]"] if 'ci' in p else [])
+                 for p in pairs]
+    }
+
+    regression = analysis_results.get('regression')
+    if regression:
+        models = regression.get('models') or {regression['target']: regression}
+        tables['regression_summary'] = {
+            'headers': ['因变量', 'R²', '调整R²', '样本数', '截距', '截距p值'],
+            'rows': [[str(target), _fmt_number(m['r2_score']), _fmt_number(m.get('adj_r2_score')),
+                      _fmt_number(m.get('n')), _fmt_number(m['intercept'], 4),
+                      _fmt_number(m.get('intercept_p_value'), 4)] for target, m in models.items()]
+        }
+        tables['regression_coefficients'] = {
+            'headers': ['因变量', '自变量', '系数', '标准误', 't值', 'p值'],
+            'rows': [[str(target), str(feature), _fmt_number(coef, 4),
+                      _fmt_number((m.get('std_errors') or {}).get(feature), 4),
+                      _fmt_number((m.get('t_values') or {}).get(feature), 2),
+                      _fmt_number((m.get('p_values') or {}).get(feature), 4)]
+                     for target, m in models.items() for feature, coef in m['coefficients'].items()]
+        }
+    else:
+        tables['regression_summary'] = tables['regression_coefficients'] = empty
+
+    categorical = analysis_results.get('categorical') or {'questions': [], 'crosstabs': []}
+    kind_names = {'single': '单选', 'multi': '多选', 'likert': '量表'}
+    tables['frequencies'] = {
+        'headers': ['题目', '类型', '选项', '人数', '百分比'],
+        'rows': [[str(q['name']), kind_names[q['kind']], label, _fmt_number(float(n), 0), _fmt_percent(n, q['n_valid'])]
+                 for q in categorical['questions'] for label, n in zip(q['labels'], q['counts'])]
+    }
+    tables['likert'] = {
+        'headers': ['题目', '量表', '有效样本', '均值', 'Top2', 'Bottom2'],
+        'rows': [[str(q['name']), f"{q['scale'][0]}-{q['scale'][1]}", _fmt_number(float(q['n_valid']), 0),
+                  _fmt_number(q['mean'], 2),
+                  _fmt_percent(q['top2']), _fmt_percent(q['bottom2'])]
+                 for q in categorical['questions'] if q['kind'] == 'likert']
+    }
+    crosstabs = []
+    for i, crosstab in enumerate(categorical['crosstabs']):
+        rows = []
+        for t in crosstab['tables']:
+            bases, total_base = t['bases'], float(t['bases'].sum())
+            rows.append([str(t['name']), '作答人数', _fmt_number(total_base, 0)] +
+                        [_fmt_number(float(b), 0) for b in bases])
+            for label, counts in zip(t['labels'], t['counts'].T):
+                rows.append([str(t['name']), label, _fmt_count(counts.sum(), total_base)] +
+                            [_fmt_count(n, b) for n, b in zip(counts, bases)])
+            if t['kind'] == 'likert':
+                mean, top2, _ = _likert_summary(t['counts'].sum(axis=0), t['scale'])
+                rows.append([str(t['name']), '均值', _fmt_number(float(mean), 2)] +
+                            [_fmt_number(v, 2) for v in t['mean']])
+                rows.append([str(t['name']), 'Top2', _fmt_percent(float(top2))] + [_fmt_percent(v) for v in t['top2']])
+        crosstabs.append({'banner': crosstab['banner'], 'name': f'crosstab_{i}',
+                          'table': {'headers': ['题目', '选项', '合计'] + crosstab['labels'], 'rows': rows}})
+    tables['crosstabs'] = crosstabs
+
+    families = (analysis_results.get('significance') or {}).get('families', {})
+    tables['significance'] = []
+    family_tables = {
+        'correlation': ('相关系数检验', ['变量1', '变量2', 'r', '样本数'],
+                        lambda t: [str(t['var1']), str(t['var2']), _fmt_number(t['r']), str(t['n'])]),
+        'chi_square': ('单选题卡方独立性检验', ['变量1', '变量2', 'χ²', '自由度', '样本数', "Cramér's V"],
+                       lambda t: [str(t['var1']), str(t['var2']), _fmt_number(t['chi2'], 2), str(t['dof']),
+                                  str(t['n']), _fmt_number(t['cramers_v'])]),
+        'group': ('数值题组间比较（两组Welch t检验 / 多组方差分析）', ['分组', '题目', '检验', '统计量', '自由度', 'η²', '样本数'],
+                  lambda t: [str(t['group']), str(t['item']), 't' if t['test'] == 't' else 'F',
+                             _fmt_number(t['statistic'], 3),
+                             _fmt_number(t['dof2'], 1) if t['test'] == 't' else
+                             f"{t['dof1']:.0f}, {t['dof2']:.0f}", _fmt_number(t['eta2']), str(t['n'])])
+    }
+    for name, (title, headers, cells) in family_tables.items():
+        family = families.get(name)
+        if family:
+            tables['significance'].append({
+                'name': f'significance_{name}', 'title': title, 'n_tests': family['n_tests'],
+                'n_significant': family['n_significant'], 'n_listed': len(family['tests']),
+                'table': {'headers': headers + ['p值', 'q值（BH）'],
+                          'rows': [cells(t) + [_fmt_number(t['p_value'], 4), _fmt_number(t['q_value'], 4)]
+                                   for t in family['tests']]}
+            })
+
+    factor = analysis_results.get('factor')
+    if factor:
+        tables['loadings'] = {
+            'headers': ['变量'] + [f'成分{i + 1}' for i in range(factor['n_components'])],
+            'rows': [[str(col)] + [_fmt_number(v) for v in row] for col, row in factor['loadings'].items()]
+        }
+    else:
+        tables['loadings'] = empty
+    return tables
+
+
+def generate_html_report(analysis_results, charts, old_plan_eval, title, output_path, profile=None):
+    """生成HTML报告，profile为StageProfiler.summary()时附加可折叠的资源占用明细
+
+    模板只编译一次，渲染结果分段流式写入文件；超过REPORT_PAGE_SIZE行的表格在浏览器端分页显示。
+    """
+    tables = _report_tables(analysis_results)
+    all_tables = [t for t in tables.values() if isinstance(t, dict)] + \
+        [c['table'] for c in tables['crosstabs'] + tables['significance']]
+    stream = _get_report_template().stream(
         title=title,
         generation_time=datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
         data_info=analysis_results.get('data_info', {}),
         models_used=analysis_results.get('models_used', []),
         charts=charts,
+        tables=tables,
+        page_size=REPORT_PAGE_SIZE,
+        has_paged_tables=any(len(t['rows']) > REPORT_PAGE_SIZE for t in all_tables),
+        descriptive_approximate=(analysis_results.get('descriptive') or {}).get('approximate_quantiles', False),
+        descriptive_results=analysis_results.get('descriptive') or {},
+        correlation_results=analysis_results.get('correlation'),
         regression_results=analysis_results.get('regression'),
-        old_plan_eval=old_plan_eval
+        cluster_results=analysis_results.get('cluster'),
+        factor_results=analysis_results.get('factor'),
+        categorical_results=analysis_results.get('categorical'),
+        significance_results=analysis_results.get('significance'),
+        old_plan_eval=old_plan_eval,
+        profile=profile
     )
-    
-    with open(output_path, 'w', encoding='utf-8') as f:
-        f.write(html_content)
+    stream.enable_buffering(REPORT_STREAM_BUFFER)
+    stream.dump(str(output_path), encoding='utf-8')
     
     print(f"✅ HTML报告已生成: {output_path}")
 
 
-def main():
+def _peak_rss_bytes():
+    """当前进程的峰值常驻内存（字节），平台不支持时返回None"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux以KB为单位，macOS以字节为单位
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class StageProfiler:
+    """逐阶段记录墙钟时间、CPU时间、峰值RSS和Python分配内存
+
+    分配内存由tracemalloc统计（numpy数组也会计入）；dump_dir给定时，
+    每个阶段另存cProfile结果（<阶段>.prof）和本阶段新增分配最多的代码位置（<阶段>.alloc.txt）。
+    各阶段须串行执行，测得的内存才能归属到单个阶段。
+    """
+
+    def __init__(self, dump_dir=None, top_allocations=25):
+        import tracemalloc
+        self.records = []
+        self.dump_dir = Path(dump_dir) if dump_dir else None
+        self.top_allocations = top_allocations
+        if self.dump_dir:
+            self.dump_dir.mkdir(parents=True, exist_ok=True)
+        # 只停止由本实例启动的跟踪，常驻服务的工作进程中后续任务不再带跟踪开销
+        self._owns_tracing = not tracemalloc.is_tracing()
+        if self._owns_tracing:
+            tracemalloc.start()
+
+    def close(self):
+        """结束剖析，停止由本实例启动的tracemalloc跟踪"""
+        import tracemalloc
+        if self._owns_tracing and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self._owns_tracing = False
+
+    def call(self, name, func, *args):
+        """在阶段计量下执行func(*args)并返回其结果"""
+        import tracemalloc
+        profiler = snapshot = None
+        if self.dump_dir:
+            import cProfile
+            profiler = cProfile.Profile()
+            snapshot = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+        alloc_before = tracemalloc.get_traced_memory()[0]
+        rss_before = _peak_rss_bytes()
+        wall0, cpu0 = time.perf_counter(), time.process_time()
+        if profiler:
+            profiler.enable()
+        try:
+            return func(*args)
+        finally:
+            if profiler:
+                profiler.disable()
+            wall, cpu = time.perf_counter() - wall0, time.process_time() - cpu0
+            alloc_after, alloc_peak = tracemalloc.get_traced_memory()
+            rss_after = _peak_rss_bytes()
+            self.records.append({
+                'stage': name,
+                'wall_time': wall,
+                'cpu_time': cpu,
+                'peak_rss': rss_after,
+                'peak_rss_growth': None if rss_after is None else rss_after - rss_before,
+                'alloc_peak': alloc_peak - alloc_before,
+                'alloc_net': alloc_after - alloc_before
+            })
+            if self.dump_dir:
+                self._dump(name, profiler, snapshot)
+
+    def _dump(self, name, profiler, snapshot):
+        import tracemalloc
+        safe_name = re.sub(r'[^\w.-]+', '_', name)
+        profiler.dump_stats(str(self.dump_dir / f'{safe_name}.prof'))
+        # 只列出本阶段新增的内存分配
+        stats = tracemalloc.take_snapshot().compare_to(snapshot, 'lineno')[:self.top_allocations]
+        (self.dump_dir / f'{safe_name}.alloc.txt').write_text(
+            '\n'.join(str(stat) for stat in stats) + '\n', encoding='utf-8')
+
+    def summary(self):
+        """汇总结果（字节和秒），用于JSON附属文件和报告"""
+        return {
+            'stages': self.records,
+            'total_wall_time': sum(r['wall_time'] for r in self.records),
+            'total_cpu_time': sum(r['cpu_time'] for r in self.records),
+            'peak_rss': max((r['peak_rss'] or 0 for r in self.records), default=0) or None
+        }
+
+    def save(self, path):
+        Path(path).write_text(json.dumps(self.summary(), ensure_ascii=False, indent=2), encoding='utf-8')
+
+    def print_table(self):
+        print("\n📊 阶段资源占用（--profile）:")
+        print(f"   {'阶段':<14}{'墙钟(s)':>10}{'CPU(s)':>10}{'峰值RSS(MB)':>14}{'分配峰值(MB)':>14}")
+        for r in self.records:
+            rss = '-' if r['peak_rss'] is None else f"{r['peak_rss'] / 1048576:.1f}"
+            print(f"   {r['stage']:<14}{r['wall_time']:>10.3f}{r['cpu_time']:>10.3f}{rss:>14}"
+                  f"{r['alloc_peak'] / 1048576:>14.1f}")
+
+
+def _profiled(profiler, name, func, *args):
+    """profiler为None时直接调用，否则在阶段计量下调用"""
+    if profiler is None:
+        return func(*args)
+    return profiler.call(name, func, *args)
+
+
+def _timed_call(func, args):
+    """执行阶段函数并记录起止时间"""
+    start = time.time()
+    t0 = time.perf_counter()
+    result = func(*args)
+    return result, start, time.perf_counter() - t0
+
+
+def critical_path(stages, durations):
+    """按依赖关系计算关键路径，返回(阶段列表, 总耗时)"""
+    finish, prev = {}, {}
+    for name in _topological_order(stages):
+        deps = stages[name][2]
+        best = max(deps, key=lambda d: finish[d], default=None)
+        prev[name] = best
+        finish[name] = durations[name] + (finish[best] if best else 0.0)
+    if not finish:
+        return [], 0.0
+    node = max(finish, key=finish.get)
+    total = finish[node]
+    path = []
+    while node:
+        path.append(node)
+        node = prev[node]
+    return path[::-1], total
+
+
+def _topological_order(stages):
+    """阶段的拓扑排序，存在循环或未知依赖时报错"""
+    order, state = [], {}
+
+    def visit(name):
+        if state.get(name) == 'done':
+            return
+        if state.get(name) == 'visiting':
+            raise ValueError(f"阶段依赖存在循环: {name}")
+        if name not in stages:
+            raise ValueError(f"未知的依赖阶段: {name}")
+        state[name] = 'visiting'
+        for dep in stages[name][2]:
+            visit(dep)
+        state[name] = 'done'
+        order.append(name)
+
+    for name in stages:
+        visit(name)
+    return order
+
+
+def run_stage_graph(stages, workers=None, executor='thread', profiler=None):
+    """按依赖关系并发执行相互独立的分析阶段
+
+    stages: {阶段名: (函数, 参数元组, 依赖阶段列表)}，函数调用方式为
+    func(*args, *依赖阶段的结果)。executor为'thread'或'process'，workers为1时串行执行。
+    给定profiler（StageProfiler）时串行执行并逐阶段计量资源。
+    返回 (各阶段结果, 各阶段耗时, 统计信息)。
+    """
+    from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+    order = _topological_order(stages)
+    results, durations = {}, {}
+    wall_start = time.perf_counter()
+
+    workers = workers or os.cpu_count() or 1
+    if profiler is not None or workers <= 1 or len(stages) <= 1:
+        for name in order:
+            func, args, deps = stages[name]
+            call_args = tuple(args) + tuple(results[d] for d in deps)
+            if profiler is not None:
+                results[name], _, durations[name] = _timed_call(partial(profiler.call, name, func), call_args)
+            else:
+                results[name], _, durations[name] = _timed_call(func, call_args)
+    else:
+        pool_cls = ProcessPoolExecutor if executor == 'process' else ThreadPoolExecutor
+        pending = dict(stages)
+        running = {}
+        with pool_cls(max_workers=workers) as pool:
+            try:
+                while pending or running:
+                    ready = [name for name in order
+                             if name in pending and all(d in results for d in pending[name][2])]
+                    for name in ready:
+                        func, args, deps = pending.pop(name)
+                        call_args = tuple(args) + tuple(results[d] for d in deps)
+                        running[pool.submit(_timed_call, func, call_args)] = name
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        name = running.pop(future)
+                        results[name], _, durations[name] = future.result()
+            except BaseException:
+                for future in running:
+                    future.cancel()
+                raise
+
+    wall = time.perf_counter() - wall_start
+    path, path_time = critical_path(stages, durations)
+    summary = {
+        'wall_time': wall,
+        'serial_time': sum(durations.values()),
+        'critical_path': path,
+        'critical_path_time': path_time
+    }
+    return results, durations, summary
+
+
+def _load_with_options(data_path, args):
+    """按命令行参数加载数据文件（含解析缓存）"""
+    ocr_preprocess = [step.strip() for step in args.ocr_preprocess.split(',') if step.strip()]
+    unknown = set(ocr_preprocess) - {'grayscale', 'binarize', 'deskew'}
+    if unknown:
+        raise ValueError(f"不支持的OCR预处理步骤: {', '.join(sorted(unknown))}")
+    loader_options = {'workers': args.workers, 'pdf_pages': args.pdf_pages,
+                      'first_table': args.pdf_first_table,
+                      'ocr_preprocess': ocr_preprocess, 'ocr_lang': args.ocr_lang,
+                      'ocr_cache_dir': None if args.no_cache else str(Path(args.cache_dir) / 'ocr')}
+    if args.no_cache:
+        return load_data_file(data_path, **loader_options)
+    return load_data_file_cached(data_path, args.cache_dir, args.cache_size, **loader_options)
+
+
+def _source_hash(data_path):
+    """数据来源指纹，图片目录或通配符按各图片哈希合并"""
+    batch = resolve_image_batch(data_path)
+    if batch is None:
+        return compute_file_hash(data_path)
+    h = hashlib.blake2b(digest_size=16)
+    for path in batch:
+        h.update(compute_file_hash(path).encode())
+    return h.hexdigest()
+
+
+def open_numeric_store(data_path, store_path, args):
+    """打开与数据文件对应的数值存储，不存在、数据已变化或样本行数不同时重新构建，返回(存储, 样本)"""
+    import pandas as pd
+    source = {'path': str(data_path), 'hash': _source_hash(data_path)}
+    try:
+        store = NumericStore.open(store_path)
+        if store.meta['source']['hash'] == source['hash'] and store.meta['sample_rows'] == args.sample_rows:
+            print(f"♻️  复用数值存储: {store_path}（{store.n_rows} 行 × {len(store.columns)} 个数值列）")
+            return store, store.sample()
+    except (FileNotFoundError, ValueError, KeyError):
+        pass
+    
+    NumericStore.check_target(store_path)
+    print(f"💽 正在构建数值存储: {store_path}")
+    if Path(data_path).suffix.lower() == '.csv':
+        chunks = pd.read_csv(data_path, encoding='utf-8', chunksize=args.chunksize or STORE_CHUNK_ROWS)
+    else:
+        df = _load_with_options(data_path, args)
+        chunks = (df.iloc[start:start + STORE_CHUNK_ROWS] for start in range(0, len(df), STORE_CHUNK_ROWS))
+    store, sample = NumericStore.build(store_path, chunks, source, args.sample_rows)
+    print(f"✅ 数值存储已写入: {store.n_rows} 行 × {len(store.columns)} 个数值列（保留样本 {len(sample)} 行）")
+    return store, sample
+
+
+def run_incremental_append(args):
+    """增量模式：把新增数据合并进已保存的分析状态，并由状态重新生成报告"""
+    state = AnalysisState.load(args.state)
+    file_hash = _source_hash(args.append)
+    if state.has_source(file_hash):
+        raise ValueError(f"该数据文件已合并进分析状态，拒绝重复追加: {args.append}")
+    
+    print(f"📂 正在加载新增数据: {args.append}")
+    n_appended = 0
+    if args.chunksize and Path(args.append).suffix.lower() == '.csv':
+        _, _, n_appended = stream_csv_file(args.append, args.chunksize, sample_rows=0, on_chunk=state.update)
+    else:
+        df = _load_with_options(args.append, args)
+        if not args.no_compact:
+            df, _ = compact_dtypes(df, verbose=False, numeric_text=args.numeric_text)
+        state.update(df)
+        n_appended = len(df)
+    state.add_source(args.append, file_hash, n_appended)
+    state.save(args.state)
+    print(f"💾 已更新增量分析状态: {args.state}（累计 {state.stats.n_rows} 行，{len(state.sources)} 批）")
+    
+    print("\n🔬 正在由分析状态生成结果...")
+    analysis_results = state.results(args.targets, args.drivers, args.corr_threshold, args.corr_top_k or None)
+    analysis_results['data_info']['n_appended'] = n_appended
+    if args.model not in ('auto', *analysis_results['models_used']):
+        print(f"⚠️  增量模式不支持{args.model}模型，已改用状态中可用的模型")
+    
+    output_dir = Path(args.output).parent
+    output_dir.mkdir(parents=True, exist_ok=True)
+    distribution, correlation = state.chart_payloads()
+    charts = render_charts(distribution, correlation, args.output, args.chart_format, args.workers)
+    old_plan_eval = None
+    if args.old_plan:
+        old_plan_eval = evaluate_old_plan(load_old_plan(args.old_plan, args.workers), analysis_results)
+    
+    print("\n📝 正在生成HTML报告...")
+    generate_html_report(analysis_results, charts, old_plan_eval, args.title, args.output)
+    if args.open_browser:
+        print(f"\n🌐 正在浏览器中打开报告...")
+        webbrowser.open(f'file://{os.path.abspath(args.output)}')
+    print("\n✅ 增量分析完成！")
+    return args.output
+
+
+def resolve_batch_entries(spec):
+    """解析批量输入：目录（其中的数据文件）或清单文件
+
+    清单为.txt时每行一个数据文件路径（#开头为注释）；为.json时是路径列表，
+    或包含data以及可选title、old_plan字段的对象列表。相对路径相对清单所在目录。
+    返回 [{'data': 路径, 'title': 标题或None, 'old_plan': 路径或None}]。
+    """
+    path = Path(spec)
+    if path.is_dir():
+        files = sorted(p for p in path.iterdir() if p.is_file() and p.suffix.lower() in BATCH_DATA_EXTENSIONS)
+        return [{'data': str(p), 'title': None, 'old_plan': None} for p in files]
+    if not path.exists():
+        raise FileNotFoundError(f"批量输入不存在: {spec}")
+    
+    base = path.parent
+    if path.suffix.lower() == '.json':
+        items = json.loads(path.read_text(encoding='utf-8'))
+        if not isinstance(items, list):
+            raise ValueError("批量清单JSON必须是列表")
+    else:
+        items = [line.strip() for line in path.read_text(encoding='utf-8').splitlines()]
+        items = [line for line in items if line and not line.startswith('#')]
+    entries = []
+    for item in items:
+        if isinstance(item, str):
+            item = {'data': item}
+        if not isinstance(item, dict) or 'data' not in item:
+            raise ValueError(f"无效的批量清单条目: {item}")
+        old_plan = item.get('old_plan')
+        entries.append({'data': str(base / item['data']),
+                        'title': item.get('title'),
+                        'old_plan': str(base / old_plan) if old_plan else None})
+    return entries
+
+
+def _init_warm_worker():
+    """工作进程初始化：预先导入重型依赖并初始化字体，同一进程处理的后续任务不再重复付出启动开销"""
+    import numpy
+    import pandas
+    import jinja2
+    import scipy.stats
+    import sklearn.cluster
+    import sklearn.decomposition
+    _setup_matplotlib()
+    _get_seaborn()
+
+
+def _batch_job(args, log_path):
+    """批量工作进程：分析单个文件，输出写入日志，失败时返回错误信息而不抛出"""
+    import contextlib
+    import traceback
+    start = time.perf_counter()
+    result = {'data': args.data, 'output': args.output, 'log': str(log_path)}
+    with open(log_path, 'w', encoding='utf-8') as log, \
+            contextlib.redirect_stdout(log), contextlib.redirect_stderr(log):
+        try:
+            run_analysis(args)
+            result['status'] = 'ok'
+        except Exception as e:
+            traceback.print_exc()
+            result['status'] = 'failed'
+            result['error'] = f"{type(e).__name__}: {e}"
+    result['seconds'] = time.perf_counter() - start
+    return result
+
+
+def write_batch_index(results, index_path, title):
+    """生成批量结果索引页，链接每份报告及失败文件的日志（文件名和错误信息自动转义）"""
+    from jinja2 import Environment
+    index_dir = Path(index_path).parent
+    rows = []
+    for item in results:
+        target = item['output'] if item['status'] == 'ok' else item['log']
+        rows.append(dict(item, name=Path(item['data']).name,
+                         link=os.path.relpath(target, index_dir).replace(os.sep, '/')))
+    template = Environment(autoescape=True).from_string("""<!DOCTYPE html>
+<html lang="zh-CN">
+<head>
+    <meta charset="UTF-8">
+    <title>{{ title }} - 批量分析索引</title>
+    <style>
+        body { font-family: 'Microsoft YaHei', 'SimHei', Arial, sans-serif; margin: 40px; color: #333; }
+        table { border-collapse: collapse; width: 100%; }
+        th, td { border: 1px solid #ddd; padding: 8px 12px; text-align: left; }
+        th { background: #667eea; color: white; }
+        .ok { color: #2e7d32; }
+        .failed { color: #c62828; }
+    </style>
+</head>
+<body>
+    <h1>{{ title }} - 批量分析索引</h1>
+    <p>生成时间: {{ generation_time }}；共 {{ rows|length }} 个文件，成功 {{ n_ok }} 个，失败 {{ rows|length - n_ok }} 个</p>
+    <table>
+        <tr><th>数据文件</th><th>状态</th><th>耗时</th><th>报告</th></tr>
+        {% for row in rows %}
+        <tr>
+            <td>{{ row.name }}</td>
+            <td class="{{ row.status }}">{{ '成功' if row.status == 'ok' else '失败：' ~ row.error }}</td>
+            <td>{{ "%.1f"|format(row.seconds) }}s</td>
+            <td><a href="{{ row.link }}">{{ '查看报告' if row.status == 'ok' else '查看日志' }}</a></td>
+        </tr>
+        {% endfor %}
+    </table>
+</body>
+</html>""")
+    Path(index_path).write_text(template.render(
+        title=title, rows=rows, n_ok=sum(row['status'] == 'ok' for row in rows),
+        generation_time=datetime.now().strftime('%Y-%m-%d %H:%M:%S')), encoding='utf-8')
+
+
+def run_batch(args):
+    """批量模式：在有界进程池中逐个分析文件，单个文件失败不影响其余文件
+
+    每个文件的报告写入 <输出目录>/<文件名>/report.html，并生成index.html汇总。
+    返回失败的文件列表。
+    """
+    import copy
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+    from concurrent.futures.process import BrokenProcessPool
+    
+    entries = resolve_batch_entries(args.batch)
+    if not entries:
+        raise ValueError(f"批量输入中没有可分析的数据文件: {args.batch}")
+    output_dir = Path(args.output).parent
+    output_dir.mkdir(parents=True, exist_ok=True)
+    
+    jobs, used_names = [], set()
+    for entry in entries:
+        name = Path(entry['data']).stem
+        unique, n = name, 1
+        while unique in used_names:
+            n += 1
+            unique = f"{name}_{n}"
+        used_names.add(unique)
+        report_dir = output_dir / unique
+        report_dir.mkdir(exist_ok=True)
+        job_args = copy.copy(args)
+        job_args.batch = None
+        job_args.data = entry['data']
+        job_args.output = str(report_dir / 'report.html')
+        job_args.title = entry['title'] or f"{args.title} - {name}"
+        job_args.old_plan = entry['old_plan'] or args.old_plan
+        job_args.open_browser = False
+        # 文件之间已并行，单个文件内部默认串行，避免进程数相乘
+        job_args.workers = args.workers or 1
+        jobs.append((job_args, report_dir / 'analysis.log'))
+    
+    batch_workers = min(args.batch_workers or os.cpu_count() or 1, len(jobs))
+    print(f"📦 批量分析 {len(jobs)} 个文件（并行 {batch_workers}）...")
+    results = []
+    if batch_workers <= 1:
+        _init_warm_worker()
+        for job_args, log_path in jobs:
+            results.append(_batch_job(job_args, log_path))
+            _print_batch_progress(results[-1], len(results), len(jobs))
+    else:
+        start = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=batch_workers, initializer=_init_warm_worker) as executor:
+            futures = {executor.submit(_batch_job, job_args, log_path): (job_args, log_path)
+                       for job_args, log_path in jobs}
+            for future in as_completed(futures):
+                try:
+                    result = future.result()
+                except Exception as e:
+                    # 工作进程被杀死或崩溃（BrokenProcessPool）时，受影响的文件记为失败，已完成的结果保留
+                    job_args, log_path = futures[future]
+                    reason = '工作进程异常退出（可能内存不足或依赖库崩溃）' if isinstance(e, BrokenProcessPool) else ''
+                    result = {'data': job_args.data, 'output': job_args.output, 'log': str(log_path),
+                              'status': 'failed', 'error': f"{type(e).__name__}: {reason or e}",
+                              'seconds': time.perf_counter() - start}
+                results.append(result)
+                _print_batch_progress(results[-1], len(results), len(jobs))
+    
+    order = {job_args.output: i for i, (job_args, _) in enumerate(jobs)}
+    results.sort(key=lambda item: order[item['output']])
+    index_path = output_dir / 'index.html'
+    write_batch_index(results, index_path, args.title)
+    failures = [item for item in results if item['status'] != 'ok']
+    print(f"\n📑 索引页: {index_path}")
+    if failures:
+        print(f"⚠️  {len(failures)} 个文件分析失败:", file=sys.stderr)
+        for item in failures:
+            print(f"   {item['data']}: {item['error']}", file=sys.stderr)
+    
+    if args.open_browser:
+        print(f"\n🌐 正在浏览器中打开索引页...")
+        webbrowser.open(f'file://{os.path.abspath(index_path)}')
+    print(f"\n✅ 批量分析完成：成功 {len(results) - len(failures)} 个，失败 {len(failures)} 个")
+    return failures
+
+
+def _print_batch_progress(result, done, total):
+    mark = '✅' if result['status'] == 'ok' else '❌'
+    print(f"   [{done}/{total}] {mark} {Path(result['data']).name}（{result['seconds']:.1f}s）")
+
+
+def _serve_job(argv, cwd):
+    """常驻服务工作进程：按命令行参数执行一次分析（批量或单文件），返回结果和日志"""
+    import contextlib
+    import io
+    import traceback
+    start = time.perf_counter()
+    log = io.StringIO()
+    result = {}
+    prev_cwd = os.getcwd()
+    with contextlib.redirect_stdout(log), contextlib.redirect_stderr(log):
+        try:
+            os.chdir(cwd)
+            parser = build_parser()
+            args = parser.parse_args(argv)
+            validate_args(parser, args)
+            if args.serve or args.submit:
+                raise ValueError('服务任务中不能再使用 --serve 或 --submit')
+            args.open_browser = False
+            # 任务之间已并行，单个任务内部默认串行
+            args.workers = args.workers or 1
+            if args.batch:
+                args.batch_workers = args.batch_workers or 1
+                failures = run_batch(args)
+                result['output'] = os.path.abspath(Path(args.output).parent / 'index.html')
+                result['status'] = 'failed' if failures else 'ok'
+                if failures:
+                    result['error'] = f"{len(failures)} 个文件分析失败"
+            else:
+                result['output'] = os.path.abspath(run_analysis(args))
+                result['status'] = 'ok'
+        except SystemExit as e:
+            # 参数错误由argparse以SystemExit报告
+            result['status'] = 'failed'
+            result['error'] = f"参数错误（退出码 {e.code}）"
+        except Exception as e:
+            traceback.print_exc()
+            result['status'] = 'failed'
+            result['error'] = f"{type(e).__name__}: {e}"
+        finally:
+            # 工作进程会继续处理其他任务，恢复原工作目录
+            os.chdir(prev_cwd)
+    result['seconds'] = time.perf_counter() - start
+    result['log'] = log.getvalue()
+    return result
+
+
+def _ping():
+    return os.getpid()
+
+
+def _server_token_path(args):
+    """常驻服务令牌文件路径（按端口区分，位于缓存目录）"""
+    return Path(args.cache_dir) / f'serve-{args.port}.token'
+
+
+def _is_loopback_host(host):
+    """主机名解析出的地址是否全部为本机回环地址"""
+    import ipaddress
+    import socket
+    try:
+        addresses = {info[4][0] for info in socket.getaddrinfo(host, None)}
+    except socket.gaierror:
+        return False
+    return bool(addresses) and all(ipaddress.ip_address(addr.split('%')[0]).is_loopback for addr in addresses)
+
+
+def _write_server_token(path):
+    """生成随机令牌并写入仅本用户可读写（0600）的文件"""
+    import secrets
+    token = secrets.token_urlsafe(32)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        f.write(token)
+    os.replace(tmp_path, path)
+    return token
+
+
+def run_server(args):
+    """常驻分析服务：本地HTTP接口 + 预热的工作进程池
+
+    POST /analyze 接收 {"argv": [...], "cwd": "..."}，参数与命令行相同，
+    返回 {"status", "output"（报告绝对路径）, "seconds", "log", "error"}；GET /health 返回服务状态。
+    任务可读写任意路径，因此请求须为 application/json，并在 X-Survey-Token 头中携带服务启动时
+    写入令牌文件（0600）的随机令牌；自定义头使浏览器跨域请求必须预检，网页无法直接提交任务。
+    """
+    import hmac
+    from concurrent.futures import ProcessPoolExecutor
+    from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+    
+    token_path = _server_token_path(args)
+    token = _write_server_token(token_path)
+    workers = args.workers or os.cpu_count() or 1
+    print(f"🔥 正在预热 {workers} 个工作进程...")
+    pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_warm_worker)
+    # 提前启动全部工作进程，使首个任务也无需等待导入
+    for future in [pool.submit(_ping) for _ in range(workers)]:
+        future.result()
+    
+    class Handler(BaseHTTPRequestHandler):
+        def _send_json(self, status, payload):
+            body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        
+        def do_GET(self):
+            if self.path == '/health':
+                self._send_json(200, {'status': 'ok', 'workers': workers, 'pid': os.getpid()})
+            else:
+                self._send_json(404, {'error': 'not found'})
+        
+        def do_POST(self):
+            if self.path != '/analyze':
+                self._send_json(404, {'error': 'not found'})
+                return
+            content_type = self.headers.get('Content-Type', '').split(';', 1)[0].strip().lower()
+            if content_type != 'application/json':
+                self._send_json(415, {'status': 'failed', 'error': '请求须为 application/json'})
+                return
+            if not hmac.compare_digest(self.headers.get('X-Survey-Token', '').encode(), token.encode()):
+                self._send_json(403, {'status': 'failed', 'error': '服务令牌无效'})
+                return
+            try:
+                length = int(self.headers.get('Content-Length', 0))
+                job = json.loads(self.rfile.read(length).decode('utf-8'))
+                argv, cwd = list(job['argv']), job.get('cwd') or os.getcwd()
+            except (ValueError, KeyError, TypeError) as e:
+                self._send_json(400, {'status': 'failed', 'error': f"无效的任务请求: {e}"})
+                return
+            result = pool.submit(_serve_job, argv, cwd).result()
+            self._send_json(200, result)
+        
+        def log_message(self, format, *log_args):
+            if args.verbose:
+                super().log_message(format, *log_args)
+    
+    server = ThreadingHTTPServer((args.host, args.port), Handler)
+    print(f"🚀 分析服务已启动: http://{args.host}:{args.port}（Ctrl+C 停止）")
+    print(f"   服务令牌: {token_path}")
+    if not _is_loopback_host(args.host):
+        print(f"⚠️  服务监听非本机地址 {args.host}，任何持有令牌的客户端都可以读写本机文件")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n🛑 正在停止分析服务...")
+    finally:
+        server.server_close()
+        pool.shutdown(cancel_futures=True)
+        token_path.unlink(missing_ok=True)
+
+
+def submit_job(args, argv):
+    """轻量客户端：把命令行参数提交给常驻服务，打印结果并按需打开报告"""
+    import urllib.request
+    import urllib.error
+    
+    # 去掉客户端自身的参数，其余原样交给服务端解析
+    job_argv, skip = [], False
+    for item in argv:
+        if skip:
+            skip = False
+            continue
+        name = item.split('=', 1)[0]
+        if name == '--submit':
+            continue
+        if name in ('--host', '--port'):
+            skip = '=' not in item
+            continue
+        job_argv.append(item)
+    
+    url = f"http://{args.host}:{args.port}/analyze"
+    token_path = _server_token_path(args)
+    try:
+        token = token_path.read_text(encoding='utf-8').strip()
+    except FileNotFoundError:
+        raise ConnectionError(f"未找到服务令牌文件 {token_path}（请先使用 --serve 启动，且 --cache-dir、--port 与服务端一致）")
+    payload = json.dumps({'argv': job_argv, 'cwd': os.getcwd()}).encode('utf-8')
+    request = urllib.request.Request(url, data=payload,
+                                     headers={'Content-Type': 'application/json', 'X-Survey-Token': token})
+    try:
+        with urllib.request.urlopen(request) as response:
+            result = json.loads(response.read().decode('utf-8'))
+    except urllib.error.HTTPError as e:
+        raise RuntimeError(f"分析服务拒绝请求（HTTP {e.code}）: {e.read().decode('utf-8', 'replace')}")
+    except urllib.error.URLError as e:
+        raise ConnectionError(f"无法连接分析服务 {url}（请先使用 --serve 启动）: {e.reason}")
+    
+    if args.verbose and result.get('log'):
+        print(result['log'])
+    if result.get('status') != 'ok':
+        raise RuntimeError(f"服务端分析失败: {result.get('error')}")
+    print(f"✅ 报告已生成: {result['output']}（服务端耗时 {result['seconds']:.2f}s）")
+    if args.open_browser:
+        webbrowser.open(f"file://{result['output']}")
+    return result
+
+
+def build_parser():
     parser = argparse.ArgumentParser(description='问卷调查报告数据分析工具')
-    parser.add_argument('--data', required=True, help='问卷数据文件路径')
+    parser.add_argument('--data', help='问卷数据文件路径，也可以是图片目录或通配符（批量OCR）')
     parser.add_argument('--output', default='output/report.html', help='输出HTML报告路径')
     parser.add_argument('--old-plan', help='旧调研方案文件路径（可选）')
-    parser.add_argument('--model', default='auto', choices=['auto', 'descriptive', 'correlation', 'regression', 'cluster', 'factor'],
+    parser.add_argument('--model', default='auto', choices=['auto', 'descriptive', 'correlation', 'regression', 'cluster', 'factor',
+                                                               'categorical', 'significance'],
                        help='分析模型类型（默认：auto自动选择）')
     parser.add_argument('--title', default='问卷数据分析报告', help='报告标题')
     parser.add_argument('--open-browser', action='store_true', default=True, help='是否自动打开浏览器')
+    parser.add_argument('--no-open-browser', dest='open_browser', action='store_false', help='不自动打开浏览器')
     parser.add_argument('--verbose', action='store_true', help='显示详细日志')
+    parser.add_argument('--chunksize', type=int, help='流式分块读取CSV的每块行数（启用后内存占用不随文件大小增长）')
+    parser.add_argument('--sample-rows', type=int, default=100000,
+                       help='流式模式下保留的随机样本行数，用于其余模型和图表（默认：100000）')
+    parser.add_argument('--cache-dir', default=str(DEFAULT_CACHE_DIR), help='解析结果缓存目录')
+    parser.add_argument('--cache-size', type=int, default=1024, help='解析缓存大小上限（MB，默认：1024）')
+    parser.add_argument('--no-cache', action='store_true', help='禁用解析结果缓存')
+    parser.add_argument('--workers', type=int, help='并行工作进程数（默认：CPU核数）')
+    parser.add_argument('--pdf-pages', help='PDF数据文件的页码范围，如 "1-20,30"（默认：全部页面）')
+    parser.add_argument('--pdf-first-table', action='store_true', help='PDF中找到第一个有效表格后停止提取剩余页面')
+    parser.add_argument('--ocr-preprocess', default='',
+                       help='OCR前的图片预处理步骤，逗号分隔：grayscale,binarize,deskew（默认：不处理）')
+    parser.add_argument('--ocr-lang', default='chi_sim+eng', help='OCR识别语言（默认：chi_sim+eng）')
+    parser.add_argument('--no-compact', action='store_true', help='不压缩加载后的数据类型')
+    parser.add_argument('--numeric-text', action='store_true',
+                       help='压缩类型时把全部为数字的文本列转为数值列（PDF/Word/OCR表格；会去掉编号等的前导零）')
+    parser.add_argument('--chart-format', default='png', choices=CHART_FORMATS,
+                       help='图表输出格式：png位图、svg矢量图或json（浏览器端渲染，默认：png）')
+    parser.add_argument('--executor', default='thread', choices=['thread', 'process'],
+                       help='并发执行分析阶段使用线程池或进程池（默认：thread）')
+    parser.add_argument('--corr-threshold', type=float, default=0.5, help='强相关变量对的|r|阈值（默认：0.5）')
+    parser.add_argument('--corr-top-k', type=int, default=20, help='最多报告的强相关变量对数，0表示不限（默认：20）')
+    parser.add_argument('--targets', help='回归因变量，逗号分隔的列名；"all"表示每个数值列依次对其余列回归（默认：首个数值列）')
+    parser.add_argument('--drivers', help='回归自变量（所有因变量共享），逗号分隔的列名（默认：其余全部数值列）')
+    parser.add_argument('--cluster-k', help='聚类数k的扫描范围，如 "2-8" 或固定值 "4"（默认：2到min(8, 样本数/10)，按轮廓系数选择）')
+    parser.add_argument('--weight', help='设计权重列名：描述性统计、相关分析和分类题人数按权重计算（默认：不加权）')
+    parser.add_argument('--bootstrap', type=int, default=0,
+                       help='自助法重抽样次数，大于0时给出均值和强相关变量对的95%%置信区间（默认：0不计算）')
+    parser.add_argument('--seed', type=int, help='自助法随机种子，指定后结果可复现（默认：每次随机）')
+    parser.add_argument('--alpha', type=float, default=0.05,
+                       help='显著性检验的错误发现率（Benjamini-Hochberg校正后q值的阈值，默认：0.05）')
+    parser.add_argument('--banner', help='分类题交叉分析的分组列，逗号分隔；"A*B"表示两列组合交叉，如 "性别,城市,性别*年龄段"')
+    parser.add_argument('--multi-sep', help='多选题选项分隔符，如 ";"（取值中含该分隔符的文本列按多选题拆分，默认：不拆分）')
+    parser.add_argument('--store', help='数值存储目录：数值列转换为磁盘上的内存映射矩阵，描述性统计、相关、回归和因子分析'
+                                       '逐块扫描全部数据（内存占用与行数无关），数据文件未变时直接复用')
+    parser.add_argument('--state', help='增量分析状态文件路径（.npz），与--data同用时创建，与--append同用时更新')
+    parser.add_argument('--append', help='追加到已有分析状态的新增问卷数据文件（需同时指定--state）')
+    parser.add_argument('--batch', help='批量模式：数据文件目录或清单文件（.txt每行一个路径，或.json列表），'
+                                       '每个文件生成独立报告，并在--output所在目录生成index.html')
+    parser.add_argument('--batch-workers', type=int, help='批量模式并行处理的文件数（默认：CPU核数）')
+    parser.add_argument('--profile', action='store_true',
+                       help='逐阶段记录墙钟时间、CPU时间、峰值RSS和分配内存（阶段改为串行执行），'
+                            '写入报告同名的.profile.json并附在报告末尾')
+    parser.add_argument('--profile-dump', help='配合--profile，把每个阶段的cProfile结果(.prof)和内存分配热点(.alloc.txt)写入该目录')
+    parser.add_argument('--serve', action='store_true', help='启动常驻分析服务，工作进程预热依赖后等待任务')
+    parser.add_argument('--submit', action='store_true', help='把本次分析提交给已启动的常驻服务执行')
+    parser.add_argument('--host', default='127.0.0.1', help='常驻服务监听/连接的地址（默认：127.0.0.1）')
+    parser.add_argument('--port', type=int, default=SERVER_PORT, help=f'常驻服务端口（默认：{SERVER_PORT}）')
+    parser.add_argument('--allow-remote', action='store_true',
+                       help='允许 --serve 监听非本机地址（仍需令牌；默认只允许回环地址）')
+    return parser
+
+
+def run_analysis(args):
+    """执行单个数据文件的完整分析流程，返回生成的报告路径"""
+    if args.append:
+        return run_incremental_append(args)
+    
+    profiler = StageProfiler(args.profile_dump) if args.profile else None
+    try:
+        return _run_analysis(args, profiler)
+    finally:
+        if profiler is not None:
+            profiler.close()
+
+
+def _run_analysis(args, profiler):
+    # 1. 加载数据
+    print("📂 正在加载数据文件...")
+    import numpy as np
+    streamed_descriptive = None
+    streamed_moments = None
+    state = None
+    store = None
+    if args.store:
+        store, df = _profiled(profiler, 'load', open_numeric_store, args.data, args.store, args)
+        n_rows = store.n_rows
+    elif args.chunksize and Path(args.data).suffix.lower() == '.csv':
+        def on_chunk(chunk):
+            # 同时累加完整样本交叉积，使因子分析基于全部数据
+            nonlocal state, streamed_moments
+            if args.state:
+                if state is None:
+                    state = AnalysisState.from_dataframe(chunk)
+                state.update(chunk)
+                streamed_moments = state.moments
+                return
+            if streamed_moments is None:
+                streamed_moments = IncrementalMoments(chunk.select_dtypes(include=[np.number]).columns.tolist(),
+                                                      pairwise=False)
+            streamed_moments.update(numeric_block(chunk, streamed_moments.columns))
+        streamed_descriptive, df, n_rows = _profiled(profiler, 'load', stream_csv_file, args.data, args.chunksize,
+                                                     args.sample_rows, on_chunk)
+    else:
+        df = _profiled(profiler, 'load', _load_with_options, args.data, args)
+        n_rows = len(df)
+    
+    compact_info = None
+    if not args.no_compact:
+        df, compact_info = _profiled(profiler, 'compact', partial(compact_dtypes, numeric_text=args.numeric_text), df)
+    
+    if args.state:
+        if state is None:
+            state = AnalysisState.from_dataframe(df)
+            state.update(df)
+        state.add_source(args.data, _source_hash(args.data), n_rows)
+        state.save(args.state)
+        print(f"💾 已保存增量分析状态: {args.state}")
+    
+    # 2. 选择分析模型
+    if args.model == 'auto':
+        models = _profiled(profiler, 'model_selection', select_analysis_model, df)
+    else:
+        models = [args.model]
     
+    # 3. 执行分析
+    print("\n🔬 正在执行数据分析...")
+    analysis_results = {
+        'data_info': {
+            'n_samples': n_rows,
+            'n_vars': len(df.columns)
+        },
+        'models_used': models
+    }
+    if streamed_descriptive is not None or store is not None:
+        analysis_results['data_info']['n_sampled'] = len(df)
+    # 数值存储：描述性统计、相关、回归和因子分析逐块扫描全部数据，其余阶段使用样本
+    blockwise = {}
+    if store is not None:
+        print(f"   逐块扫描数值存储: {store.n_rows} 行 × {len(store.columns)} 列")
+        store_state = _profiled(profiler, 'scan', store.scan)
+        blockwise = store_state.results(args.targets, args.drivers, args.corr_threshold, args.corr_top_k or None)
+        blockwise['descriptive'].update(missing=store.meta['missing'], dtypes=store.meta['dtypes'])
+        analysis_results['data_info']['n_vars'] = len(store.meta['dtypes'])
+    if compact_info is not None:
+        analysis_results['data_info'].update(compact_info)
+    
+    # 分析模型、图表和旧方案评估互不依赖，按依赖关系并发执行
+    output_dir = Path(args.output).parent
+    output_dir.mkdir(parents=True, exist_ok=True)
+    bootstrap = {'n_boot': args.bootstrap, 'seed': args.seed, 'workers': args.workers}
+    model_funcs = {
+        'descriptive': partial(perform_descriptive_analysis, weight=args.weight, **bootstrap),
+        'correlation': partial(perform_correlation_analysis, threshold=args.corr_threshold,
+                               top_k=args.corr_top_k or None, weight=args.weight, **bootstrap),
+        'regression': partial(perform_regression_analysis, targets=args.targets, drivers=args.drivers),
+        'cluster': partial(perform_cluster_analysis, k_range=parse_k_range(args.cluster_k),
+                           workers=args.workers),
+        'factor': perform_factor_analysis,
+        'categorical': partial(perform_categorical_analysis, banners=args.banner, multi_sep=args.multi_sep,
+                               weight=args.weight),
+        'significance': partial(perform_significance_tests, alpha=args.alpha, multi_sep=args.multi_sep,
+                                weight=args.weight)
+    }
+    # 结果缓存：数据和参数未变的模型与图表直接复用（修改标题、旧方案等不再重复计算）
+    result_cache = None if args.no_cache else ResultCache(Path(args.cache_dir) / 'results', args.cache_size)
+    if result_cache is not None:
+        # 显著性检验除数值矩阵外还读取分类题列，这些列也计入缓存键
+        model_funcs = {name: partial(_cached_stage, result_cache, name, func, reads_columns=name == 'significance')
+                       for name, func in model_funcs.items()}
+    # 数值矩阵只构建一次，供各模型和图表共享
+    stages = {'prepare': (prepare_numeric_matrix, (df, models, result_cache is not None, args.weight), [])}
+    for model in models:
+        if model in blockwise:
+            analysis_results[model] = blockwise[model]
+            continue
+        if model == 'descriptive':
+            if streamed_descriptive is not None:
+                analysis_results['descriptive'] = streamed_descriptive
+            else:
+                stages[model] = (model_funcs[model], (df,), [])
+            continue
+        if model == 'factor' and streamed_moments is not None:
+            n, _, cross = streamed_moments.complete_moments()
+            analysis_results['factor'] = _profiled(profiler, 'factor', pca_from_moments,
+                                                   streamed_moments.columns, n, cross)
+            continue
+        stages[model] = (model_funcs[model], (df,), [] if model == 'categorical' else ['prepare'])
+    if store is not None:
+        distribution, correlation = store_state.chart_payloads()
+        stages['charts'] = (partial(render_charts, cache=result_cache), (distribution, correlation, args.output,
+                                                                         args.chart_format, args.workers), [])
+    else:
+        stages['charts'] = (partial(generate_charts, cache=result_cache),
+                            (df, output_dir, args.output, args.chart_format, args.workers), ['prepare'])
+    if args.old_plan:
+        stages['old_plan'] = (load_old_plan, (args.old_plan, args.workers), [])
+        # 评估只依赖数据概况和旧方案内容
+        stages['evaluation'] = (_evaluate_old_plan_stage, ({'data_info': analysis_results['data_info']},),
+                                ['old_plan'])
+    
+    print(f"   执行阶段: {', '.join(stages)}")
+    stage_results, durations, schedule = run_stage_graph(stages, args.workers, args.executor, profiler)
+    for model in models:
+        if model in stage_results:
+            analysis_results[model] = stage_results[model]
+    charts = stage_results['charts']
+    old_plan_eval = stage_results.get('evaluation')
+    
+    print("\n⏱️  阶段耗时: " + ', '.join(f"{name} {sec:.2f}s" for name, sec in durations.items()))
+    print(f"   关键路径: {' → '.join(schedule['critical_path'])}（{schedule['critical_path_time']:.2f}s），"
+          f"实际耗时 {schedule['wall_time']:.2f}s，串行累计 {schedule['serial_time']:.2f}s")
+    
+    # 4. 生成HTML报告
+    print("\n📝 正在生成HTML报告...")
+    _profiled(profiler, 'report', generate_html_report, analysis_results, charts, old_plan_eval, args.title,
+              args.output, profiler.summary() if profiler else None)
+    if profiler is not None:
+        profile_path = Path(args.output).with_suffix('.profile.json')
+        profiler.save(profile_path)
+        profiler.print_table()
+        print(f"   剖析结果已保存: {profile_path}")
+    
+    # 5. 打开浏览器
+    if args.open_browser:
+        print(f"\n🌐 正在浏览器中打开报告...")
+        webbrowser.open(f'file://{os.path.abspath(args.output)}')
+    
+    print("\n✅ 分析完成！")
+    return args.output
+
+
+def validate_args(parser, args):
+    """检查参数组合，不合法时通过parser.error退出"""
+    if args.serve:
+        if not args.allow_remote and not _is_loopback_host(args.host):
+            parser.error(f'--host {args.host} 不是本机回环地址；确需对外提供服务时请加 --allow-remote')
+        return
+    if args.batch:
+        if args.data or args.append or args.state:
+            parser.error('--batch 不能与 --data、--append 或 --state 同时使用')
+    elif args.append:
+        if not args.state:
+            parser.error('--append 需要同时指定 --state')
+        if args.data:
+            parser.error('--append 与 --data 不能同时使用')
+    elif not args.data:
+        parser.error('需要指定 --data（或使用 --state 与 --append 增量追加）')
+    if (args.weight or args.bootstrap) and (args.chunksize or args.state):
+        parser.error('--weight 和 --bootstrap 不支持流式模式（--chunksize）和增量模式（--state）')
+    if args.store and (args.batch or args.state or args.weight or args.bootstrap):
+        parser.error('--store 不能与 --batch、--state、--weight 或 --bootstrap 同时使用')
+    if args.bootstrap < 0:
+        parser.error('--bootstrap 不能为负数')
+    if not 0 < args.alpha < 1:
+        parser.error('--alpha 必须在0和1之间')
+
+
+def main():
+    parser = build_parser()
     args = parser.parse_args()
+    validate_args(parser, args)
     
     try:
-        # 1. 加载数据
-        print("📂 正在加载数据文件...")
-        df = load_data_file(args.data)
-        
-        # 2. 选择分析模型
-        if args.model == 'auto':
-            models = select_analysis_model(df)
+        if args.serve:
+            run_server(args)
+        elif args.submit:
+            submit_job(args, sys.argv[1:])
+        elif args.batch:
+            failures = run_batch(args)
+            if failures:
+                sys.exit(1)
         else:
-            models = [args.model]
-        
-        # 3. 执行分析
-        print("\n🔬 正在执行数据分析...")
-        analysis_results = {
-            'data_info': {
-                'n_samples': len(df),
-                'n_vars': len(df.columns)
-            },
-            'models_used': models
-        }
-        
-        if 'descriptive' in models:
-            analysis_results['descriptive'] = perform_descriptive_analysis(df)
-        
-        if 'correlation' in models:
-            analysis_results['correlation'] = perform_correlation_analysis(df)
-        
-        if 'regression' in models:
-            analysis_results['regression'] = perform_regression_analysis(df)
-        
-        if 'cluster' in models:
-            analysis_results['cluster'] = perform_cluster_analysis(df)
-        
-        if 'factor' in models:
-            analysis_results['factor'] = perform_factor_analysis(df)
-        
-        # 4. 生成图表
-        print("\n📊 正在生成可视化图表...")
-        output_dir = Path(args.output).parent
-        output_dir.mkdir(parents=True, exist_ok=True)
-        charts = generate_charts(df, output_dir, args.output)
-        
-        # 5. 评估旧方案（如果提供）
-        old_plan_eval = None
-        if args.old_plan:
-            print("\n🔍 正在评估旧方案...")
-            old_plan_content = load_old_plan(args.old_plan)
-            old_plan_eval = evaluate_old_plan(old_plan_content, analysis_results)
-        
-        # 6. 生成HTML报告
-        print("\n📝 正在生成HTML报告...")
-        generate_html_report(analysis_results, charts, old_plan_eval, args.title, args.output)
-        
-        # 7. 打开浏览器
-        if args.open_browser:
-            print(f"\n🌐 正在浏览器中打开报告...")
-            webbrowser.open(f'file://{os.path.abspath(args.output)}')
-        
-        print("\n✅ 分析完成！")
+            run_analysis(args)
         
     except Exception as e:
         print(f"\n❌ 错误: {str(e)}", file=sys.stderr)
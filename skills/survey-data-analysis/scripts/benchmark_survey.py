@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+问卷数据分析性能基准测试
+生成可控规模的合成问卷数据，分别计时 analyze_survey.py 的各个阶段，输出JSON结果
+"""
+
+import argparse
+import sys
+import os
+import json
+import platform
+import shutil
+import statistics
+import tempfile
+import time
+from pathlib import Path
+from datetime import datetime
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+import analyze_survey as survey
+
+# 各格式的写出方式；xlsx单表行数有上限
+BENCH_FORMATS = ['csv', 'json', 'xlsx', 'txt']
+XLSX_MAX_ROWS = 1048575
+# 默认计时的分析阶段（按执行顺序）
+BENCH_STAGES = ['load', 'compact', 'prepare', 'descriptive', 'correlation', 'regression',
+                'cluster', 'factor', 'categorical', 'significance', 'charts', 'report']
+
+
+def parse_rows(spec):
+    """解析行数列表，支持科学计数法，如 "1e3,1e4,1e5" """
+    try:
+        rows = [int(float(part)) for part in spec.split(',') if part.strip()]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"无效的行数列表: {spec}")
+    if not rows or min(rows) < 10:
+        raise argparse.ArgumentTypeError(f"行数至少为10: {spec}")
+    return rows
+
+
+def generate_survey(n_rows, n_numeric=10, n_categorical=3, missing_rate=0.05, likert_points=5,
+                    n_factors=3, seed=42):
+    """生成合成问卷数据
+
+    数值题中一半为李克特量表题（1~likert_points，由少量潜在因子驱动，题目间存在相关），
+    其余为连续变量；分类题为城市/性别等低基数文本。数值题按missing_rate随机置为缺失。
+    """
+    import numpy as np
+    import pandas as pd
+    rng = np.random.default_rng(seed)
+    data = {}
+    factors = rng.standard_normal((n_rows, n_factors)).astype(np.float32)
+    n_likert = (n_numeric + 1) // 2
+    for i in range(n_numeric):
+        weights = rng.normal(0, 1, n_factors).astype(np.float32)
+        latent = factors @ weights + rng.standard_normal(n_rows, dtype=np.float32)
+        if i < n_likert:
+            # 按分位点切分成等级，保证各等级都有样本
+            cuts = np.quantile(latent[:min(n_rows, 100000)], np.linspace(0, 1, likert_points + 1)[1:-1])
+            values = (np.searchsorted(cuts, latent) + 1).astype(np.float64)
+            name = f'Q{i + 1}_量表'
+        else:
+            values = (latent * 10 + 50).astype(np.float64)
+            name = f'X{i + 1}_数值'
+        if missing_rate > 0:
+            values[rng.random(n_rows) < missing_rate] = np.nan
+        data[name] = values
+    for i in range(n_categorical):
+        n_levels = [2, 5, 12, 30][i % 4]
+        levels = np.array([f'类别{i + 1}_{j + 1}' for j in range(n_levels)])
+        data[f'C{i + 1}_分类'] = levels[rng.integers(0, n_levels, n_rows)]
+    return pd.DataFrame(data)
+
+
+def write_survey(df, fmt, path):
+    """按格式写出合成数据，返回写出的文件路径；格式不适用时返回None"""
+    if fmt == 'csv':
+        df.to_csv(path, index=False)
+    elif fmt == 'txt':
+        df.to_csv(path, index=False, sep='\t')
+    elif fmt == 'json':
+        df.to_json(path, orient='records', force_ascii=False)
+    elif fmt == 'xlsx':
+        if len(df) > XLSX_MAX_ROWS:
+            return None
+        df.to_excel(path, index=False)
+    else:
+        raise ValueError(f"不支持的基准测试格式: {fmt}")
+    return path
+
+
+def time_call(func, *args, repeat=1, setup=None, **kwargs):
+    """重复执行并计时，返回(最后一次的结果, 计时统计)
+
+    setup可选，每次执行前调用（不计时），其返回的元组作为额外的前置参数传给func。
+    """
+    timings = []
+    result = None
+    for _ in range(repeat):
+        extra = setup() if setup else ()
+        start = time.perf_counter()
+        result = func(*extra, *args, **kwargs)
+        timings.append(time.perf_counter() - start)
+    return result, {
+        'seconds': min(timings),
+        'median': statistics.median(timings),
+        'runs': len(timings)
+    }
+
+
+def run_size(n_rows, args, workdir):
+    """对一个数据规模运行全部阶段的基准测试"""
+    import contextlib
+    import io
+
+    stages = set(args.stages)
+    record = {'rows': n_rows, 'stages': {}, 'skipped': {}}
+    gen_start = time.perf_counter()
+    df = generate_survey(n_rows, args.numeric, args.categorical, args.missing_rate, args.likert, seed=args.seed)
+    record['generate_seconds'] = time.perf_counter() - gen_start
+    record['columns'] = len(df.columns)
+
+    # 被测函数的进度输出不计入结果
+    quiet = contextlib.redirect_stdout(io.StringIO())
+    with quiet:
+        # 1. 各格式加载
+        if 'load' in stages:
+            for fmt in args.formats:
+                path = write_survey(df, fmt, workdir / f'survey_{n_rows}.{fmt}')
+                if path is None:
+                    record['skipped'][f'load_{fmt}'] = f'超过{fmt}行数上限'
+                    continue
+                _, record['stages'][f'load_{fmt}'] = time_call(survey.load_data_file, str(path),
+                                                               repeat=args.repeat)
+                record['stages'][f'load_{fmt}']['file_bytes'] = os.path.getsize(path)
+                os.remove(path)
+
+        if 'compact' in stages:
+            (df, _), record['stages']['compact'] = time_call(survey.compact_dtypes, df, verbose=False)
+
+        models = survey.select_analysis_model(df)
+        # prepare只计时数值矩阵的构建；相关矩阵、标准化等视图计入首个使用它们的分析阶段
+        _, timing = time_call(survey.NumericMatrix.from_dataframe, df, repeat=args.repeat)
+        if 'prepare' in stages:
+            record['stages']['prepare'] = timing
+
+        # 2. 各分析模型：每次执行前（不计时）构建未预计算任何视图的新矩阵，
+        # 使各阶段的耗时包含自身所需的相关矩阵等计算，而不被共享矩阵中已缓存的结果掩盖
+        def fresh_matrix():
+            return (survey.NumericMatrix.from_dataframe(df),)
+
+        analysis_results = {'data_info': {'n_samples': len(df), 'n_vars': len(df.columns)},
+                            'models_used': models}
+        model_funcs = {
+            'descriptive': (lambda: survey.perform_descriptive_analysis(df), None),
+            'correlation': (lambda matrix: survey.perform_correlation_analysis(df, matrix), fresh_matrix),
+            'regression': (lambda matrix: survey.perform_regression_analysis(df, matrix), fresh_matrix),
+            'cluster': (lambda matrix: survey.perform_cluster_analysis(df, matrix, workers=args.workers),
+                        fresh_matrix),
+            'factor': (lambda matrix: survey.perform_factor_analysis(df, matrix), fresh_matrix),
+            'categorical': (lambda: survey.perform_categorical_analysis(df, banners=args.banner), None),
+            'significance': (lambda matrix: survey.perform_significance_tests(df, matrix), fresh_matrix)
+        }
+        for name, (func, setup) in model_funcs.items():
+            if name not in stages:
+                continue
+            if name not in models:
+                record['skipped'][name] = '自动模型选择未选中'
+                continue
+            analysis_results[name], record['stages'][name] = time_call(func, repeat=args.repeat, setup=setup)
+
+        # 3. 图表与报告
+        output_path = workdir / f'report_{n_rows}' / 'report.html'
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        charts = {}
+        if 'charts' in stages or 'report' in stages:
+            charts, timing = time_call(
+                lambda matrix: survey.generate_charts(df, output_path.parent, str(output_path), args.chart_format,
+                                                      args.workers, matrix),
+                repeat=args.repeat, setup=fresh_matrix)
+            if 'charts' in stages:
+                record['stages']['charts'] = timing
+        if 'report' in stages:
+            _, record['stages']['report'] = time_call(survey.generate_html_report, analysis_results, charts,
+                                                      None, '基准测试报告', str(output_path), repeat=args.repeat)
+        shutil.rmtree(output_path.parent, ignore_errors=True)
+
+    record['total_seconds'] = sum(stage['seconds'] for stage in record['stages'].values())
+    return record
+
+
+def environment_info():
+    """记录运行环境，便于比较不同时间的结果"""
+    import numpy
+    import pandas
+    import sklearn
+    import matplotlib
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'numpy': numpy.__version__,
+        'pandas': pandas.__version__,
+        'sklearn': sklearn.__version__,
+        'matplotlib': matplotlib.__version__
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='问卷数据分析性能基准测试')
+    parser.add_argument('--rows', type=parse_rows, default=parse_rows('1e3,1e4,1e5'),
+                       help='数据行数列表，逗号分隔，支持科学计数法（默认：1e3,1e4,1e5，最大可到1e7）')
+    parser.add_argument('--numeric', type=int, default=10, help='数值题数量（一半为李克特量表题，默认：10）')
+    parser.add_argument('--categorical', type=int, default=3, help='分类题数量（默认：3）')
+    parser.add_argument('--missing-rate', type=float, default=0.05, help='数值题缺失率（默认：0.05）')
+    parser.add_argument('--likert', type=int, default=5, help='李克特量表等级数（默认：5）')
+    parser.add_argument('--formats', default='csv,json',
+                       help=f'加载阶段测试的文件格式，逗号分隔：{",".join(BENCH_FORMATS)}（默认：csv,json）')
+    parser.add_argument('--stages', default=','.join(BENCH_STAGES),
+                       help=f'要计时的阶段，逗号分隔（默认：全部，{",".join(BENCH_STAGES)}）')
+    parser.add_argument('--repeat', type=int, default=1, help='每个阶段重复次数，结果取最小值（默认：1）')
+    parser.add_argument('--banner', default='C1_分类',
+                       help='分类题阶段的交叉分析分组列，逗号分隔（默认：C1_分类）')
+    parser.add_argument('--chart-format', default='png', choices=survey.CHART_FORMATS, help='图表格式（默认：png）')
+    parser.add_argument('--workers', type=int, help='并行工作进程数（默认：CPU核数）')
+    parser.add_argument('--seed', type=int, default=42, help='随机种子（默认：42）')
+    parser.add_argument('--workdir', help='临时文件目录（默认：系统临时目录，结束后删除）')
+    parser.add_argument('--output', help='结果JSON文件路径（默认：输出到标准输出）')
+    args = parser.parse_args()
+
+    args.formats = [fmt.strip() for fmt in args.formats.split(',') if fmt.strip()]
+    args.stages = [stage.strip() for stage in args.stages.split(',') if stage.strip()]
+    unknown = (set(args.formats) - set(BENCH_FORMATS)) | (set(args.stages) - set(BENCH_STAGES))
+    if unknown:
+        parser.error(f"不支持的格式或阶段: {', '.join(sorted(unknown))}")
+
+    workdir = Path(args.workdir) if args.workdir else Path(tempfile.mkdtemp(prefix='survey-bench-'))
+    workdir.mkdir(parents=True, exist_ok=True)
+    results = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'environment': environment_info(),
+        'config': {
+            'numeric': args.numeric,
+            'categorical': args.categorical,
+            'missing_rate': args.missing_rate,
+            'likert': args.likert,
+            'formats': args.formats,
+            'repeat': args.repeat,
+            'banner': args.banner,
+            'chart_format': args.chart_format,
+            'workers': args.workers,
+            'seed': args.seed
+        },
+        'results': []
+    }
+    try:
+        for n_rows in args.rows:
+            print(f"⏱️  基准测试 {n_rows} 行...", file=sys.stderr)
+            record = run_size(n_rows, args, workdir)
+            results['results'].append(record)
+            print('   ' + ', '.join(f"{name} {stage['seconds']:.3f}s" for name, stage in record['stages'].items()),
+                  file=sys.stderr)
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    text = json.dumps(results, ensure_ascii=False, indent=2)
+    if args.output:
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.output).write_text(text, encoding='utf-8')
+        print(f"✅ 基准测试结果已保存: {args.output}", file=sys.stderr)
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
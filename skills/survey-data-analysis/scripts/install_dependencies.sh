@@ -23,7 +23,7 @@ echo "✅ pip 版本: $(pip3 --version)"
 echo ""
 echo "📥 开始安装依赖包..."
 
-pip3 install pandas numpy matplotlib seaborn scipy scikit-learn jinja2 openpyxl python-docx python-pptx pdfplumber pytesseract Pillow
+pip3 install pandas numpy matplotlib seaborn scipy scikit-learn jinja2 openpyxl python-docx python-pptx pdfplumber pytesseract Pillow pyarrow
 
 if [ $? -eq 0 ]; then
     echo ""
@@ -43,6 +43,7 @@ if [ $? -eq 0 ]; then
     echo "  - pdfplumber (PDF文件处理)"
     echo "  - pytesseract (OCR文字识别)"
     echo "  - Pillow (图片处理)"
+    echo "  - pyarrow (解析结果列式缓存)"
     echo ""
     echo "⚠️  注意：如果使用图片OCR功能，还需要安装Tesseract OCR引擎："
     echo "   macOS: brew install tesseract"
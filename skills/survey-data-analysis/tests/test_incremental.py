@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""增量分析状态（--state/--append）：分批合并的结果与一次性分析全部数据一致"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'scripts'))
+import analyze_survey as survey
+
+
+def _wave(n, seed):
+    rng = np.random.default_rng(seed)
+    x = rng.normal(size=n)
+    df = pd.DataFrame({
+        'x': x,
+        'y': 0.8 * x + rng.normal(size=n),
+        'z': rng.integers(1, 6, n).astype(float),
+        '城市': rng.choice(['北京', '上海'], n),
+    })
+    df.loc[rng.random(n) < 0.1, 'y'] = np.nan
+    df.loc[rng.random(n) < 0.05, 'z'] = np.nan
+    return df
+
+
+def test_append_matches_full_data(tmp_path):
+    waves = [_wave(300, 0), _wave(200, 1), _wave(150, 2)]
+    full = pd.concat(waves, ignore_index=True)
+    path = tmp_path / 'state.npz'
+
+    state = survey.AnalysisState.from_dataframe(waves[0])
+    state.update(waves[0])
+    state.add_source('wave1.csv', 'h1', len(waves[0]))
+    state.save(path)
+    for i, wave in enumerate(waves[1:], start=2):
+        # 每批都经过保存和重新读取，与命令行 --append 的流程一致
+        state = survey.AnalysisState.load(path)
+        state.update(wave)
+        state.add_source(f'wave{i}.csv', f'h{i}', len(wave))
+        state.save(path)
+    state = survey.AnalysisState.load(path)
+    results = state.results()
+
+    assert results['data_info']['n_samples'] == len(full)
+    assert results['data_info']['n_batches'] == 3
+    assert state.has_source('h2') and not state.has_source('h4')
+    expected = full.describe()
+    for col in ['x', 'y', 'z']:
+        summary = results['descriptive']['summary'][col]
+        assert summary['count'] == expected.loc['count', col]
+        assert summary['mean'] == pytest.approx(expected.loc['mean', col])
+        assert summary['std'] == pytest.approx(expected.loc['std', col])
+        assert summary['min'] == expected.loc['min', col]
+        assert summary['max'] == expected.loc['max', col]
+    assert results['descriptive']['missing'] == full.isnull().sum().to_dict()
+    np.testing.assert_allclose(state.moments.corr(), full[['x', 'y', 'z']].corr().to_numpy(), atol=1e-12)
+
+
+def test_regression_uses_complete_rows():
+    df = _wave(500, 3)
+    state = survey.AnalysisState.from_dataframe(df)
+    state.update(df.iloc[:250])
+    state.update(df.iloc[250:])
+    regression = state.results(targets='y', drivers='x,z')['regression']
+
+    complete = df[['x', 'y', 'z']].dropna()
+    X = np.column_stack([np.ones(len(complete)), complete[['x', 'z']].to_numpy()])
+    coef = np.linalg.lstsq(X, complete['y'].to_numpy(), rcond=None)[0]
+    assert regression['intercept'] == pytest.approx(coef[0])
+    assert regression['coefficients']['x'] == pytest.approx(coef[1])
+    assert regression['coefficients']['z'] == pytest.approx(coef[2])
+
+
+def test_update_rejects_missing_columns():
+    state = survey.AnalysisState.from_dataframe(_wave(50, 4))
+    with pytest.raises(ValueError, match='缺少'):
+        state.update(_wave(50, 5).drop(columns=['z']))
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""数值存储（--store）的构建、复用和路径保护测试"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'scripts'))
+import analyze_survey as survey
+
+
+def _frame(n=500, seed=0):
+    rng = np.random.default_rng(seed)
+    x = rng.normal(size=n)
+    df = pd.DataFrame({
+        'x': x,
+        'y': 2 * x + rng.normal(size=n),
+        'z': rng.integers(1, 6, n).astype(float),
+        '城市': rng.choice(['北京', '上海'], n),
+    })
+    df.loc[rng.random(n) < 0.1, 'y'] = np.nan
+    return df
+
+
+def _chunks(df, size=128):
+    return (df.iloc[start:start + size] for start in range(0, len(df), size))
+
+
+def test_build_open_scan_round_trip(tmp_path):
+    df = _frame()
+    source = {'path': 'survey.csv', 'hash': 'abc'}
+    store, sample = survey.NumericStore.build(tmp_path / 'store', _chunks(df), source, sample_rows=100)
+
+    reopened = survey.NumericStore.open(tmp_path / 'store')
+    assert reopened.columns == ['x', 'y', 'z']
+    assert reopened.n_rows == len(df)
+    assert reopened.meta['source'] == source
+    assert reopened.meta['missing']['y'] == int(df['y'].isna().sum())
+    np.testing.assert_array_equal(np.asarray(reopened.values), df[['x', 'y', 'z']].to_numpy())
+    assert len(sample) == 100 and list(sample.columns) == list(df.columns)
+
+    results = reopened.scan().results()
+    expected = df[['x', 'y', 'z']].describe()
+    for col in ['x', 'y', 'z']:
+        summary = results['descriptive']['summary'][col]
+        assert summary['count'] == expected.loc['count', col]
+        assert summary['mean'] == pytest.approx(expected.loc['mean', col])
+        assert summary['std'] == pytest.approx(expected.loc['std', col])
+    # 强相关变量对与pandas成对完整样本相关系数一致
+    pairs = {(p['var1'], p['var2']): p['r'] for p in results['correlation']['strong_pairs']}
+    assert pairs[('x', 'y')] == pytest.approx(df['x'].corr(df['y']))
+
+
+def test_build_replaces_existing_store(tmp_path):
+    df = _frame()
+    path = tmp_path / 'store'
+    survey.NumericStore.build(path, _chunks(df), {'path': 'a.csv', 'hash': 'a'}, sample_rows=50)
+    survey.NumericStore.build(path, _chunks(df.iloc[:200]), {'path': 'b.csv', 'hash': 'b'}, sample_rows=50)
+    store = survey.NumericStore.open(path)
+    assert store.n_rows == 200 and store.meta['source']['hash'] == 'b'
+
+
+def test_build_refuses_directory_with_other_files(tmp_path):
+    data_dir = tmp_path / 'mydata'
+    data_dir.mkdir()
+    (data_dir / 's.csv').write_text('x,y\n1,2\n', encoding='utf-8')
+    (data_dir / 'notes.txt').write_text('不要删除', encoding='utf-8')
+
+    with pytest.raises(ValueError, match='专用目录'):
+        survey.NumericStore.build(data_dir, _chunks(_frame()), {'path': 's.csv', 'hash': 'x'})
+    assert sorted(p.name for p in data_dir.iterdir()) == ['notes.txt', 's.csv']
+    assert not list(tmp_path.glob('*.tmp'))
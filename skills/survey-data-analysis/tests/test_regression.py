@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""批量回归（regress_from_moments）与逐个因变量最小二乘的对照"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'scripts'))
+import analyze_survey as survey
+
+
+def _data(n=400, p=5, seed=0):
+    rng = np.random.default_rng(seed)
+    latent = rng.normal(size=(n, 2))
+    values = latent @ rng.normal(size=(2, p)) + rng.normal(size=(n, p)) + rng.normal(size=p) * 10
+    return [f'v{i}' for i in range(p)], values
+
+
+def _moments(values):
+    mean = values.mean(axis=0)
+    centered = values - mean
+    return len(values), mean, centered.T @ centered
+
+
+def _ols(X, y):
+    """带截距的最小二乘：返回(系数, 标准误)，第0项为截距"""
+    design = np.column_stack([np.ones(len(X)), X])
+    coef, rss, _, _ = np.linalg.lstsq(design, y, rcond=None)
+    sigma2 = rss[0] / (len(y) - design.shape[1])
+    se = np.sqrt(np.diag(np.linalg.inv(design.T @ design)) * sigma2)
+    return coef, se
+
+
+def _assert_model(model, drivers, coef, se):
+    assert model['intercept'] == pytest.approx(coef[0], rel=1e-8)
+    assert model['intercept_std_error'] == pytest.approx(se[0], rel=1e-8)
+    for i, col in enumerate(drivers, start=1):
+        assert model['coefficients'][col] == pytest.approx(coef[i], rel=1e-8, abs=1e-12)
+        assert model['std_errors'][col] == pytest.approx(se[i], rel=1e-8)
+
+
+def test_shared_drivers_match_lstsq():
+    columns, values = _data()
+    result = survey.regress_from_moments(columns, *_moments(values), targets='v0,v1', drivers='v2,v3,v4')
+    assert set(result['models']) == {'v0', 'v1'}
+    for j in (0, 1):
+        coef, se = _ols(values[:, 2:], values[:, j])
+        _assert_model(result['models'][f'v{j}'], ['v2', 'v3', 'v4'], coef, se)
+
+
+def test_all_targets_match_lstsq():
+    columns, values = _data()
+    result = survey.regress_from_moments(columns, *_moments(values), targets='all')
+    for j, target in enumerate(columns):
+        others = [i for i in range(len(columns)) if i != j]
+        coef, se = _ols(values[:, others], values[:, j])
+        model = result['models'][target]
+        _assert_model(model, [columns[i] for i in others], coef, se)
+        fitted = np.column_stack([np.ones(len(values)), values[:, others]]) @ coef
+        r2 = 1 - ((values[:, j] - fitted) ** 2).sum() / ((values[:, j] - values[:, j].mean()) ** 2).sum()
+        assert model['r2_score'] == pytest.approx(r2, rel=1e-8)
+
+
+def test_default_target_is_first_column():
+    columns, values = _data()
+    result = survey.regress_from_moments(columns, *_moments(values))
+    assert result['target'] == 'v0'
+    assert result['features'] == columns[1:]
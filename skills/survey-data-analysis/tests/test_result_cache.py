@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""分析结果缓存键的回归测试"""
+
+import sys
+from functools import partial
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'scripts'))
+import analyze_survey as survey
+
+
+def _survey_frame(n=400, seed=0):
+    rng = np.random.default_rng(seed)
+    group = rng.choice(['A', 'B'], n)
+    return pd.DataFrame({
+        '满意度': rng.normal(size=n) + (group == 'A') * 1.5,
+        '推荐度': rng.normal(size=n),
+        '分组': group,
+        '城市': rng.choice(['北京', '上海', '广州'], n),
+    })
+
+
+def _significance_stage(cache, df):
+    func = partial(survey.perform_significance_tests, alpha=0.05)
+    stage = partial(survey._cached_stage, cache, 'significance', func, reads_columns=True)
+    matrix = survey.prepare_numeric_matrix(df, ['significance'], fingerprint=True)
+    return stage(df, matrix)
+
+
+def test_significance_cache_invalidated_by_categorical_column(tmp_path):
+    cache = survey.ResultCache(tmp_path)
+    df = _survey_frame()
+    first = _significance_stage(cache, df)
+
+    # 只修改分类列：数值矩阵指纹不变，但分组比较的结果必须重新计算
+    edited = df.assign(分组=np.random.default_rng(1).permutation(df['分组'].to_numpy()))
+    assert survey.prepare_numeric_matrix(edited, ['significance'], fingerprint=True).fingerprint() == \
+        survey.prepare_numeric_matrix(df, ['significance'], fingerprint=True).fingerprint()
+    cached = _significance_stage(cache, edited)
+    fresh = survey.perform_significance_tests(edited, alpha=0.05)
+
+    assert cached['families']['group'] == fresh['families']['group']
+    assert cached['families']['group'] != first['families']['group']
+
+
+def test_significance_cache_hit_for_unchanged_data(tmp_path, capsys):
+    cache = survey.ResultCache(tmp_path)
+    df = _survey_frame()
+    _significance_stage(cache, df)
+    capsys.readouterr()
+    _significance_stage(cache, df.copy())
+    assert '命中结果缓存: significance' in capsys.readouterr().out
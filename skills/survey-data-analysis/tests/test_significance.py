@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""批量显著性检验与scipy逐个检验的对照"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+from scipy import stats
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'scripts'))
+import analyze_survey as survey
+
+
+def _single(name, n_levels, n, rng, missing=0.05):
+    codes = rng.integers(0, n_levels, n)
+    codes[rng.random(n) < missing] = -1
+    return survey.CategoricalColumn.from_codes(name, 'single', [f'{name}{k}' for k in range(n_levels)], codes)
+
+
+def _table(a, b):
+    both = (a.codes < a.n_codes) & (b.codes < b.n_codes)
+    table = np.zeros((a.n_codes, b.n_codes), dtype=np.int64)
+    np.add.at(table, (a.codes[both], b.codes[both]), 1)
+    return table[table.sum(axis=1) > 0][:, table.sum(axis=0) > 0]
+
+
+def test_chi_square_matches_scipy():
+    rng = np.random.default_rng(0)
+    n = 2000
+    columns = [_single('甲', 3, n, rng), _single('乙', 4, n, rng), _single('丙', 2, n, rng)]
+    # 让乙与甲相关，保证卡方值不全在零附近
+    columns[1].codes[:n // 2] = np.where(columns[0].codes[:n // 2] < 3, columns[0].codes[:n // 2], 4)
+
+    rows = survey.chi_square_tests(columns)
+    assert len(rows) == 3
+    for i, j, chi2, dof, count, cramers_v in rows:
+        table = _table(columns[int(i)], columns[int(j)])
+        expected = stats.chi2_contingency(table, correction=False)
+        assert chi2 == pytest.approx(expected.statistic, rel=1e-9)
+        assert dof == expected.dof
+        assert count == table.sum()
+        assert cramers_v == pytest.approx(stats.contingency.association(table, method='cramer',
+                                                                         correction=False), rel=1e-9)
+
+
+def _numeric(n, rng):
+    values = rng.normal(size=(n, 3)) * [1, 2, 5] + [0, 10, 100]
+    mask = rng.random((n, 3)) < 0.1
+    values[mask] = np.nan
+    return values, mask
+
+
+@pytest.mark.parametrize('n_groups', [2, 4])
+def test_group_comparison_matches_scipy(n_groups):
+    rng = np.random.default_rng(n_groups)
+    n = 600
+    group = _single('分组', n_groups, n, rng)
+    values, mask = _numeric(n, rng)
+    values[group.codes == 0] += 0.5
+    kind, statistic, dof1, dof2, p_values, eta2, count = survey.group_comparison_tests(
+        group, survey.group_moment_features(values, mask))
+
+    assert kind == ('t' if n_groups == 2 else 'anova')
+    for item in range(values.shape[1]):
+        samples = [values[(group.codes == g) & ~mask[:, item], item] for g in range(n_groups)]
+        if n_groups == 2:
+            expected = stats.ttest_ind(*samples, equal_var=False)
+            assert dof2[item] == pytest.approx(expected.df, rel=1e-9)
+        else:
+            expected = stats.f_oneway(*samples)
+            assert (dof1[item], dof2[item]) == (n_groups - 1, sum(map(len, samples)) - n_groups)
+        assert statistic[item] == pytest.approx(expected.statistic, rel=1e-9)
+        assert p_values[item] == pytest.approx(expected.pvalue, rel=1e-7)
+        assert count[item] == sum(map(len, samples))
+
+
+def test_group_comparison_needs_two_groups():
+    rng = np.random.default_rng(5)
+    group = _single('分组', 3, 300, rng, missing=0)
+    values, mask = _numeric(300, rng)
+    # 第一题只有一组作答
+    mask[group.codes != 0, 0] = True
+    p_values = survey.group_comparison_tests(group, survey.group_moment_features(values, mask))[4]
+    assert np.isnan(p_values[0]) and not np.isnan(p_values[1:]).any()
+
+
+def test_benjamini_hochberg_known_values():
+    q = survey.benjamini_hochberg([0.01, 0.04, 0.03, 0.005])
+    np.testing.assert_allclose(q, [0.02, 0.04, 0.04, 0.02])
+
+
+def test_benjamini_hochberg_skips_nan():
+    p = np.array([0.2, np.nan, 0.001, 0.04, np.nan, 0.03, 0.5])
+    q = survey.benjamini_hochberg(p)
+    valid = ~np.isnan(p)
+    assert np.isnan(q[~valid]).all()
+    np.testing.assert_allclose(q[valid], stats.false_discovery_control(p[valid]))
+    assert np.isnan(survey.benjamini_hochberg([np.nan, np.nan])).all()
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""TXT文件格式探测（sniff_file_format）与加载测试"""
+
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'scripts'))
+import analyze_survey as survey
+
+
+ROWS = [['编号', '城市', '满意度', '备注'],
+        ['1', '北京', '4', '很好'],
+        ['2', '上海', '5', '一般'],
+        ['3', '广州', '3', '还行']]
+
+
+def _write(path, sep, encoding='utf-8'):
+    path.write_text('\n'.join(sep.join(row) for row in ROWS) + '\n', encoding=encoding)
+    return path
+
+
+@pytest.mark.parametrize('sep', ['\t', ';', ',', '|'])
+def test_sniff_delimiter(tmp_path, sep):
+    path = _write(tmp_path / 'survey.txt', sep)
+    fmt = survey.sniff_file_format(path)
+    assert fmt['sep'] == sep
+    assert fmt['quotechar'] == '"'
+
+    df = survey.load_data_file(path)
+    assert list(df.columns) == ROWS[0]
+    assert df['满意度'].tolist() == [4, 5, 3]
+
+
+def test_sniff_gb18030_encoding(tmp_path):
+    path = _write(tmp_path / 'survey.txt', '\t', encoding='gb18030')
+    fmt = survey.sniff_file_format(path)
+    assert (fmt['sep'], fmt['encoding']) == ('\t', 'gb18030')
+    assert survey.load_data_file(path)['城市'].tolist() == ['北京', '上海', '广州']
+
+
+def test_sniff_quoted_fields(tmp_path):
+    path = tmp_path / 'survey.txt'
+    pd.DataFrame({'编号': [1, 2], '意见': ['好, 但是贵', '一般; 还行']}).to_csv(path, sep=';', index=False)
+    assert survey.sniff_file_format(path)['sep'] == ';'
+    assert survey.load_data_file(path)['意见'].tolist() == ['好, 但是贵', '一般; 还行']
+
+
+def test_sniff_only_reads_sample(tmp_path):
+    path = tmp_path / 'survey.txt'
+    body = ''.join(f'{i}\t北京\t{i % 5}\n' for i in range(20000))
+    path.write_text('编号\t城市\t满意度\n' + body, encoding='utf-8')
+    assert survey.sniff_file_format(path, sample_size=4096)['sep'] == '\t'
+
+
+def test_sniff_rejects_single_column(tmp_path):
+    path = tmp_path / 'survey.txt'
+    path.write_text('只有一列\n甲\n乙\n', encoding='utf-8')
+    with pytest.raises(ValueError):
+        survey.load_data_file(path)
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""流式分块描述性统计（--chunksize）与pandas结果对照"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'scripts'))
+import analyze_survey as survey
+
+
+def _frame(n=1000, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        '年龄': rng.integers(18, 70, n),
+        '满意度': rng.integers(1, 6, n).astype(float),
+        '收入': rng.lognormal(8, 1, n),
+        '城市': rng.choice(['北京', '上海', '广州'], n),
+    })
+    df.loc[rng.random(n) < 0.1, '满意度'] = np.nan
+    return df
+
+
+def _stream(df, chunk_rows, **kwargs):
+    stats_ = survey.StreamingDescriptiveStats(**kwargs)
+    for start in range(0, len(df), chunk_rows):
+        stats_.update(df.iloc[start:start + chunk_rows])
+    return stats_
+
+
+def _assert_matches_describe(summary, df):
+    expected = df.describe()
+    for col in expected.columns:
+        for stat in ['count', 'mean', 'std', 'min', '25%', '50%', '75%', 'max']:
+            assert summary[col][stat] == pytest.approx(expected.loc[stat, col], rel=1e-9), (col, stat)
+
+
+@pytest.mark.parametrize('chunk_rows', [1, 97, 1000])
+def test_chunked_stats_match_describe(chunk_rows):
+    # 蓄水池容量不小于行数时分位数也是精确值
+    df = _frame()
+    result = _stream(df, chunk_rows, quantile_sample=len(df)).result()
+    _assert_matches_describe(result['summary'], df)
+    assert result['missing'] == df.isnull().sum().to_dict()
+    assert set(result['summary']) == {'年龄', '满意度', '收入'}
+
+
+def test_quantiles_are_approximate_with_small_reservoir():
+    df = _frame(n=20000)
+    result = _stream(df, 3000, quantile_sample=2000).result()
+    assert result['approximate_quantiles']
+    summary, expected = result['summary']['收入'], df['收入'].describe()
+    assert summary['mean'] == pytest.approx(expected['mean'])
+    assert summary['50%'] == pytest.approx(expected['50%'], rel=0.05)
+
+
+def test_sample_keeps_original_rows():
+    df = _frame()
+    sample = _stream(df, 128, sample_rows=100).sample()
+    assert len(sample) == 100
+    assert list(sample.columns) == list(df.columns)
+    merged = sample.merge(df.reset_index(), on=list(df.columns), how='left')
+    assert merged['index'].notna().all()
+
+
+def test_stream_csv_file(tmp_path):
+    df = _frame()
+    path = tmp_path / 'survey.csv'
+    df.to_csv(path, index=False)
+    result, sample, n_rows = survey.stream_csv_file(path, chunksize=150, sample_rows=50)
+    assert n_rows == len(df) and len(sample) == 50
+    expected = df.describe()
+    for col in expected.columns:
+        assert result['summary'][col]['mean'] == pytest.approx(expected.loc['mean', col])
+        assert result['summary'][col]['std'] == pytest.approx(expected.loc['std', col])
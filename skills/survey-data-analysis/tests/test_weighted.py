@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""加权描述统计（--weight）与自助法置信区间（--bootstrap）测试"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'scripts'))
+import analyze_survey as survey
+
+
+def _frame(n=300, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        '满意度': rng.integers(1, 6, n).astype(float),
+        '收入': rng.lognormal(8, 1, n),
+        '权重': rng.integers(1, 5, n),
+    })
+    df.loc[rng.random(n) < 0.1, '满意度'] = np.nan
+    return df
+
+
+def test_integer_weights_match_replicated_rows():
+    df = _frame()
+    weighted = survey.perform_descriptive_analysis(df, weight='权重')['weighted']
+    replicated = df.loc[df.index.repeat(df['权重'])]
+
+    assert set(weighted) == {'满意度', '收入'}
+    for col in weighted:
+        observed = df[col].notna()
+        expected = replicated[col].dropna()
+        assert weighted[col]['mean'] == pytest.approx(expected.mean(), rel=1e-12)
+        assert weighted[col]['std'] == pytest.approx(expected.std(ddof=0), rel=1e-12)
+        w = df.loc[observed, '权重']
+        assert weighted[col]['n_eff'] == pytest.approx(w.sum() ** 2 / (w ** 2).sum())
+
+
+def test_weights_reject_negative_values():
+    df = _frame()
+    df.loc[0, '权重'] = -1
+    with pytest.raises(ValueError):
+        survey.perform_descriptive_analysis(df, weight='权重')
+
+
+def test_bootstrap_independent_of_workers(monkeypatch):
+    # 缩小分块，让重抽样分到多个块、由多个线程执行
+    monkeypatch.setattr(survey, 'BOOTSTRAP_CHUNK_ELEMENTS', 300 * 16)
+    df = _frame()
+    runs = [survey.perform_descriptive_analysis(df, weight='权重', n_boot=200, seed=7, workers=w)['mean_ci']
+            for w in (1, 3)]
+    assert runs[0] == runs[1]
+    other = survey.perform_descriptive_analysis(df, weight='权重', n_boot=200, seed=8, workers=1)['mean_ci']
+    assert other != runs[0]
+
+
+def test_bootstrap_interval_covers_weighted_mean():
+    df = _frame(n=2000, seed=1)
+    results = survey.perform_descriptive_analysis(df, weight='权重', n_boot=500, seed=0)
+    for col, (low, high) in results['mean_ci'].items():
+        assert low < results['weighted'][col]['mean'] < high
+    assert results['bootstrap'] == {'n_boot': 500, 'seed': 0, 'level': survey.BOOTSTRAP_CI_LEVEL}